@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Engagement analytics for the Telegram relationship bot.
+Counts command use and daily messages per group in fixed-size in-memory
+rollups, tracks the most requested quotes with a count-min sketch, and
+flushes the changes to SQLite in batches from a background thread.
+"""
+
+from array import array
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from i18n import get_catalog
+from message_selection import stable_hash
+from utils import group_key
+
+logger = logging.getLogger(__name__)
+
+# Counted events, in rollup column order
+EVENTS = ('quote', 'search', 'milestone', 'advice', 'daily')
+EVENT_IDS = {event: event_id for event_id, event in enumerate(EVENTS)}
+
+# Daily buckets kept per group (UTC days)
+DAY_BUCKETS = 7
+
+# Count-min sketch size (error about 2/width of all counts, with probability 1 - 2**-depth)
+SKETCH_WIDTH = 2048
+SKETCH_DEPTH = 4
+
+# Number of top quotes tracked
+TOP_QUOTES = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS event_counts (
+    group_id INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (group_id, event, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS quote_sketch (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    width INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    counters BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS top_quotes (
+    text TEXT PRIMARY KEY,
+    estimate INTEGER NOT NULL
+);
+"""
+
+def current_day(now=None):
+    """Get the UTC day number used for the time buckets."""
+    return int(now if now is not None else time.time()) // 86400
+
+class CountMinSketch:
+    """Approximate counts of many keys in a fixed width x depth table of counters."""
+
+    def __init__(self, width=SKETCH_WIDTH, depth=SKETCH_DEPTH, counters=None):
+        self.width = width
+        self.depth = depth
+        self.counters = counters if counters is not None else array('I', bytes(4 * width * depth))
+
+    def _cells(self, key):
+        key_hash = stable_hash(key)
+        # Double hashing: row i uses h1 + i * h2
+        h1, h2 = key_hash & 0xFFFFFFFF, (key_hash >> 32) | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, key, count=1):
+        """Add to a key's count and return its new estimate."""
+        estimate = None
+        for cell in self._cells(key):
+            self.counters[cell] += count
+            value = self.counters[cell]
+            estimate = value if estimate is None else min(estimate, value)
+        return estimate
+
+    def estimate(self, key):
+        return min(self.counters[cell] for cell in self._cells(key))
+
+class GroupStats:
+    """Total and per-day counts of every event for one group."""
+
+    __slots__ = ('totals', 'buckets', 'bucket_days')
+
+    def __init__(self):
+        self.totals = array('Q', bytes(8 * len(EVENTS)))
+        self.buckets = array('I', bytes(4 * len(EVENTS) * DAY_BUCKETS))
+        self.bucket_days = array('i', [-1] * DAY_BUCKETS)
+
+    def _bucket(self, day):
+        slot = day % DAY_BUCKETS
+        if self.bucket_days[slot] != day:
+            # The slot held an older day, reuse it
+            self.bucket_days[slot] = day
+            for event_id in range(len(EVENTS)):
+                self.buckets[slot * len(EVENTS) + event_id] = 0
+        return slot
+
+    def add(self, event_id, day, count=1, total=True):
+        slot = self._bucket(day)
+        self.buckets[slot * len(EVENTS) + event_id] += count
+        if total:
+            self.totals[event_id] += count
+
+    def count_since(self, event_id, first_day):
+        """Get the count of an event from first_day on (within the kept buckets)."""
+        return sum(
+            self.buckets[slot * len(EVENTS) + event_id]
+            for slot in range(DAY_BUCKETS) if self.bucket_days[slot] >= first_day
+        )
+
+class Analytics:
+    """
+    In-memory engagement rollups with batched SQLite persistence.
+
+    record() only bumps counters under a lock. Changes since the last flush
+    are kept in a small pending dict that the flush thread swaps out and
+    writes in one transaction, so handlers never wait on the database.
+    """
+
+    def __init__(self):
+        self.groups = {}
+        self.totals = array('Q', bytes(8 * len(EVENTS)))
+        self.sketch = CountMinSketch()
+        self.top = {}
+        self._pending = {}
+        self._sketch_dirty = False
+        self._lock = threading.Lock()
+        self.db_path = None
+        self._stop_event = None
+        self._thread = None
+
+    def record(self, group_id, event, quote=None, now=None):
+        """Count one event for a group, and the quote it served if any."""
+        event_id = EVENT_IDS[event]
+        group_id = group_key(group_id)
+        day = current_day(now)
+        with self._lock:
+            stats = self.groups.get(group_id)
+            if stats is None:
+                stats = self.groups[group_id] = GroupStats()
+            stats.add(event_id, day)
+            self.totals[event_id] += 1
+            key = (group_id, event, day)
+            self._pending[key] = self._pending.get(key, 0) + 1
+            if quote is not None:
+                self._add_quote(quote)
+
+    def _add_quote(self, quote):
+        estimate = self.sketch.add(quote)
+        self._sketch_dirty = True
+        if quote in self.top or len(self.top) < TOP_QUOTES:
+            self.top[quote] = estimate
+            return
+        weakest = min(self.top, key=self.top.get)
+        if estimate > self.top[weakest]:
+            del self.top[weakest]
+            self.top[quote] = estimate
+
+    def top_quotes(self, limit=TOP_QUOTES):
+        """Get the most served quotes as (text, estimated count), most served first."""
+        with self._lock:
+            ranked = sorted(self.top.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit]
+
+    def group_stats(self, group_id, now=None):
+        """Get today's, this week's and all-time counts of every event for a group."""
+        today = current_day(now)
+        with self._lock:
+            stats = self.groups.get(group_key(group_id))
+            if stats is None:
+                return {event: {'today': 0, 'week': 0, 'total': 0} for event in EVENTS}
+            return {
+                event: {
+                    'today': stats.count_since(event_id, today),
+                    'week': stats.count_since(event_id, today - DAY_BUCKETS + 1),
+                    'total': stats.totals[event_id]
+                }
+                for event_id, event in enumerate(EVENTS)
+            }
+
+    def summary(self):
+        """Get all-time totals across groups and the top quotes."""
+        with self._lock:
+            totals = dict(zip(EVENTS, self.totals))
+            groups = len(self.groups)
+        return {'groups': groups, 'totals': totals, 'top_quotes': self.top_quotes()}
+
+    def connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(SCHEMA)
+        return connection
+
+    def load(self, now=None):
+        """Load the stored rollups (once, at startup)."""
+        first_day = current_day(now) - DAY_BUCKETS + 1
+        connection = self.connect()
+        try:
+            totals = connection.execute(
+                'SELECT group_id, event, SUM(count) FROM event_counts GROUP BY group_id, event').fetchall()
+            recent = connection.execute(
+                'SELECT group_id, event, day, count FROM event_counts WHERE day >= ?', (first_day,)).fetchall()
+            sketch = connection.execute(
+                'SELECT width, depth, counters FROM quote_sketch WHERE id = 0').fetchone()
+            top = connection.execute('SELECT text, estimate FROM top_quotes').fetchall()
+        finally:
+            connection.close()
+
+        with self._lock:
+            for group_id, event, count in totals:
+                if event in EVENT_IDS:
+                    stats = self.groups.setdefault(group_id, GroupStats())
+                    stats.totals[EVENT_IDS[event]] += count
+                    self.totals[EVENT_IDS[event]] += count
+            for group_id, event, day, count in recent:
+                if event in EVENT_IDS:
+                    self.groups.setdefault(group_id, GroupStats()).add(EVENT_IDS[event], day, count, total=False)
+            if sketch is not None and sketch[:2] == (SKETCH_WIDTH, SKETCH_DEPTH):
+                self.sketch = CountMinSketch(counters=array('I', sketch[2]))
+                self.top = dict(top)
+        logger.info(f"✅ Analytics loaded for {len(self.groups)} groups")
+
+    def flush(self):
+        """Write the changes since the last flush to SQLite in one transaction."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            sketch = self.sketch.counters.tobytes() if self._sketch_dirty else None
+            top = list(self.top.items())
+            self._sketch_dirty = False
+        if not pending and sketch is None:
+            return 0
+
+        connection = self.connect()
+        try:
+            connection.execute('BEGIN')
+            connection.executemany(
+                'INSERT INTO event_counts (group_id, event, day, count) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (group_id, event, day) DO UPDATE SET count = count + excluded.count',
+                [(group_id, event, day, count) for (group_id, event, day), count in pending.items()]
+            )
+            if sketch is not None:
+                connection.execute(
+                    'INSERT OR REPLACE INTO quote_sketch (id, width, depth, counters) VALUES (0, ?, ?, ?)',
+                    (SKETCH_WIDTH, SKETCH_DEPTH, sketch))
+                connection.execute('DELETE FROM top_quotes')
+                connection.executemany('INSERT INTO top_quotes (text, estimate) VALUES (?, ?)', top)
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            # Keep the counts for the next flush
+            with self._lock:
+                for key, count in pending.items():
+                    self._pending[key] = self._pending.get(key, 0) + count
+                self._sketch_dirty = self._sketch_dirty or sketch is not None
+            raise
+        finally:
+            connection.close()
+        return len(pending)
+
+    def start(self, db_path, flush_interval=30):
+        """Load stored rollups and flush to db_path every flush_interval seconds."""
+        if self._thread is not None:
+            return
+        self.db_path = db_path
+        self.load()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(flush_interval,), daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the flush thread after a final flush."""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, flush_interval):
+        while not self._stop_event.wait(flush_interval):
+            self._flush_logged()
+        self._flush_logged()
+
+    def _flush_logged(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"❌ Error flushing analytics: {e}")
+
+ANALYTICS = Analytics()
+
+def start_analytics(config):
+    """Persist the shared analytics if ANALYTICS_DB is configured."""
+    if config.analytics_db:
+        ANALYTICS.start(config.analytics_db, config.analytics_flush_interval)
+    return ANALYTICS
+
+def format_stats_message(group_id, language=None):
+    """Format a group's stats for the /stats command."""
+    catalog = get_catalog(language)
+    stats = ANALYTICS.group_stats(group_id)
+    lines = [catalog.text('stats.title'), ""]
+    for event in EVENTS:
+        counts = stats[event]
+        lines.append(f"{catalog.text(f'stats.{event}')}: {counts['today']} / {counts['week']} / {counts['total']}")
+
+    top = ANALYTICS.top_quotes(3)
+    if top:
+        lines += ["", catalog.text('stats.top')]
+        lines += [f"{rank}. {text[:80]} ({count})" for rank, (text, count) in enumerate(top, 1)]
+    return '\n'.join(lines)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Telegram API client layer for the Telegram relationship bot.
+Wraps TeleBot calls with error classification, jittered retries, a circuit
+breaker and adaptive (AIMD) in-flight concurrency, limited separately for
+the interactive and bulk lanes (see lanes.py).
+"""
+
+import logging
+import random
+import threading
+import time
+import requests
+from telebot.apihelper import ApiHTTPException, ApiInvalidJSONException, ApiTelegramException
+from lanes import BULK, LaneBusyError, current_lane
+
+logger = logging.getLogger(__name__)
+
+# Error classes
+RATE_LIMITED = 'rate_limited'
+SERVER_ERROR = 'server_error'
+NETWORK_ERROR = 'network_error'
+PERMANENT_ERROR = 'permanent_error'
+UNKNOWN_ERROR = 'unknown_error'
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is open and calls are being rejected."""
+
+def classify_error(error):
+    """Classify an API error as (error class, retry_after seconds or None)."""
+    if isinstance(error, ApiTelegramException):
+        if error.error_code == 429:
+            parameters = error.result_json.get('parameters') or {}
+            return RATE_LIMITED, parameters.get('retry_after')
+        if error.error_code >= 500:
+            return SERVER_ERROR, None
+        # 400 bad request, 403 bot kicked or blocked, 404 chat not found...
+        return PERMANENT_ERROR, None
+
+    if isinstance(error, ApiHTTPException):
+        status_code = error.result.status_code
+        if status_code == 429:
+            return RATE_LIMITED, None
+        if status_code >= 500:
+            return SERVER_ERROR, None
+        return PERMANENT_ERROR, None
+
+    if isinstance(error, ApiInvalidJSONException):
+        return SERVER_ERROR, None
+
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                          requests.exceptions.ChunkedEncodingError)):
+        return NETWORK_ERROR, None
+
+    # Not an API error at all, e.g. a bug in the caller
+    return UNKNOWN_ERROR, None
+
+def is_transient_error(error):
+    """Whether a failed call may succeed later (after the client's own retries ran out)."""
+    if isinstance(error, (CircuitOpenError, LaneBusyError)):
+        return True
+    return classify_error(error)[0] in (RATE_LIMITED, SERVER_ERROR, NETWORK_ERROR)
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """Get a full-jitter exponential backoff delay for a retry attempt."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+class CircuitBreaker:
+    """
+    Circuit breaker for API calls.
+
+    Opens after failure_threshold consecutive transient failures, rejects calls
+    for reset_timeout seconds, then lets a single trial call through
+    (half-open). A successful trial closes the circuit again; a trial that
+    ends without a verdict (rate limited, turned away) is released with
+    record_neutral() so the next call can try again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._trial_thread = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Check if a call may go through right now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                self._trial_thread = threading.get_ident()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("✅ Telegram API circuit closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_neutral(self):
+        """End the calling thread's trial call without changing the state or failure count."""
+        with self._lock:
+            if self._trial_running and self._trial_thread == threading.get_ident():
+                self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"⚠️ Telegram API circuit opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_running = False
+
+class AIMDLimiter:
+    """
+    Adaptive limit on in-flight API calls.
+
+    The limit grows additively with successful calls and is halved whenever
+    Telegram answers 429, so throughput settles just under the rate limit and
+    recovers on its own after an incident. With max_waiting, callers beyond
+    that many already waiting are turned away with LaneBusyError.
+    """
+
+    def __init__(self, initial_limit=8, min_limit=1, max_limit=64, max_waiting=None):
+        self.limit = float(min(initial_limit, max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_waiting = max_waiting
+        self.in_flight = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            if self.in_flight >= int(self.limit):
+                if self.max_waiting is not None and self.waiting >= self.max_waiting:
+                    raise LaneBusyError(f"{self.waiting} calls already waiting for an API slot")
+                self.waiting += 1
+                try:
+                    self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+                finally:
+                    self.waiting -= 1
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        with self._condition:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def on_rate_limited(self):
+        with self._condition:
+            self.limit = max(self.min_limit, self.limit / 2)
+            logger.warning(f"⚠️ Telegram API rate limited, in-flight limit lowered to {int(self.limit)}")
+
+class TelegramApiClient:
+    """
+    Shared client for outgoing Telegram API calls with retries and flow control.
+
+    Calls made in the bulk lane use bulk_limiter, all others use limiter, so
+    broadcasts never take the in-flight slots kept for replies. A 429 seen by
+    a reply also halves the bulk limit, letting replies through first.
+    """
+
+    def __init__(self, bot, max_retries=5, base_delay=0.5, max_delay=30,
+                 breaker=None, limiter=None, bulk_limiter=None):
+        self.bot = bot
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter or AIMDLimiter()
+        self.bulk_limiter = bulk_limiter or self.limiter
+        # Optional traffic_trace.TraceRecorder notified of every call attempt
+        self.recorder = None
+
+    @classmethod
+    def from_config(cls, bot, config):
+        """Create a client tuned by the API_* settings in a Config."""
+        # Replies get their own slots, broadcasts share the rest of API_MAX_IN_FLIGHT
+        reserved = config.interactive_max_in_flight
+        return cls(
+            bot,
+            max_retries=config.api_max_retries,
+            breaker=CircuitBreaker(config.api_failure_threshold, config.api_reset_timeout),
+            limiter=AIMDLimiter(reserved, max_limit=reserved, max_waiting=config.interactive_max_waiting),
+            bulk_limiter=AIMDLimiter(max_limit=max(config.api_max_in_flight - reserved, 1))
+        )
+
+    def call(self, method, *args, **kwargs):
+        """Call a TeleBot method, retrying transient failures."""
+        name = getattr(method, '__name__', 'api_call')
+        limiter = self.bulk_limiter if current_lane() == BULK else self.limiter
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Telegram API circuit is open, {name} rejected")
+
+            started = time.time()
+            try:
+                with limiter:
+                    result = method(*args, **kwargs)
+            except LaneBusyError:
+                # Turned away before reaching Telegram
+                raise
+            except Exception as e:
+                delay = self.handle_failure(name, limiter, e, started, attempt)
+            else:
+                if self.recorder is not None:
+                    self.recorder.record_call(name, started, time.time() - started)
+                limiter.on_success()
+                self.breaker.record_success()
+                return result
+            finally:
+                # A half-open trial that ended without a verdict (429, LaneBusyError)
+                # must not keep the circuit half-open forever
+                self.breaker.record_neutral()
+            time.sleep(delay)
+
+    def handle_failure(self, name, limiter, error, started, attempt):
+        """Record a failed attempt; returns the delay before retrying or raises the error."""
+        error_class, retry_after = classify_error(error)
+        if self.recorder is not None:
+            self.recorder.record_call(name, started, time.time() - started, error_class)
+        if error_class == PERMANENT_ERROR:
+            # The API answered, the request itself is wrong (or the bot was removed)
+            self.breaker.record_success()
+            raise error
+        if error_class == UNKNOWN_ERROR:
+            # Says nothing about the API, leave the breaker as it is
+            raise error
+
+        if error_class == RATE_LIMITED:
+            # Telegram is up but asks us to slow down, bulk sends first
+            limiter.on_rate_limited()
+            if limiter is not self.bulk_limiter:
+                self.bulk_limiter.on_rate_limited()
+        else:
+            self.breaker.record_failure()
+        if attempt == self.max_retries:
+            logger.error(f"❌ {name} failed after {attempt + 1} attempts: {error}")
+            raise error
+
+        delay = retry_after or backoff_delay(attempt, self.base_delay, self.max_delay)
+        logger.warning(f"⚠️ {name} failed ({error_class}), retrying in {delay:.1f}s")
+        return delay
+
+    def send_message(self, chat_id, text, **kwargs):
+        return self.call(self.bot.send_message, chat_id, text, **kwargs)
+
+    def reply_to(self, message, text, **kwargs):
+        return self.call(self.bot.reply_to, message, text, **kwargs)
+
+    def edit_message_text(self, text, chat_id, message_id, **kwargs):
+        return self.call(self.bot.edit_message_text, text, chat_id, message_id, **kwargs)
+
+    def pin_chat_message(self, chat_id, message_id, **kwargs):
+        return self.call(self.bot.pin_chat_message, chat_id, message_id, **kwargs)
+
+    def answer_inline_query(self, inline_query_id, results, **kwargs):
+        return self.call(self.bot.answer_inline_query, inline_query_id, results, **kwargs)
+
+    def send_photo(self, chat_id, photo, **kwargs):
+        if hasattr(photo, 'seek'):
+            # Rewind file uploads so retries send the whole file again
+            position = photo.tell()
+            def send_photo(*args, **kw):
+                photo.seek(position)
+                return self.bot.send_photo(*args, **kw)
+            send_photo.__name__ = 'send_photo'
+            return self.call(send_photo, chat_id, photo, **kwargs)
+        return self.call(self.bot.send_photo, chat_id, photo, **kwargs)
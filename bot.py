@@ -2,15 +2,26 @@
 """
 Main bot functionality for the Telegram relationship bot.
 Handles message sending, milestone calculations, and bot commands.
+Messages are built by the shared renderer (renderer.py); optional features
+(image cards, traffic tracing) are only imported when enabled.
 """
 
 import telebot
-from datetime import datetime, timedelta
 import logging
-import random
+import threading
 from config import Config
-from quotes import get_random_quote, get_random_advice
-from utils import calculate_days_together, format_milestone_message, is_special_milestone
+from utils import format_countdown_message, is_special_milestone
+from renderer import get_renderer
+from timezones import local_date
+from api_client import TelegramApiClient
+from supervisor import HEARTBEATS, beat_through_workers
+from poll_lease import LeasedPoller, PollLease
+from analytics import ANALYTICS, start_analytics
+from commands import register_command_handlers
+from events import format_event_message, get_event_calendar, register_event_handlers
+from i18n import get_language_preferences, register_language_handler
+from live_countdown import get_live_countdown
+from lanes import BusyLaneHandler
 
 logger = logging.getLogger(__name__)
 
@@ -18,317 +29,151 @@ class RelationshipBot:
     def __init__(self):
         """Initialize the bot with configuration."""
         self.config = Config()
-        self.bot = telebot.TeleBot(self.config.bot_token)
+        self.bot = telebot.TeleBot(
+            self.config.bot_token,
+            num_threads=self.config.interactive_workers,
+            exception_handler=BusyLaneHandler()
+        )
+        self.api = TelegramApiClient.from_config(self.bot, self.config)
+        self.cards = self.create_card_cache()
+        self.recorder = self.start_recording()
+        self.analytics = start_analytics(self.config)
+        self.events = get_event_calendar(self.config.events_db)
+        self.languages = get_language_preferences(self.config.settings_db, self.config.language)
+        self.renderer = get_renderer(self.config)
+        self.live = get_live_countdown(self.api, self.config)
+        # The scheduler's couple store, set (and replaced on reload) by start_scheduler
+        self.couples = None
         self.setup_handlers()
         
+    def create_card_cache(self):
+        """Create the milestone card cache if image cards are enabled."""
+        if not self.config.cards_enabled:
+            return None
+        from milestone_cards import CardCache, cards_available
+        if not cards_available():
+            logger.warning("⚠️ CARDS_ENABLED is set but Pillow is not installed, sending text only")
+            return None
+        try:
+            return CardCache(self.config.card_cache_dir, self.config.card_font_path)
+        except ValueError as e:
+            logger.warning(f"⚠️ CARDS_ENABLED is set but {e}, sending text only")
+            return None
+    
+    def couple_for(self, chat_id):
+        """Get a chat's couple from the scheduler's couple store, or the configured couple."""
+        couples = self.couples
+        couple = couples.find(chat_id) if couples is not None else None
+        return couple or self.config
+    
+    def start_recording(self):
+        """Start recording traffic to TRACE_FILE if it is set."""
+        if not self.config.trace_file:
+            return None
+        from traffic_trace import start_recording
+        return start_recording(self.bot, self.api, self.config.trace_file)
+        
     def setup_handlers(self):
         """Set up bot command handlers."""
-        
-        @self.bot.message_handler(commands=['start'])
-        def handle_start(message):
-            """Handle /start command."""
-            welcome_message = """
-🌹 سلام عزیزان! 🌹
-
-من ربات خاص رابطه شما هستم! 💕
-هر روز در ساعت ۹ صبح به وقت تهران، پیام عاشقانه‌ای همراه با توصیه‌ای برای رابطه‌تان می‌فرستم.
-
-دستورات موجود:
-/milestone - نمایش روزهای گذشته از رابطه
-/quote - دریافت جمله عاشقانه تصادفی
-/advice - دریافت توصیه عاشقانه روزانه
-/help - راهنمای استفاده
-
-با عشق، ربات شما 💖
-            """
-            self.bot.reply_to(message, welcome_message)
-            
-        @self.bot.message_handler(commands=['milestone'])
-        def handle_milestone(message):
-            """Handle /milestone command."""
-            try:
-                days = calculate_days_together(self.config.relationship_start_date)
-                milestone_msg = format_milestone_message(days)
-                self.bot.reply_to(message, milestone_msg)
-            except Exception as e:
-                logger.error(f"Error handling milestone command: {e}")
-                self.bot.reply_to(message, "❌ خطا در محاسبه روزهای رابطه")
-                
-        @self.bot.message_handler(commands=['quote'])
-        def handle_quote(message):
-            """Handle /quote command."""
-            try:
-                quote = get_random_quote()
-                self.bot.reply_to(message, f"💝 {quote}")
-            except Exception as e:
-                logger.error(f"Error handling quote command: {e}")
-                self.bot.reply_to(message, "❌ خطا در دریافت جمله عاشقانه")
-                
-        @self.bot.message_handler(commands=['advice'])
-        def handle_advice(message):
-            """Handle /advice command."""
-            try:
-                advice = get_random_advice()
-                self.bot.reply_to(message, f"💡 توصیه امروز: {advice}")
-            except Exception as e:
-                logger.error(f"Error handling advice command: {e}")
-                self.bot.reply_to(message, "❌ خطا در دریافت توصیه روزانه")
-                
-        @self.bot.message_handler(commands=['help'])
-        def handle_help(message):
-            """Handle /help command."""
-            help_message = """
-📋 راهنمای استفاده:
-
-/start - شروع ربات
-/milestone - نمایش روزهای گذشته از رابطه
-/quote - دریافت جمله عاشقانه تصادفی
-/advice - دریافت توصیه عاشقانه روزانه
-/test - ارسال پیام تست
-/help - نمایش این راهنما
-
-ربات هر روز ساعت ۹ صبح به وقت تهران پیام عاشقانه و توصیه می‌فرستد 💕
-            """
-            self.bot.reply_to(message, help_message)
-            
-        @self.bot.message_handler(commands=['test'])
-        def handle_test(message):
-            """Handle /test command - send a test message."""
-            try:
-                days = calculate_days_together(self.config.relationship_start_date)
-                test_message = f"""
-🧪 پیام تست ربات 🧪
-
-✅ ربات به درستی کار می‌کند!
-💕 امروز روز {days} از رابطه شماست
-🤖 همه سیستم‌ها عملیاتی هستند
-
-این پیام تست بود - ربات شما آماده است! 🎉
-                """
-                self.bot.reply_to(message, test_message.strip())
-                logger.info(f"✅ Test message sent successfully for day {days}")
-            except Exception as e:
-                logger.error(f"❌ Error sending test message: {e}")
-                self.bot.reply_to(message, "❌ خطا در ارسال پیام تست")
+        register_command_handlers(self.bot, self.api, self.renderer, self.languages, self.live, self.couple_for)
+        register_event_handlers(self.bot, self.api, self.events, lambda chat_id: local_date(self.couple_for(chat_id).timezone), self.languages)
+        register_language_handler(self.bot, self.api, self.languages)
     
-    def send_daily_message(self):
-        """Send daily relationship milestone message."""
+    def send_daily_message(self, couple=None):
+        """Send daily relationship milestone message to a couple (default: the configured one)."""
+        couple = couple or self.config
         try:
-            days = calculate_days_together(self.config.relationship_start_date)
+            days = self.renderer.days_together(couple)
             
             # Check if it's a special milestone
             if is_special_milestone(days):
-                message = self.create_special_milestone_message(days)
+                message = self.renderer.special_milestone_message(days, couple)
+                names = (couple.partner1_name, couple.partner2_name)
+                self.send_with_card(couple.group_id, 'milestone', days, names, message)
             else:
-                message = self.create_daily_message(days)
+                message = self.renderer.daily_message(days, couple)
+                self.api.send_message(couple.group_id, message)
             
-            self.bot.send_message(self.config.group_id, message)
+            ANALYTICS.record(couple.group_id, 'daily')
             logger.info(f"✅ Daily message sent successfully for day {days}")
             
         except Exception as e:
             logger.error(f"❌ Error sending daily message: {e}")
     
-    def create_daily_message(self, days):
-        """Create a regular daily message with random quote and advice."""
-        quote = get_random_quote()
-        advice = get_random_advice()
-        
-        # Random greeting variations
-        greetings = [
-            "🌅 صبح بخیر عزیزان! 🌅",
-            "☀️ سلام صبح عاشقان! ☀️", 
-            "🌸 صبحتان بخیر و پر از عشق! 🌸",
-            "💫 صبح امروز هم با عشق شما زیبا شد! 💫",
-            "🌺 صبح پر از عشق و شادی! 🌺",
-            "🌼 روزی جدید با عشق شما آغاز شد! 🌼",
-            "💖 صبحی عاشقانه برای شما! 💖"
-        ]
-        
-        # Random day descriptions
-        day_descriptions = [
-            f"💕 امروز روز {days} از عشق زیبای شماست!",
-            f"❤️ {days} روز از این عشق قشنگ گذشته!",
-            f"💖 امروز {days} روز است که عاشق هستید!",
-            f"🥰 {days} روز عشق و خوشبختی!",
-            f"💝 روز {days} از داستان عاشقانه‌تان!",
-            f"🌹 {days} روز از این عشق بی‌نظیر!",
-            f"💞 {days} روز پر از لحظه‌های عاشقانه!"
-        ]
-        
-        # Random closing messages
-        closings = [
-            "با عشق و احترام ❤️",
-            "عاشقانه برای شما 💕",
-            "با آرزوی روزی پر از عشق 🌹",
-            "همیشه عاشق و خوشبخت باشید 💖",
-            "عشق شما جاودانه باد 💞",
-            "برای همیشه عاشق بمانید 🌟",
-            "با تمام عشق، ربات شما 🥰"
-        ]
-        
-        greeting = random.choice(greetings)
-        day_desc = random.choice(day_descriptions)
-        closing = random.choice(closings)
-        
-        message = f"""
-{greeting}
-
-{day_desc}
-
-💝 {quote}
-
-💡 توصیه امروز: {advice}
-
-{closing}
-        """
-        return message.strip()
-    
-    def create_special_milestone_message(self, days):
-        """Create a special milestone celebration message with random variations."""
-        quote = get_random_quote()
-        advice = get_random_advice()
-        
-        celebration_emojis = [
-            "🎉🎊🥳🎈🎁💐🌹",
-            "✨🎯🌟💎👑🎂🎈",
-            "🥂🍾🎊🎉💝🌺🌸",
-            "💖🎉🌟🥳🎁💞🎈",
-            "🌹🎂✨💐🥂🎊🌸"
-        ]
-        
-        # Different celebration texts for milestones
-        milestone_texts = {
-            7: [
-                "🌸 یک هفته عشق کامل! 🌸",
-                "💞 هفت روز عاشقی! 💞",
-                "🎉 هفت روز پر از عشق! 🎉"
-            ],
-            30: [
-                "🌟 یک ماه عاشقانه! 🌟",
-                "💖 سی روز عشق و شادی! 💖",
-                "🥳 یک ماه از عشق شما! 🥳"
-            ],
-            100: [
-                "🎯 صد روز عشق کامل! 🎯",
-                "💯 یکصد روز زیبا! 💯",
-                "🌟 صد روز درخشان! 🌟"
-            ],
-            200: [
-                "🌟 دویست روز عاشقی! 🌟",
-                "💫 دویست روز پر از عشق! 💫",
-                "✨ دویست روز خوشبختی! ✨"
-            ],
-            365: [
-                "🎂 یک سال کامل عشق! 🎂",
-                "👑 ۳۶۵ روز عاشقی! 👑",
-                "🥳 یک سال خوشبختی! 🥳"
-            ],
-            500: [
-                "💎 پانصد روز درخشان! 💎",
-                "🌟 ۵۰۰ روز فوق‌العاده! 🌟",
-                "✨ پانصد روز زیبا! ✨"
-            ],
-            1000: [
-                "👑 هزار روز عاشقی! 👑",
-                "🏆 ۱۰۰۰ روز عشق! 🏆",
-                "💎 هزار روز خوشبختی! 💎"
-            ]
-        }
-        
-        # Random celebration messages
-        celebration_messages = [
-            f"💕 امروز روز خاصی است! {days} روز از عشق زیبای شما می‌گذرد!",
-            f"🎊 چه روز فوق‌العاده‌ای! {days} روز عشق و خوشبختی!",
-            f"✨ این یک نقطه عطف است! {days} روز عاشقی!",
-            f"🥳 جشن گرفتنی است! {days} روز عشق جاودان!",
-            f"💖 لحظه‌ای ویژه! {days} روز از داستان عاشقانه‌تان!",
-            f"🌹 روزی برای جشن! {days} روز عشق بی‌نهایت!",
-            f"💞 یک روز خاص دیگر! {days} روز از عشق شما!"
-        ]
-        
-        # Random endings
-        endings = [
-            "این لحظه‌های خاص را جشن بگیرید! 🥂",
-            "عشق شما قابل ستایش است! 🌹",
-            "به این مسیر زیبا ادامه دهید! 💕",
-            "عاشقانه‌تان جاودانه باد! 💖",
-            "لحظات خوشبختی‌تان بی‌پایان! ✨",
-            "این عشق را برای همیشه گرامی بدارید! 💞",
-            "عشق شما همیشه می‌درخشد! 🌟"
-        ]
-        
-        emoji_set = random.choice(celebration_emojis)
-        
-        if days in milestone_texts:
-            special_text = random.choice(milestone_texts[days])
-        else:
-            special_text = f"✨ {days} روز فوق‌العاده! ✨"
-        
-        celebration_msg = random.choice(celebration_messages)
-        ending = random.choice(endings)
-        
-        message = f"""
-{emoji_set}
-
-{special_text}
-
-{celebration_msg}
-
-💝 {quote}
-
-💡 توصیه امروز: {advice}
-
-{ending}
-
-{emoji_set}
-        """
-        return message.strip()
-    
-    def send_birthday_message(self, partner_name):
-        """Send birthday message for a partner."""
+    def send_birthday_message(self, partner_name, couple=None):
+        """Send birthday message for a partner of a couple (default: the configured one)."""
+        couple = couple or self.config
         try:
-            days = calculate_days_together(self.config.relationship_start_date)
-            quote = get_random_quote()
-            advice = get_random_advice()
-            
-            message = f"""
-🎂🎉 تولدت مبارک {partner_name} عزیز! 🎉🎂
-
-🌹 امروز روز {days} از عشق شماست و همزمان روز تولد یکی از عاشقان زیبای این رابطه!
-
-💝 {quote}
-
-💡 توصیه امروز: {advice}
-
-🎁 با عشق فراوان تولدت را تبریک می‌گویم!
-
-🥳🎈🎊
-            """
-            
-            self.bot.send_message(self.config.group_id, message)
+            message = self.renderer.birthday_message(partner_name, couple)
+            self.send_with_card(couple.group_id, 'birthday', 0, (partner_name,), message)
             logger.info(f"✅ Birthday message sent for {partner_name}")
             
         except Exception as e:
             logger.error(f"❌ Error sending birthday message: {e}")
     
+    def send_event_messages(self, couple, today):
+        """Send a message for each of a couple's custom events due today."""
+        language = self.languages.get(couple.group_id)
+        for event, days_left in self.events.due_for_group(couple.group_id, today):
+            try:
+                self.api.send_message(couple.group_id, format_event_message(event, days_left, today, language))
+                logger.info(f"✅ Event message sent for event {event.id}")
+            except Exception as e:
+                logger.error(f"❌ Error sending event message: {e}")
+    
+    def refresh_live_countdown(self, couple=None, today=None):
+        """Update a couple's pinned countdown message (default: the configured couple), if enabled."""
+        if self.live is None:
+            return
+        couple = couple or self.config
+        days = self.renderer.days_together(couple, today)
+        self.live.update(couple.group_id, format_countdown_message(days, self.languages.get(couple.group_id)))
+    
+    def send_with_card(self, chat_id, template, milestone, names, message):
+        """Send a message as an image card caption, falling back to plain text."""
+        if self.cards is not None:
+            from milestone_cards import MAX_CAPTION_LENGTH, send_card
+            try:
+                send_card(self.api, self.cards, chat_id, template, milestone, names, caption=message,
+                          language=self.languages.get(chat_id))
+                if len(message) <= MAX_CAPTION_LENGTH:
+                    return
+            except Exception as e:
+                logger.error(f"❌ Error sending {template} card: {e}")
+        
+        self.api.send_message(chat_id, message)
+    
     def start_polling(self):
-        """Start the bot polling."""
-        try:
-            # Clear any existing webhooks to avoid conflicts
-            self.bot.remove_webhook()
-            logger.info("✅ Cleared any existing webhooks")
-            
-            # Start polling with error recovery
-            self.bot.infinity_polling(
-                timeout=10, 
-                long_polling_timeout=5,
-                restart_on_change=False,
-                skip_pending=True
-            )
-        except Exception as e:
-            logger.error(f"❌ Error in bot polling: {e}")
-            # Wait before retrying
-            import time
-            time.sleep(30)
-            logger.info("🔄 Restarting bot polling...")
-            self.start_polling()
\ No newline at end of file
+        """Start the bot polling (blocks until the process exits)."""
+        self.poll_updates(threading.Event())
+    
+    def poll_updates(self, stop_event):
+        """Poll Telegram for updates until stop_event is set, recording heartbeats."""
+        # Clear any existing webhooks to avoid conflicts
+        self.bot.remove_webhook()
+        logger.info("✅ Cleared any existing webhooks")
+        
+        # With a shared lease only the lease holder polls, other replicas stand by
+        if self.config.poll_lease_db:
+            lease = PollLease(self.config.poll_lease_db, ttl=self.config.poll_lease_ttl)
+            LeasedPoller(self.bot, lease).run(stop_event)
+            return
+        
+        # Skip updates that arrived while the bot was down
+        self.bot.get_updates(offset=-1, timeout=10, long_polling_timeout=1)
+        
+        while not stop_event.is_set():
+            try:
+                updates = self.bot.get_updates(
+                    offset=self.bot.last_update_id + 1,
+                    timeout=10,
+                    long_polling_timeout=5
+                )
+                HEARTBEATS.beat('poller')
+                self.bot.process_new_updates(updates)
+                beat_through_workers(self.bot)
+            except Exception as e:
+                logger.error(f"❌ Error in bot polling: {e}")
+                stop_event.wait(3)
+        
+        logger.info("🛑 Bot polling stopped")
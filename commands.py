@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Command handlers shared by bot.py and interactive_bot.py.
+Both bots answer /start, /help, /milestone, /quote, /advice, /test, /daily,
+/stats and inline quote searches the same way; only the couple a chat
+belongs to differs. With POLL_LEASE_DB any process may claim any update,
+so every process must register the same handlers.
+"""
+
+import logging
+import telebot
+from analytics import ANALYTICS, format_stats_message
+from i18n import get_catalog
+from quote_search import INLINE_CACHE_TIME, inline_results, search_quotes
+from quotes import get_random_quote, get_random_advice
+from timezones import local_date
+from utils import format_countdown_message, format_milestone_message
+
+logger = logging.getLogger(__name__)
+
+def command_list(catalog):
+    """Get the command list shown by /start and /help."""
+    return f"{catalog.text('commands')}\n{catalog.text('commands.daily')}"
+
+def register_command_handlers(bot, api, renderer, languages, live, couple_for):
+    """
+    Register the shared commands and the inline quote search. couple_for(chat_id)
+    gives a chat's couple, and live (see live_countdown.py, may be None) the
+    pinned countdown of /milestone.
+    """
+
+    @bot.message_handler(commands=['start'])
+    def handle_start(message):
+        """Handle /start command."""
+        catalog = languages.catalog(message.chat.id)
+        api.reply_to(message, catalog.text('start', commands=command_list(catalog)))
+
+    @bot.message_handler(commands=['help'])
+    def handle_help(message):
+        """Handle /help command."""
+        catalog = languages.catalog(message.chat.id)
+        api.reply_to(message, catalog.text('help', commands=command_list(catalog)))
+
+    @bot.message_handler(commands=['milestone'])
+    def handle_milestone(message):
+        """Handle /milestone command."""
+        language = languages.get(message.chat.id)
+        try:
+            couple = couple_for(message.chat.id)
+            days = renderer.days_together(couple)
+            if live is not None:
+                # Refresh the pinned countdown instead of sending a new message
+                live.update(message.chat.id, format_countdown_message(days, language))
+            else:
+                milestone_msg = format_milestone_message(days, couple.group_id, local_date(couple.timezone), language)
+                api.reply_to(message, milestone_msg.strip())
+            ANALYTICS.record(message.chat.id, 'milestone')
+        except Exception as e:
+            logger.error(f"Error handling milestone command: {e}")
+            api.reply_to(message, get_catalog(language).text('error.milestone'))
+
+    @bot.message_handler(commands=['quote'])
+    def handle_quote(message):
+        """Handle /quote command, or /quote <keyword> to search."""
+        catalog = languages.catalog(message.chat.id)
+        try:
+            keyword = telebot.util.extract_arguments(message.text)
+            if keyword:
+                results, _ = search_quotes(keyword, 0, 1)
+                if not results:
+                    api.reply_to(message, catalog.text('quote.not_found'))
+                    return
+                quote = results[0][1]
+            else:
+                quote = get_random_quote()
+            api.reply_to(message, catalog.text('quote.reply', quote=quote))
+            ANALYTICS.record(message.chat.id, 'search' if keyword else 'quote', quote)
+        except Exception as e:
+            logger.error(f"Error handling quote command: {e}")
+            api.reply_to(message, catalog.text('error.quote'))
+
+    @bot.inline_handler(lambda query: True)
+    def handle_inline_query(inline_query):
+        """Handle inline queries by searching the quotes."""
+        try:
+            results, next_offset = inline_results(inline_query.query, inline_query.offset)
+            api.answer_inline_query(
+                inline_query.id,
+                results,
+                cache_time=INLINE_CACHE_TIME,
+                next_offset=next_offset
+            )
+        except Exception as e:
+            logger.error(f"Error handling inline query: {e}")
+
+    @bot.message_handler(commands=['advice'])
+    def handle_advice(message):
+        """Handle /advice command."""
+        catalog = languages.catalog(message.chat.id)
+        try:
+            advice = get_random_advice()
+            api.reply_to(message, catalog.text('advice.reply', advice=advice))
+            ANALYTICS.record(message.chat.id, 'advice')
+        except Exception as e:
+            logger.error(f"Error handling advice command: {e}")
+            api.reply_to(message, catalog.text('error.advice'))
+
+    @bot.message_handler(commands=['test'])
+    def handle_test(message):
+        """Handle /test command - send a test message."""
+        catalog = languages.catalog(message.chat.id)
+        try:
+            days = renderer.days_together(couple_for(message.chat.id))
+            api.reply_to(message, catalog.text('test', days=days))
+            logger.info(f"✅ Test message sent successfully for day {days}")
+        except Exception as e:
+            logger.error(f"❌ Error sending test message: {e}")
+            api.reply_to(message, catalog.text('error.test'))
+
+    @bot.message_handler(commands=['daily'])
+    def handle_daily(message):
+        """Handle /daily command - send the chat's couple their daily message now."""
+        catalog = languages.catalog(message.chat.id)
+        try:
+            couple = couple_for(message.chat.id)
+            daily_msg = renderer.daily_message(renderer.days_together(couple), couple)
+            api.send_message(couple.group_id, daily_msg)
+            ANALYTICS.record(couple.group_id, 'daily')
+            api.reply_to(message, catalog.text('daily.sent'))
+        except Exception as e:
+            logger.error(f"❌ Error sending daily message: {e}")
+            api.reply_to(message, catalog.text('error.daily'))
+
+    @bot.message_handler(commands=['stats'])
+    def handle_stats(message):
+        """Handle /stats command - show this group's usage."""
+        language = languages.get(message.chat.id)
+        try:
+            api.reply_to(message, format_stats_message(message.chat.id, language))
+        except Exception as e:
+            logger.error(f"Error handling stats command: {e}")
+            api.reply_to(message, get_catalog(language).text('error.stats'))
@@ -27,10 +27,79 @@ class Config:
         self.partner1_name = os.getenv('PARTNER1_NAME', 'سهیل')
         self.partner2_name = os.getenv('PARTNER2_NAME', 'شمیم')
         
-        # Daily message time (24-hour format, Asia/Tehran)
+        # Couple's IANA timezone, used for the local date and daily message time
+        self.timezone = os.getenv('TIMEZONE', 'Asia/Tehran')
+        
+        # Daily message time (24-hour format, in the couple's timezone)
         self.daily_message_hour = int(os.getenv('DAILY_MESSAGE_HOUR', '9'))
         self.daily_message_minute = int(os.getenv('DAILY_MESSAGE_MINUTE', '0'))
         
+        # Send window: daily messages are spread over this many minutes after the
+        # daily message time, with at most SEND_RATE_LIMIT messages per second
+        self.send_window_minutes = int(os.getenv('SEND_WINDOW_MINUTES', '0'))
+        self.send_rate_limit = int(os.getenv('SEND_RATE_LIMIT', '25'))
+        
+        # Telegram API retries, circuit breaker and in-flight call limit
+        self.api_max_retries = int(os.getenv('API_MAX_RETRIES', '5'))
+        self.api_failure_threshold = int(os.getenv('API_FAILURE_THRESHOLD', '5'))
+        self.api_reset_timeout = int(os.getenv('API_RESET_TIMEOUT', '30'))
+        self.api_max_in_flight = int(os.getenv('API_MAX_IN_FLIGHT', '16'))
+        
+        # Interactive lane: handler threads, API calls reserved for replies out of
+        # API_MAX_IN_FLIGHT, and replies allowed to wait for one before being dropped
+        self.interactive_workers = int(os.getenv('INTERACTIVE_WORKERS', '4'))
+        self.interactive_max_in_flight = int(os.getenv('INTERACTIVE_MAX_IN_FLIGHT', '4'))
+        self.interactive_max_waiting = int(os.getenv('INTERACTIVE_MAX_WAITING', '32'))
+        
+        # Bulk lane: scheduled send threads and queued sends before the scheduler waits
+        self.bulk_workers = int(os.getenv('BULK_WORKERS', '4'))
+        self.bulk_queue_size = int(os.getenv('BULK_QUEUE_SIZE', '1000'))
+        
+        # Shared SQLite lease so only one process polls getUpdates (unset: always poll)
+        self.poll_lease_db = os.getenv('POLL_LEASE_DB') or None
+        self.poll_lease_ttl = int(os.getenv('POLL_LEASE_TTL', '30'))
+        
+        # Image cards for milestones and birthdays (needs Pillow and CARD_FONT_PATH, a font with Persian glyphs)
+        self.cards_enabled = os.getenv('CARDS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+        self.card_cache_dir = os.getenv('CARD_CACHE_DIR', 'card_cache')
+        self.card_font_path = os.getenv('CARD_FONT_PATH') or None
+        
+        # Couples database filled by couple_db.py imports (unset: the single couple above)
+        self.couples_db = os.getenv('COUPLES_DB') or None
+        
+        # SQLite file holding the couples' custom events (/addevent)
+        self.events_db = os.getenv('EVENTS_DB', 'events.db')
+        
+        # Default language of the bot's texts (a catalog in locales/), chats can pick their own with /language
+        self.language = os.getenv('LANGUAGE', 'fa')
+        
+        # SQLite file holding each chat's chosen language
+        self.settings_db = os.getenv('SETTINGS_DB', 'settings.db')
+        
+        # One pinned countdown message per group, edited in place (at most every LIVE_COUNTDOWN_INTERVAL seconds)
+        self.live_countdown = os.getenv('LIVE_COUNTDOWN', 'false').lower() in ('1', 'true', 'yes')
+        self.live_countdown_interval = int(os.getenv('LIVE_COUNTDOWN_INTERVAL', '2'))
+        
+        # Token for the keep-alive admin endpoints (unset: admin endpoints disabled)
+        self.admin_token = os.getenv('ADMIN_TOKEN') or None
+        
+        # Scheduler state snapshot, restored on boot instead of being rebuilt (unset: no snapshots)
+        self.snapshot_path = os.getenv('SNAPSHOT_PATH') or None
+        self.snapshot_interval = int(os.getenv('SNAPSHOT_INTERVAL', '300'))
+        
+        # Engagement analytics database, flushed every ANALYTICS_FLUSH_INTERVAL seconds (unset: memory only)
+        self.analytics_db = os.getenv('ANALYTICS_DB') or None
+        self.analytics_flush_interval = int(os.getenv('ANALYTICS_FLUSH_INTERVAL', '30'))
+        
+        # Record sanitized traffic to this trace file for replay (see traffic_trace.py)
+        self.trace_file = os.getenv('TRACE_FILE') or None
+        
+        # tracemalloc profiling from startup, snapshot every MEMORY_PROFILE_INTERVAL seconds
+        # and log the MEMORY_PROFILE_TOP fastest growing allocation sites (see memory_profile.py)
+        self.memory_profile = os.getenv('MEMORY_PROFILE', 'false').lower() in ('1', 'true', 'yes')
+        self.memory_profile_interval = int(os.getenv('MEMORY_PROFILE_INTERVAL', '300'))
+        self.memory_profile_top = int(os.getenv('MEMORY_PROFILE_TOP', '10'))
+        
         logger.info("✅ Configuration loaded successfully")
     
     def get_env_var(self, var_name, default=None):
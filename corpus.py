@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Binary quote corpus for the Telegram relationship bot.
+Stores quotes as an offsets table plus one UTF-8 blob, memory-mapped read-only
+so every worker process shares the same pages and strings are decoded only
+when they are picked.
+
+File layout (little-endian):
+    header      magic, version, entry count, category count, language count
+    categories  per category: name length (u8), name, first entry, end entry (u32)
+    languages   per language: name length (u8), name
+    offsets     (count + 1) x u32, start of each entry in the blob
+    languages   count x u8, language id of each entry
+    blob        UTF-8 text of all entries
+
+Entries are sorted by category, so a category is a contiguous range of entries.
+"""
+
+from array import array
+import logging
+import mmap
+import os
+import struct
+import sys
+from utils import write_file_atomically
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RBQC'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIHH')
+CATEGORY_RANGE = struct.Struct('<II')
+
+def read_tsv(path):
+    """Read corpus entries from a category<TAB>language<TAB>text source file."""
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.rstrip('\n')
+            if not line.strip() or line.startswith('#'):
+                continue
+            parts = line.split('\t', 2)
+            if len(parts) != 3:
+                raise ValueError(f"{path}:{line_number}: expected category, language and text")
+            yield tuple(parts)
+
+def build_corpus_bytes(entries):
+    """Build the binary corpus for (category, language, text) entries."""
+    entries = sorted(entries, key=lambda entry: entry[0])
+
+    categories = {}
+    languages = {}
+    for index, (category, language, _) in enumerate(entries):
+        start, _ = categories.get(category, (index, index))
+        categories[category] = (start, index + 1)
+        languages.setdefault(language, len(languages))
+
+    offsets = array('I', [0])
+    language_ids = array('B')
+    blob = bytearray()
+    for _, language, text in entries:
+        blob += text.encode('utf-8')
+        offsets.append(len(blob))
+        language_ids.append(languages[language])
+
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+
+    parts = [HEADER.pack(MAGIC, VERSION, 0, len(entries), len(categories), len(languages))]
+    for name, (start, end) in categories.items():
+        encoded = name.encode('utf-8')
+        parts.append(bytes([len(encoded)]) + encoded + CATEGORY_RANGE.pack(start, end))
+    for name in languages:
+        encoded = name.encode('utf-8')
+        parts.append(bytes([len(encoded)]) + encoded)
+
+    # Keep the offsets table 4-byte aligned so it can be cast without copying
+    size = sum(len(part) for part in parts)
+    parts.append(b'\0' * (-size % 4))
+    parts.append(offsets.tobytes())
+    parts.append(language_ids.tobytes())
+    parts.append(bytes(blob))
+    return b''.join(parts)
+
+def write_corpus(path, entries):
+    """Write a binary corpus file atomically."""
+    data = build_corpus_bytes(entries)
+    write_file_atomically(path, data, sync=True)
+    return len(data)
+
+class Corpus:
+    """Read-only view of a binary corpus. Entries are decoded on access."""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        magic, version, _, count, category_count, language_count = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a version {VERSION} quote corpus")
+
+        position = HEADER.size
+        self.categories = {}
+        for _ in range(category_count):
+            length = view[position]
+            name = bytes(view[position + 1:position + 1 + length]).decode('utf-8')
+            position += 1 + length
+            self.categories[name] = range(*CATEGORY_RANGE.unpack_from(view, position))
+            position += CATEGORY_RANGE.size
+
+        self.languages = []
+        for _ in range(language_count):
+            length = view[position]
+            self.languages.append(bytes(view[position + 1:position + 1 + length]).decode('utf-8'))
+            position += 1 + length
+
+        position += -position % 4
+        offsets = view[position:position + 4 * (count + 1)]
+        self._offsets = offsets.cast('I') if sys.byteorder == 'little' else array('I', offsets)
+        position += 4 * (count + 1)
+        self._language_ids = view[position:position + count]
+        self._blob = view[position + count:]
+        self.count = count
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a corpus file read-only."""
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(f"Corpus index {index} out of range")
+        return str(self._blob[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+
+    def language(self, index):
+        """Get the language tag of an entry."""
+        return self.languages[self._language_ids[index]]
+
+    def category(self, name):
+        """Get a sequence view over one category of the corpus."""
+        return CategoryView(self, self.categories.get(name, range(0)))
+
+class CategoryView:
+    """Sequence over the entries of one category, decoded lazily."""
+
+    __slots__ = ('corpus', 'entries')
+
+    def __init__(self, corpus, entries):
+        self.corpus = corpus
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.corpus[entry] for entry in self.entries[index]]
+        return self.corpus[self.entries[index]]
+
+    def __iter__(self):
+        for entry in self.entries:
+            yield self.corpus[entry]
+
+def load_corpus(source_path, corpus_path):
+    """
+    Open the binary corpus, rebuilding it first if the source file is newer.
+    Falls back to an in-memory corpus when the corpus file cannot be written.
+    """
+    try:
+        stale = (
+            not os.path.exists(corpus_path) or
+            os.path.getmtime(corpus_path) < os.path.getmtime(source_path)
+        )
+    except OSError:
+        stale = False
+
+    if stale:
+        try:
+            size = write_corpus(corpus_path, read_tsv(source_path))
+            logger.info(f"✅ Built quote corpus {corpus_path} ({size} bytes)")
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write quote corpus ({e}), keeping it in memory")
+            return Corpus(build_corpus_bytes(read_tsv(source_path)))
+
+    return Corpus.open(corpus_path)
+
+def main(argv):
+    """Command line: python corpus.py build SOURCE.tsv OUTPUT.corpus"""
+    if len(argv) != 4 or argv[1] != 'build':
+        print(main.__doc__)
+        return 1
+    size = write_corpus(argv[3], read_tsv(argv[2]))
+    print(f"Wrote {argv[3]} ({size} bytes)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
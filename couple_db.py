@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Couples database for the Telegram relationship bot.
+Streams couples in from CSV or NDJSON into SQLite and back out again, so many
+couples can be onboarded without one deployment (and env vars) per couple.
+
+Records use the Config attribute names as fields:
+    group_id (chat id or @channel username), relationship_start_date (YYYY-MM-DD), partner1_name, partner2_name,
+    partner1_birthday, partner2_birthday (MM-DD, optional), timezone,
+    daily_message_hour, daily_message_minute
+"""
+
+import csv
+import io
+import json
+import logging
+import re
+import sqlite3
+import sys
+from datetime import date, datetime
+from functools import lru_cache
+import pytz
+from couple_store import CoupleStore, DEFAULT_TIMEZONE
+from utils import group_key, rebuild_integer_key_table, validate_date_format
+
+logger = logging.getLogger(__name__)
+
+FIELDS = (
+    'group_id', 'relationship_start_date', 'partner1_name', 'partner2_name',
+    'partner1_birthday', 'partner2_birthday', 'timezone',
+    'daily_message_hour', 'daily_message_minute'
+)
+
+# group_id is a chat id or a channel username, so it is not a rowid alias
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS couples (
+    group_id NOT NULL PRIMARY KEY,
+    relationship_start_date TEXT NOT NULL,
+    partner1_name TEXT NOT NULL,
+    partner2_name TEXT NOT NULL,
+    partner1_birthday TEXT,
+    partner2_birthday TEXT,
+    timezone TEXT NOT NULL,
+    daily_message_hour INTEGER NOT NULL,
+    daily_message_minute INTEGER NOT NULL
+);
+"""
+
+# Secondary indexes, dropped during an import and rebuilt once at the end
+INDEXES = {
+    'couples_start_date': 'CREATE INDEX IF NOT EXISTS couples_start_date ON couples (relationship_start_date)',
+    'couples_timezone': 'CREATE INDEX IF NOT EXISTS couples_timezone ON couples (timezone)',
+}
+
+UPSERT = (
+    f"INSERT INTO couples ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))}) "
+    f"ON CONFLICT (group_id) DO UPDATE SET "
+    + ', '.join(f"{field} = excluded.{field}" for field in FIELDS[1:])
+)
+
+# Telegram channel usernames: @ and 5 to 32 letters, digits or underscores
+CHANNEL_USERNAME = re.compile(r'@[A-Za-z0-9_]{5,32}')
+
+BATCH_SIZE = 50000
+MAX_REPORTED_ERRORS = 100
+
+def connect(db_path):
+    """Open the couples database."""
+    connection = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.executescript(SCHEMA)
+    if rebuild_integer_key_table(connection, 'couples', SCHEMA):
+        for statement in INDEXES.values():
+            connection.execute(statement)
+    return connection
+
+@lru_cache(maxsize=4096)
+def parse_start_date(value):
+    """Parse a relationship start date with the RELATIONSHIP_START_DATE rules."""
+    if not validate_date_format(value):
+        raise ValueError(f"invalid relationship_start_date {value!r}, expected YYYY-MM-DD")
+    return datetime.strptime(value, '%Y-%m-%d').date().isoformat()
+
+@lru_cache(maxsize=512)
+def parse_birthday(value):
+    """Parse an optional MM-DD birthday (02-29 allowed)."""
+    if not value:
+        return None
+    # Checked against a leap year so 02-29 is accepted, as in the couple store
+    if len(value) != 5 or not validate_date_format(f"2000-{value}"):
+        raise ValueError(f"invalid birthday {value!r}, expected MM-DD")
+    return value
+
+@lru_cache(maxsize=1024)
+def parse_timezone(value):
+    value = value or DEFAULT_TIMEZONE
+    if value not in pytz.all_timezones_set:
+        raise ValueError(f"unknown timezone {value!r}")
+    return value
+
+def parse_int(record, field, default, low, high):
+    value = record.get(field)
+    if value in (None, ''):
+        return default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number, got {value!r}")
+    if not low <= number <= high:
+        raise ValueError(f"{field} must be between {low} and {high}")
+    return number
+
+def validate_couple(record):
+    """Validate one couple record and return its database row."""
+    for field in ('group_id', 'relationship_start_date', 'partner1_name', 'partner2_name'):
+        if not str(record.get(field) or '').strip():
+            raise ValueError(f"{field} is required")
+    group_id = group_key(str(record['group_id']))
+    if isinstance(group_id, str) and not CHANNEL_USERNAME.fullmatch(group_id):
+        raise ValueError(f"group_id must be a chat id or an @channel username, got {record['group_id']!r}")
+
+    return (
+        group_id,
+        parse_start_date(str(record['relationship_start_date']).strip()),
+        str(record['partner1_name']).strip(),
+        str(record['partner2_name']).strip(),
+        parse_birthday((record.get('partner1_birthday') or '').strip()),
+        parse_birthday((record.get('partner2_birthday') or '').strip()),
+        parse_timezone((record.get('timezone') or '').strip()),
+        parse_int(record, 'daily_message_hour', 9, 0, 23),
+        parse_int(record, 'daily_message_minute', 0, 0, 59),
+    )
+
+def read_csv(stream):
+    """Read (line number, record) pairs from a CSV text stream with a header row."""
+    reader = csv.DictReader(stream)
+    for record in reader:
+        yield reader.line_num, record
+
+def read_ndjson(stream):
+    """Read (line number, record) pairs from a newline-delimited JSON text stream."""
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+            continue
+        yield line_number, record if isinstance(record, dict) else ValueError("expected a JSON object")
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+def detect_format(name, default='csv'):
+    """Guess the record format from a file name or content type."""
+    name = (name or '').lower()
+    if name.endswith(('.ndjson', '.jsonl', '.json')) or 'json' in name:
+        return 'ndjson'
+    if name.endswith('.csv') or 'csv' in name:
+        return 'csv'
+    return default
+
+def import_couples(db_path, stream, record_format='csv', batch_size=BATCH_SIZE):
+    """
+    Upsert the couples read from a text stream.
+
+    Rows are validated one by one and written in batches of batch_size, one
+    transaction per batch. Secondary indexes are dropped first and rebuilt
+    once at the end. Invalid rows are skipped and reported.
+    """
+    connection = connect(db_path)
+    imported = 0
+    rejected = 0
+    errors = []
+    try:
+        connection.execute('PRAGMA synchronous=NORMAL')
+        for name in INDEXES:
+            connection.execute(f'DROP INDEX IF EXISTS {name}')
+
+        batch = []
+        for line_number, record in READERS[record_format](stream):
+            try:
+                if isinstance(record, Exception):
+                    raise ValueError(str(record))
+                batch.append(validate_couple(record))
+            except ValueError as e:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append(f"line {line_number}: {e}")
+                continue
+            if len(batch) >= batch_size:
+                imported += write_batch(connection, batch)
+                batch = []
+        if batch:
+            imported += write_batch(connection, batch)
+    finally:
+        for statement in INDEXES.values():
+            connection.execute(statement)
+        # Bump the data generation so snapshots of the old couples are ignored
+        connection.execute(f'PRAGMA user_version = {couples_generation(connection) + 1}')
+        connection.close()
+
+    logger.info(f"✅ Imported {imported} couples ({rejected} rejected)")
+    return {'imported': imported, 'rejected': rejected, 'errors': errors}
+
+def write_batch(connection, rows):
+    connection.execute('BEGIN')
+    try:
+        connection.executemany(UPSERT, rows)
+        connection.execute('COMMIT')
+    except Exception:
+        connection.execute('ROLLBACK')
+        raise
+    return len(rows)
+
+def couples_generation(connection):
+    """Get the import generation of the database (grows with every import)."""
+    return connection.execute('PRAGMA user_version').fetchone()[0]
+
+def database_generation(db_path):
+    connection = connect(db_path)
+    try:
+        return couples_generation(connection)
+    finally:
+        connection.close()
+
+def iter_couples(db_path, batch_size=10000):
+    """Iterate couple rows in group_id order, holding one batch in memory."""
+    connection = connect(db_path)
+    try:
+        cursor = connection.execute(f"SELECT {', '.join(FIELDS)} FROM couples ORDER BY group_id")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        connection.close()
+
+def export_couples(db_path, record_format='csv'):
+    """Stream the couples as CSV or NDJSON text chunks (constant memory)."""
+    if record_format == 'ndjson':
+        for row in iter_couples(db_path):
+            yield json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    for count, row in enumerate(iter_couples(db_path), 1):
+        writer.writerow(row)
+        if count % 1000 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def load_couple_store(db_path):
+    """Build a CoupleStore holding every couple in the database."""
+    store = CoupleStore()
+    for (group_id, start_date, partner1_name, partner2_name, partner1_birthday,
+         partner2_birthday, timezone, hour, minute) in iter_couples(db_path):
+        store.add(
+            group_id=group_id,
+            start_date=date.fromisoformat(start_date),
+            partner1_name=partner1_name,
+            partner2_name=partner2_name,
+            partner1_birthday=partner1_birthday,
+            partner2_birthday=partner2_birthday,
+            timezone=timezone,
+            send_minute=hour * 60 + minute
+        )
+    return store
+
+def main(argv):
+    """Command line: python couple_db.py import|export DB [FILE] [--format csv|ndjson]"""
+    arguments = argv[1:]
+    record_format = None
+    if '--format' in arguments:
+        position = arguments.index('--format')
+        record_format = arguments[position + 1] if position + 1 < len(arguments) else None
+        del arguments[position:position + 2]
+    if len(arguments) not in (2, 3) or arguments[0] not in ('import', 'export') or record_format not in (None, *READERS):
+        print(main.__doc__)
+        return 1
+
+    command, db_path = arguments[:2]
+    path = arguments[2] if len(arguments) == 3 else None
+    record_format = record_format or detect_format(path)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if command == 'import':
+        if path:
+            with open(path, encoding='utf-8', newline='') as stream:
+                report = import_couples(db_path, stream, record_format)
+        else:
+            report = import_couples(db_path, sys.stdin, record_format)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 0 if not report['rejected'] else 2
+
+    if path:
+        with open(path, 'w', encoding='utf-8', newline='') as output:
+            output.writelines(export_couples(db_path, record_format))
+    else:
+        sys.stdout.writelines(export_couples(db_path, record_format))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
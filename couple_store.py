@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Columnar in-memory couple store for the Telegram relationship bot.
+Keeps every couple's settings in compact typed columns instead of one object per couple.
+"""
+
+from array import array
+from bisect import bisect_left
+from datetime import date
+from functools import lru_cache
+import logging
+from utils import group_key
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, plain arrays are used without it
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Birthdays are stored as day-of-year in a leap reference year so 02-29 fits
+BIRTHDAY_REFERENCE_YEAR = 2000
+NO_BIRTHDAY = 0
+
+DEFAULT_TIMEZONE = 'Asia/Tehran'
+
+# Group ids from here on stand for channel usernames ('@chan'): the offset into
+# the store's username table. Telegram chat ids are far below it.
+USERNAME_ID_BASE = 1 << 62
+DEFAULT_SEND_MINUTE = 9 * 60
+
+@lru_cache(maxsize=512)
+def birthday_to_doy(birthday):
+    """Convert an MM-DD birthday string to a day-of-year number (0 if missing)."""
+    if not birthday:
+        return NO_BIRTHDAY
+    month, day = birthday.split('-')
+    return date(BIRTHDAY_REFERENCE_YEAR, int(month), int(day)).timetuple().tm_yday
+
+def doy_to_birthday(doy):
+    """Convert a stored day-of-year number back to an MM-DD birthday string."""
+    if doy == NO_BIRTHDAY:
+        return None
+    return date.fromordinal(date(BIRTHDAY_REFERENCE_YEAR, 1, 1).toordinal() + doy - 1).strftime('%m-%d')
+
+def date_to_doy(date_obj):
+    """Get the birthday day-of-year number that matches a calendar date."""
+    return date(BIRTHDAY_REFERENCE_YEAR, date_obj.month, date_obj.day).timetuple().tm_yday
+
+class StringTable:
+    """Interned string table mapping repeated strings to small integer ids."""
+
+    __slots__ = ('strings', '_ids')
+
+    def __init__(self, strings=()):
+        self.strings = []
+        self._ids = {}
+        for value in strings:
+            self.intern(value)
+
+    @classmethod
+    def from_sequence(cls, strings):
+        """
+        Wrap an already interned sequence (e.g. decoded lazily from a snapshot).
+        The id lookup dict is only built when a string is interned or looked up.
+        """
+        table = cls()
+        table.strings = strings
+        table._ids = None
+        return table
+
+    def _index(self):
+        if self._ids is None:
+            self.strings = list(self.strings)
+            self._ids = {value: string_id for string_id, value in enumerate(self.strings)}
+        return self._ids
+
+    def intern(self, value):
+        """Get the id for a string, adding it to the table if needed."""
+        ids = self._index()
+        string_id = ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            ids[value] = string_id
+        return string_id
+
+    def lookup(self, value):
+        """Get the id for a string without adding it, or None."""
+        return self._index().get(value)
+
+    def __getitem__(self, string_id):
+        return self.strings[string_id]
+
+    def __len__(self):
+        return len(self.strings)
+
+class CoupleView:
+    """Lightweight view of one couple in a CoupleStore, usable where a Config is expected."""
+
+    __slots__ = ('_store', 'index')
+
+    def __init__(self, store, index):
+        self._store = store
+        self.index = index
+
+    @property
+    def group_id(self):
+        return self._store.decode_group_id(self._store.group_ids[self.index])
+
+    @property
+    def relationship_start_date(self):
+        return date.fromordinal(self._store.start_ordinals[self.index])
+
+    @property
+    def partner1_name(self):
+        return self._store.names[self._store.partner1_name_ids[self.index]]
+
+    @property
+    def partner2_name(self):
+        return self._store.names[self._store.partner2_name_ids[self.index]]
+
+    @property
+    def partner1_birthday(self):
+        return doy_to_birthday(self._store.partner1_birthdays[self.index])
+
+    @property
+    def partner2_birthday(self):
+        return doy_to_birthday(self._store.partner2_birthdays[self.index])
+
+    @property
+    def timezone(self):
+        return self._store.timezones[self._store.timezone_ids[self.index]]
+
+    @property
+    def daily_message_hour(self):
+        return self._store.send_minutes[self.index] // 60
+
+    @property
+    def daily_message_minute(self):
+        return self._store.send_minutes[self.index] % 60
+
+    def is_partner_birthday(self, date_obj):
+        """Check if the given date is a partner's birthday."""
+        return self.get_birthday_partner_name(date_obj) is not None
+
+    def get_birthday_partner_name(self, date_obj):
+        """Get the name of the partner whose birthday it is."""
+        doy = date_to_doy(date_obj)
+        if doy == self._store.partner1_birthdays[self.index]:
+            return self.partner1_name
+        elif doy == self._store.partner2_birthdays[self.index]:
+            return self.partner2_name
+        return None
+
+    def __repr__(self):
+        return f"CoupleView(index={self.index}, group_id={self.group_id})"
+
+class CoupleStore:
+    """
+    Columnar store holding many couples.
+
+    Each field lives in its own typed array, partner names and timezones are
+    interned, and couples are addressed by their row index. A couple costs
+    about 28 bytes, so a million couples fit in roughly 30 MB. Channel
+    usernames used as group ids are interned too (see USERNAME_ID_BASE).
+
+    Columns may also be read-only memoryviews (a store restored from a
+    snapshot); they are copied into arrays the first time a couple is added.
+    """
+
+    def __init__(self):
+        self.group_ids = array('q')
+        self.start_ordinals = array('i')
+        self.partner1_birthdays = array('H')
+        self.partner2_birthdays = array('H')
+        self.timezone_ids = array('H')
+        self.send_minutes = array('H')
+        self.partner1_name_ids = array('I')
+        self.partner2_name_ids = array('I')
+        self.names = StringTable()
+        self.timezones = StringTable()
+        self.usernames = StringTable()
+        self._group_order = None
+        self._start_order = None
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a store holding the single couple described by a Config."""
+        store = cls()
+        store.add(
+            group_id=config.group_id,
+            start_date=config.relationship_start_date,
+            partner1_name=config.partner1_name,
+            partner2_name=config.partner2_name,
+            partner1_birthday=config.partner1_birthday,
+            partner2_birthday=config.partner2_birthday,
+            timezone=getattr(config, 'timezone', DEFAULT_TIMEZONE),
+            send_minute=config.daily_message_hour * 60 + config.daily_message_minute
+        )
+        return store
+
+    def add(self, group_id, start_date, partner1_name, partner2_name,
+            partner1_birthday=None, partner2_birthday=None,
+            timezone=DEFAULT_TIMEZONE, send_minute=DEFAULT_SEND_MINUTE):
+        """Add a couple and return its row index."""
+        self._make_writable()
+        self.group_ids.append(self.encode_group_id(group_id))
+        self.start_ordinals.append(start_date.toordinal())
+        self.partner1_birthdays.append(birthday_to_doy(partner1_birthday))
+        self.partner2_birthdays.append(birthday_to_doy(partner2_birthday))
+        self.timezone_ids.append(self.timezones.intern(timezone))
+        self.send_minutes.append(int(send_minute))
+        self.partner1_name_ids.append(self.names.intern(partner1_name))
+        self.partner2_name_ids.append(self.names.intern(partner2_name))
+        self._group_order = None
+        self._start_order = None
+        return len(self.group_ids) - 1
+
+    def encode_group_id(self, group_id):
+        """Get the group_ids column value of a chat id or channel username, interning usernames."""
+        key = group_key(group_id)
+        if isinstance(key, str):
+            if not key:
+                raise ValueError("Group id is empty")
+            return USERNAME_ID_BASE + self.usernames.intern(key)
+        if abs(key) >= USERNAME_ID_BASE:
+            raise ValueError(f"Group id {key} is out of range")
+        return key
+
+    def decode_group_id(self, value):
+        """Get the chat id or channel username stored as a group_ids column value."""
+        if value >= USERNAME_ID_BASE:
+            return self.usernames[value - USERNAME_ID_BASE]
+        return value
+
+    def _make_writable(self):
+        for name, column in self.columns().items():
+            if not isinstance(column, array):
+                writable = array(column.format)
+                writable.frombytes(column.cast('B'))
+                setattr(self, name, writable)
+
+    def __len__(self):
+        return len(self.group_ids)
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self.group_ids):
+            raise IndexError(f"Couple index {index} out of range")
+        return CoupleView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self.group_ids)):
+            yield CoupleView(self, index)
+
+    def columns(self):
+        """Get the typed columns of the store by name."""
+        return {
+            'group_ids': self.group_ids,
+            'start_ordinals': self.start_ordinals,
+            'partner1_birthdays': self.partner1_birthdays,
+            'partner2_birthdays': self.partner2_birthdays,
+            'timezone_ids': self.timezone_ids,
+            'send_minutes': self.send_minutes,
+            'partner1_name_ids': self.partner1_name_ids,
+            'partner2_name_ids': self.partner2_name_ids,
+        }
+
+    def memory_usage(self):
+        """Get the approximate number of bytes used by the columns."""
+        return sum(column.itemsize * len(column) for column in self.columns().values())
+
+    def group_order(self):
+        """Get the couple indices sorted by group id (the lookup index of find)."""
+        if self._group_order is None:
+            self._group_order = array('I', sorted(range(len(self.group_ids)), key=self.group_ids.__getitem__))
+        return self._group_order
+
+    def start_order(self):
+        """Get the couple indices sorted by start date (the milestone index)."""
+        if self._start_order is None:
+            self._start_order = array('I', sorted(range(len(self.start_ordinals)), key=self.start_ordinals.__getitem__))
+        return self._start_order
+
+    def set_indexes(self, group_order, start_order):
+        """Use prebuilt lookup and milestone indexes (e.g. from a snapshot)."""
+        self._group_order = group_order
+        self._start_order = start_order
+
+    def find(self, group_id):
+        """Find the couple for a group id, or None if it is not stored."""
+        group_order = self.group_order()
+        key = group_key(group_id)
+        if isinstance(key, str):
+            username_id = self.usernames.lookup(key)
+            if username_id is None:
+                return None
+            group_id = USERNAME_ID_BASE + username_id
+        else:
+            group_id = key
+        position = bisect_left(group_order, group_id, key=self.group_ids.__getitem__)
+        if position < len(group_order):
+            index = group_order[position]
+            if self.group_ids[index] == group_id:
+                return CoupleView(self, index)
+        return None
+
+    def column(self, name):
+        """Get a column as a NumPy array (zero copy) when NumPy is available."""
+        column = self.columns()[name]
+        if np is None or not len(column):
+            return column
+        return np.frombuffer(column, dtype=getattr(column, 'typecode', None) or column.format)
+
+    def days_together(self, today_ordinal):
+        """Get the day count of every couple for a given date ordinal."""
+        if np is not None:
+            return today_ordinal - self.column('start_ordinals') + 1
+        return array('i', (today_ordinal - start + 1 for start in self.start_ordinals))
+
+    def indices_with_days(self, today_ordinal, day_counts):
+        """Get the indices of couples whose day count is one of day_counts."""
+        if np is not None:
+            days = self.days_together(today_ordinal)
+            return np.nonzero(np.isin(days, list(day_counts)))[0]
+
+        # Couples reaching a day count started on one date, a range of the milestone index
+        start_order = self.start_order()
+        key = self.start_ordinals.__getitem__
+        indices = []
+        for start in sorted({today_ordinal - count + 1 for count in day_counts}):
+            position = bisect_left(start_order, start, key=key)
+            while position < len(start_order) and key(start_order[position]) == start:
+                indices.append(start_order[position])
+                position += 1
+        return sorted(indices)
+
+    def birthday_indices(self, date_obj):
+        """Get the indices of couples where a partner has a birthday on date_obj."""
+        doy = date_to_doy(date_obj)
+        if np is not None and len(self.group_ids):
+            mask = (self.column('partner1_birthdays') == doy) | (self.column('partner2_birthdays') == doy)
+            return np.nonzero(mask)[0]
+
+        return [
+            index for index in range(len(self.group_ids))
+            if self.partner1_birthdays[index] == doy or self.partner2_birthdays[index] == doy
+        ]
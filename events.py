@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Custom couple events for the Telegram relationship bot.
+Couples register their own yearly dates (first-date anniversary), monthly
+dates (date night) and one-off countdowns (a trip) with commands. Events are
+stored in SQLite and expanded into a date-bucketed calendar index, so finding
+every event due on a day costs time proportional to the events found. The
+index is rebuilt when another connection changes the table.
+"""
+
+import calendar
+import logging
+import sqlite3
+import threading
+from datetime import date
+import telebot
+from i18n import get_catalog
+from utils import group_key, validate_date_format
+
+logger = logging.getLogger(__name__)
+
+YEARLY = 'yearly'
+MONTHLY = 'monthly'
+ONCE = 'once'
+
+# Days before a one-off event when a countdown reminder is sent (0 = the day itself)
+COUNTDOWN_DAYS = (30, 7, 3, 1, 0)
+
+MAX_EVENTS_PER_GROUP = 50
+MAX_TITLE_LENGTH = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    group_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    year INTEGER,
+    month INTEGER,
+    day INTEGER NOT NULL,
+    title TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_group ON events (group_id);
+"""
+
+class Event:
+    """One registered event of a couple."""
+
+    __slots__ = ('id', 'group_id', 'kind', 'year', 'month', 'day', 'title')
+
+    def __init__(self, id, group_id, kind, year, month, day, title):
+        self.id = id
+        self.group_id = group_id
+        self.kind = kind
+        self.year = year
+        self.month = month
+        self.day = day
+        self.title = title
+
+    def next_date(self, today):
+        """Get the next date (today included) the event falls on, or None if it has passed."""
+        if self.kind == ONCE:
+            event_date = date(self.year, self.month, self.day)
+            return event_date if event_date >= today else None
+
+        if self.kind == MONTHLY:
+            year, month = today.year, today.month
+            for _ in range(2):
+                candidate = date(year, month, min(self.day, calendar.monthrange(year, month)[1]))
+                if candidate >= today:
+                    return candidate
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+        for year in (today.year, today.year + 1):
+            day = self.day if self.day <= calendar.monthrange(year, self.month)[1] else 28
+            candidate = date(year, self.month, day)
+            if candidate >= today:
+                return candidate
+        return None
+
+def parse_event(arguments):
+    """Parse '/addevent' arguments into (kind, year, month, day, title)."""
+    parts = (arguments or '').split(maxsplit=2)
+    if len(parts) < 3:
+        raise ValueError("expected a kind, a date and a title")
+    kind, when, title = parts[0].lower(), parts[1], parts[2].strip()
+    if len(title) > MAX_TITLE_LENGTH:
+        raise ValueError("title is too long")
+
+    if kind == MONTHLY:
+        if not when.isdigit() or not 1 <= int(when) <= 31:
+            raise ValueError("monthly events need a day of month (1-31)")
+        return kind, None, None, int(when), title
+
+    if kind == YEARLY:
+        if validate_date_format(when):
+            year, month, day = (int(part) for part in when.split('-'))
+            return kind, year, month, day, title
+        # MM-DD, checked in a leap year so 02-29 is accepted
+        if len(when) == 5 and validate_date_format(f"2000-{when}"):
+            month, day = (int(part) for part in when.split('-'))
+            return kind, None, month, day, title
+        raise ValueError("yearly events need MM-DD or YYYY-MM-DD")
+
+    if kind == ONCE:
+        if not validate_date_format(when):
+            raise ValueError("one-off events need YYYY-MM-DD")
+        year, month, day = (int(part) for part in when.split('-'))
+        return kind, year, month, day, title
+
+    raise ValueError(f"unknown event kind {kind!r}")
+
+class EventCalendar:
+    """
+    Events of every couple with a date-bucketed index.
+
+    Yearly events are bucketed by (month, day), monthly events by day of
+    month, and one-off events by the date ordinal of each countdown reminder,
+    so due_on() reads only the buckets of one date.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.events = {}
+        self.by_group = {}
+        self.yearly = {}
+        self.monthly = {}
+        self.once = {}
+        self._lock = threading.Lock()
+        self._due_cache = {}
+        self._version = 0
+        # One connection for every read and write: its data_version then only
+        # changes when another connection (interactive_bot, another process) writes
+        self._connection = self.connect()
+        self._data_version = None
+        with self._lock:
+            self._reload()
+        logger.info(f"✅ Loaded {len(self.events)} couple events")
+
+    def connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(SCHEMA)
+        return connection
+
+    def _reload(self):
+        """Rebuild the index from the database if another connection changed it (lock held)."""
+        data_version = self._connection.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == self._data_version:
+            return False
+        rows = self._connection.execute('SELECT id, group_id, kind, year, month, day, title FROM events').fetchall()
+        for index in (self.events, self.by_group, self.yearly, self.monthly, self.once):
+            index.clear()
+        for row in rows:
+            self._index(Event(*row))
+        self._version += 1
+        self._due_cache.clear()
+        self._data_version = data_version
+        return True
+
+    def refresh(self):
+        """Pick up events added or removed by other connections; returns True if any changed."""
+        with self._lock:
+            changed = self._reload()
+        if changed:
+            logger.info(f"🔄 Reloaded {len(self.events)} couple events changed elsewhere")
+        return changed
+
+    def _buckets(self, event):
+        """Get the (index, key) buckets an event is expanded into."""
+        if event.kind == YEARLY:
+            return [(self.yearly, (event.month, event.day))]
+        if event.kind == MONTHLY:
+            return [(self.monthly, event.day)]
+        ordinal = date(event.year, event.month, event.day).toordinal()
+        return [(self.once, ordinal - days) for days in COUNTDOWN_DAYS]
+
+    def _index(self, event):
+        self.events[event.id] = event
+        self.by_group.setdefault(event.group_id, set()).add(event.id)
+        for index, key in self._buckets(event):
+            index.setdefault(key, set()).add(event.id)
+        self._version += 1
+        self._due_cache.clear()
+
+    def _unindex(self, event):
+        del self.events[event.id]
+        self.by_group[event.group_id].discard(event.id)
+        for index, key in self._buckets(event):
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.discard(event.id)
+                if not bucket:
+                    del index[key]
+        self._version += 1
+        self._due_cache.clear()
+
+    def add(self, group_id, kind, year, month, day, title):
+        """Register an event for a group and return it."""
+        group_id = group_key(group_id)
+        with self._lock:
+            self._reload()
+            if len(self.by_group.get(group_id, ())) >= MAX_EVENTS_PER_GROUP:
+                raise ValueError(f"a group can have at most {MAX_EVENTS_PER_GROUP} events")
+            cursor = self._connection.execute(
+                'INSERT INTO events (group_id, kind, year, month, day, title) VALUES (?, ?, ?, ?, ?, ?)',
+                (group_id, kind, year, month, day, title))
+            event = Event(cursor.lastrowid, group_id, kind, year, month, day, title)
+            self._index(event)
+        return event
+
+    def remove(self, group_id, event_id):
+        """Remove a group's event. Returns False if the group has no such event."""
+        with self._lock:
+            self._reload()
+            event = self.events.get(event_id)
+            if event is None or event.group_id != group_key(group_id):
+                return False
+            self._connection.execute('DELETE FROM events WHERE id = ?', (event_id,))
+            self._unindex(event)
+        return True
+
+    def for_group(self, group_id):
+        """Get a group's events, in registration order."""
+        with self._lock:
+            self._reload()
+            return [self.events[event_id] for event_id in sorted(self.by_group.get(group_key(group_id), ()))]
+
+    def due_on(self, date_obj):
+        """Get (event, days left) for every event of every couple due on a date."""
+        year, month, day = date_obj.year, date_obj.month, date_obj.day
+        month_length = calendar.monthrange(year, month)[1]
+        ordinal = date_obj.toordinal()
+        with self._lock:
+            event_ids = set(self.yearly.get((month, day), ()))
+            if month == 2 and day == 28 and month_length == 28:
+                # 02-29 anniversaries are celebrated on 02-28 in common years
+                event_ids.update(self.yearly.get((2, 29), ()))
+            event_ids.update(self.monthly.get(day, ()))
+            if day == month_length:
+                # Monthly events on days this month doesn't have fall on its last day
+                for missing_day in range(month_length + 1, 32):
+                    event_ids.update(self.monthly.get(missing_day, ()))
+
+            due = [(self.events[event_id], 0) for event_id in event_ids]
+            for event_id in self.once.get(ordinal, ()):
+                event = self.events[event_id]
+                due.append((event, date(event.year, event.month, event.day).toordinal() - ordinal))
+        return due
+
+    def due_for_group(self, group_id, date_obj):
+        """Get a group's events due on a date, from a per-date grouping of due_on()."""
+        self.refresh()
+        with self._lock:
+            grouped = self._due_cache.get(date_obj)
+            version = self._version
+        if grouped is None:
+            grouped = {}
+            for event, days_left in self.due_on(date_obj):
+                grouped.setdefault(event.group_id, []).append((event, days_left))
+            with self._lock:
+                # Only cache if no event changed while grouping
+                if self._version == version:
+                    if len(self._due_cache) > 8:
+                        self._due_cache.clear()
+                    self._due_cache[date_obj] = grouped
+        return grouped.get(group_key(group_id), [])
+
+_calendars = {}
+_calendars_lock = threading.Lock()
+
+def get_event_calendar(db_path):
+    """Get the shared event calendar for a database, loading it on first use."""
+    with _calendars_lock:
+        events = _calendars.get(db_path)
+        if events is None:
+            events = _calendars[db_path] = EventCalendar(db_path)
+    return events
+
+def describe_event(event, today, language=None):
+    """Describe an event for the /events list."""
+    catalog = get_catalog(language)
+    next_date = event.next_date(today)
+    if event.kind == MONTHLY:
+        when = catalog.text('events.when.monthly', day=event.day)
+    elif event.kind == YEARLY:
+        when = catalog.text('events.when.yearly', date=f"{event.month:02d}-{event.day:02d}")
+    else:
+        when = f"{event.year}-{event.month:02d}-{event.day:02d}"
+    if next_date is None:
+        left = catalog.text('events.passed')
+    else:
+        days_left = (next_date - today).days
+        left = catalog.text('events.today') if days_left == 0 else catalog.text('events.days_left', days=days_left)
+    return catalog.text('events.item', id=event.id, title=event.title, when=when, left=left)
+
+def format_event_message(event, days_left, today, language=None):
+    """Format the message sent when an event is due."""
+    catalog = get_catalog(language)
+    if event.kind == ONCE and days_left > 0:
+        return catalog.text('events.countdown', days=days_left, title=event.title)
+    if event.kind == YEARLY and event.year:
+        years = today.year - event.year
+        if years > 0:
+            return catalog.text('events.anniversary', years=years, title=event.title)
+    if event.kind == MONTHLY:
+        return catalog.text('events.monthly', title=event.title)
+    return catalog.text('events.due', title=event.title)
+
+def register_event_handlers(bot, api, events, today, languages):
+    """
+    Register the /addevent, /events and /delevent commands. today(chat_id)
+    gives the local date, languages (see i18n.LanguagePreferences) the chat's language.
+    """
+
+    @bot.message_handler(commands=['addevent'])
+    def handle_add_event(message):
+        """Handle /addevent command."""
+        language = languages.get(message.chat.id)
+        catalog = get_catalog(language)
+        try:
+            kind, year, month, day, title = parse_event(telebot.util.extract_arguments(message.text))
+            if kind == ONCE and date(year, month, day) < today(message.chat.id):
+                raise ValueError("one-off event date has passed")
+            if kind == YEARLY and year and date(year, month, day) > today(message.chat.id):
+                # The years of an anniversary are counted from its first date
+                raise ValueError("yearly event date is in the future")
+            event = events.add(message.chat.id, kind, year, month, day, title)
+            described = describe_event(event, today(message.chat.id), language)
+            api.reply_to(message, catalog.text('events.added', event=described))
+        except ValueError as e:
+            logger.info(f"Rejected event: {e}")
+            api.reply_to(message, catalog.text('events.invalid', usage=catalog.text('events.usage')))
+        except Exception as e:
+            logger.error(f"Error handling addevent command: {e}")
+            api.reply_to(message, catalog.text('events.error.add'))
+
+    @bot.message_handler(commands=['events'])
+    def handle_events(message):
+        """Handle /events command."""
+        language = languages.get(message.chat.id)
+        catalog = get_catalog(language)
+        try:
+            group_events = events.for_group(message.chat.id)
+            if not group_events:
+                api.reply_to(message, catalog.text('events.none', usage=catalog.text('events.usage')))
+                return
+            local_today = today(message.chat.id)
+            lines = [describe_event(event, local_today, language) for event in group_events]
+            api.reply_to(message, catalog.text('events.list', events='\n'.join(lines)))
+        except Exception as e:
+            logger.error(f"Error handling events command: {e}")
+            api.reply_to(message, catalog.text('events.error.list'))
+
+    @bot.message_handler(commands=['delevent'])
+    def handle_delete_event(message):
+        """Handle /delevent command."""
+        catalog = languages.catalog(message.chat.id)
+        try:
+            argument = (telebot.util.extract_arguments(message.text) or '').strip()
+            if argument.isdigit() and events.remove(message.chat.id, int(argument)):
+                api.reply_to(message, catalog.text('events.removed'))
+            else:
+                api.reply_to(message, catalog.text('events.not_found'))
+        except Exception as e:
+            logger.error(f"Error handling delevent command: {e}")
+            api.reply_to(message, catalog.text('events.error.remove'))
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Localization for the Telegram relationship bot.
+User-facing texts live in per-language catalogs (locales/<language>.tsv),
+compiled ahead of time into the binary corpus format (see corpus.py) and
+memory-mapped lazily, one language at a time, on first use.
+
+Catalog sources use the corpus source format, key<TAB>language<TAB>text, with
+\\n for line breaks. A key repeated on several lines holds variants that are
+picked per couple and day (greetings, closings, ...). Texts are str.format
+templates.
+"""
+
+import glob
+import logging
+import os
+import sqlite3
+import threading
+from corpus import load_corpus
+from jalali import format_jalali_date
+from message_selection import choose
+from utils import group_key, rebuild_integer_key_table
+
+logger = logging.getLogger(__name__)
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locales')
+DEFAULT_LANGUAGE = 'fa'
+
+def unescape(text):
+    return text.replace('\\n', '\n')
+
+class Catalog:
+    """Texts of one language. Each text is decoded once and then served from a dict."""
+
+    def __init__(self, language, corpus, fallback=None):
+        self.language = language
+        self.corpus = corpus
+        self.fallback = fallback
+        self._texts = {}
+        self._variants = {}
+
+    def __contains__(self, key):
+        return key in self.corpus.categories or (self.fallback is not None and key in self.fallback)
+
+    def variants(self, key):
+        """Get all variants of a text."""
+        variants = self._variants.get(key)
+        if variants is None:
+            if key not in self.corpus.categories:
+                if self.fallback is None:
+                    raise KeyError(f"No text {key!r} in the {self.language} catalog")
+                return self.fallback.variants(key)
+            variants = tuple(unescape(text) for text in self.corpus.category(key))
+            self._variants[key] = variants
+        return variants
+
+    def text(self, key, **values):
+        """Get a text, formatted with values."""
+        text = self._texts.get(key)
+        if text is None:
+            text = self._texts[key] = self.variants(key)[0]
+        return text.format(**values) if values else text
+
+    def choose(self, key, couple_key, day, slot=None, **values):
+        """Get the variant of a text picked for a couple on a day, formatted with values."""
+        text = choose(self.variants(key), couple_key, day, slot or key)
+        return text.format(**values) if values else text
+
+    def format_date(self, date_obj):
+        """Format a date with its weekday in this language's calendar."""
+        weekday = self.variants('weekday')[date_obj.weekday()]
+        if self.text('meta.calendar') == 'jalali':
+            formatted = format_jalali_date(date_obj)
+        else:
+            formatted = f"{date_obj.day} {self.variants('month')[date_obj.month - 1]} {date_obj.year}"
+        return f"{weekday} {formatted}"
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def available_languages():
+    """Get the codes of the languages with a catalog."""
+    return sorted(
+        os.path.splitext(os.path.basename(path))[0]
+        for path in glob.glob(os.path.join(LOCALES_DIR, '*.tsv'))
+    )
+
+def get_catalog(language=None):
+    """Get the catalog of a language (the default language if unknown), loading it on first use."""
+    language = language or DEFAULT_LANGUAGE
+    catalog = _catalogs.get(language)
+    if catalog is not None:
+        return catalog
+
+    # Language codes come from users, so only plain codes map to catalog files
+    source = os.path.join(LOCALES_DIR, f"{language}.tsv")
+    if not language.isalpha() or not os.path.exists(source):
+        if language == DEFAULT_LANGUAGE:
+            raise FileNotFoundError(f"Missing default catalog {source}")
+        return get_catalog(DEFAULT_LANGUAGE)
+
+    # Missing keys fall back to the default language
+    fallback = None if language == DEFAULT_LANGUAGE else get_catalog(DEFAULT_LANGUAGE)
+    with _catalogs_lock:
+        catalog = _catalogs.get(language)
+        if catalog is None:
+            corpus = load_corpus(source, os.path.join(LOCALES_DIR, f"{language}.catalog"))
+            catalog = _catalogs[language] = Catalog(language, corpus, fallback)
+            logger.info(f"✅ Loaded {language} catalog ({len(corpus.categories)} texts)")
+    return catalog
+
+def t(language, key, **values):
+    """Get a text in a language, formatted with values."""
+    return get_catalog(language).text(key, **values)
+
+class LanguagePreferences:
+    """Language chosen by each chat, kept in memory and stored in SQLite."""
+
+    # chat_id is a chat id or a channel username, so it is not a rowid alias
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS chat_languages (
+        chat_id NOT NULL PRIMARY KEY,
+        language TEXT NOT NULL
+    ) WITHOUT ROWID;
+    """
+
+    def __init__(self, db_path, default=DEFAULT_LANGUAGE):
+        self.db_path = db_path
+        self.default = default
+        self._lock = threading.Lock()
+        connection = self.connect()
+        try:
+            self.languages = dict(connection.execute('SELECT chat_id, language FROM chat_languages'))
+        finally:
+            connection.close()
+
+    def connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(self.SCHEMA)
+        rebuild_integer_key_table(connection, 'chat_languages', self.SCHEMA)
+        return connection
+
+    def get(self, chat_id):
+        """Get a chat's language."""
+        return self.languages.get(group_key(chat_id), self.default)
+
+    def catalog(self, chat_id):
+        """Get the catalog of a chat's language."""
+        return get_catalog(self.get(chat_id))
+
+    def set(self, chat_id, language):
+        """Store a chat's language."""
+        chat_id = group_key(chat_id)
+        with self._lock:
+            connection = self.connect()
+            try:
+                connection.execute(
+                    'INSERT OR REPLACE INTO chat_languages (chat_id, language) VALUES (?, ?)',
+                    (chat_id, language))
+            finally:
+                connection.close()
+            self.languages[chat_id] = language
+
+_preferences = {}
+_preferences_lock = threading.Lock()
+
+def get_language_preferences(db_path, default=DEFAULT_LANGUAGE):
+    """Get the shared language preferences stored in a database."""
+    with _preferences_lock:
+        preferences = _preferences.get(db_path)
+        if preferences is None:
+            preferences = _preferences[db_path] = LanguagePreferences(db_path, default)
+    return preferences
+
+def register_language_handler(bot, api, languages):
+    """Register the /language command."""
+    # telebot is only needed by the bots, not by the renderer or status page
+    import telebot
+
+    @bot.message_handler(commands=['language'])
+    def handle_language(message):
+        """Handle /language command - show or change the chat's language."""
+        catalog = languages.catalog(message.chat.id)
+        try:
+            choices = '\n'.join(
+                f"{code} - {get_catalog(code).text('meta.name')}" for code in available_languages())
+            requested = (telebot.util.extract_arguments(message.text) or '').strip().lower()
+            if not requested:
+                api.reply_to(message, catalog.text('language.current', name=catalog.text('meta.name'), languages=choices))
+            elif requested in available_languages():
+                languages.set(message.chat.id, requested)
+                catalog = get_catalog(requested)
+                api.reply_to(message, catalog.text('language.changed', name=catalog.text('meta.name')))
+            else:
+                api.reply_to(message, catalog.text('language.unknown', languages=choices))
+        except Exception as e:
+            logger.error(f"Error handling language command: {e}")
+            api.reply_to(message, catalog.text('error.language'))
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Jalali (Persian) calendar for the Telegram relationship bot.
+Converts dates through a precomputed ordinal -> (year, month, day) table and
+computes exact Jalali durations between dates.
+"""
+
+from array import array
+from datetime import date
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+JALALI_MONTHS = (
+    'فروردین', 'اردیبهشت', 'خرداد', 'تیر', 'مرداد', 'شهریور',
+    'مهر', 'آبان', 'آذر', 'دی', 'بهمن', 'اسفند'
+)
+
+PERSIAN_DIGITS = str.maketrans('0123456789', '۰۱۲۳۴۵۶۷۸۹')
+
+# Years covered by the lookup table (about 1921-2121); other dates are computed directly
+TABLE_FIRST_YEAR = 1300
+TABLE_LAST_YEAR = 1500
+
+# Jalali years where the 33-year leap cycle shifts (Borkowski's algorithm)
+BREAKS = (
+    -61, 9, 38, 199, 426, 686, 756, 818, 1111, 1181, 1210,
+    1635, 2060, 2097, 2192, 2262, 2324, 2394, 2456, 3178
+)
+
+def _div(a, b):
+    # Integer division truncating toward zero, as the reference algorithm expects
+    return int(a / b)
+
+def _mod(a, b):
+    return a - _div(a, b) * b
+
+def _jal_cal(jy):
+    """Get (is_leap, gregorian year, March day of Farvardin 1) for a Jalali year."""
+    gy = jy + 621
+    leap_j = -14
+    jp = BREAKS[0]
+    jump = 0
+    for jm in BREAKS[1:]:
+        jump = jm - jp
+        if jy < jm:
+            break
+        leap_j += _div(jump, 33) * 8 + _div(_mod(jump, 33), 4)
+        jp = jm
+
+    n = jy - jp
+    leap_j += _div(n, 33) * 8 + _div(_mod(n, 33) + 3, 4)
+    if _mod(jump, 33) == 4 and jump - n == 4:
+        leap_j += 1
+
+    leap_g = _div(gy, 4) - _div((_div(gy, 100) + 1) * 3, 4) - 150
+    march = 20 + leap_j - leap_g
+
+    if jump - n < 6:
+        n = n - jump + _div(jump + 4, 33) * 33
+    leap = _mod(_mod(n + 1, 33) - 1, 4)
+    if leap == -1:
+        leap = 4
+    return leap == 0, gy, march
+
+def year_start_ordinal(jy):
+    """Get the Gregorian ordinal of 1 Farvardin of a Jalali year."""
+    _, gy, march = _jal_cal(jy)
+    return date(gy, 3, march).toordinal()
+
+def month_length(jy, jm):
+    """Get the number of days in a Jalali month."""
+    if jm <= 6:
+        return 31
+    if jm <= 11:
+        return 30
+    return 30 if _jal_cal(jy)[0] else 29
+
+class JalaliTable:
+    """Packed (year << 9 | month << 5 | day) value for every day in the table range."""
+
+    def __init__(self, first_year=TABLE_FIRST_YEAR, last_year=TABLE_LAST_YEAR):
+        self.first_ordinal = year_start_ordinal(first_year)
+        self.end_ordinal = year_start_ordinal(last_year + 1)
+        self.packed = array('I')
+        for jy in range(first_year, last_year + 1):
+            for jm in range(1, 13):
+                base = (jy << 9) | (jm << 5)
+                self.packed.extend(base | jd for jd in range(1, month_length(jy, jm) + 1))
+
+    def lookup(self, ordinal):
+        """Get (year, month, day) for a Gregorian ordinal, or None outside the table."""
+        if not self.first_ordinal <= ordinal < self.end_ordinal:
+            return None
+        value = self.packed[ordinal - self.first_ordinal]
+        return value >> 9, (value >> 5) & 0xF, value & 0x1F
+
+_table = None
+_table_lock = threading.Lock()
+
+def _get_table():
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = JalaliTable()
+    return _table
+
+def to_jalali(date_obj):
+    """Convert a Gregorian date to a (year, month, day) Jalali tuple."""
+    ordinal = date_obj.toordinal()
+    result = _get_table().lookup(ordinal)
+    if result is not None:
+        return result
+
+    # Outside the table: find the year and walk the months
+    jy = date_obj.year - 621
+    if ordinal < year_start_ordinal(jy):
+        jy -= 1
+    day_of_year = ordinal - year_start_ordinal(jy)
+    jm = 1
+    while day_of_year >= month_length(jy, jm):
+        day_of_year -= month_length(jy, jm)
+        jm += 1
+    return jy, jm, day_of_year + 1
+
+def from_jalali(jy, jm, jd):
+    """Convert a Jalali date to a Gregorian date."""
+    if not 1 <= jm <= 12 or not 1 <= jd <= month_length(jy, jm):
+        raise ValueError(f"Invalid Jalali date: {jy}-{jm}-{jd}")
+    ordinal = year_start_ordinal(jy) + sum(month_length(jy, month) for month in range(1, jm)) + jd - 1
+    return date.fromordinal(ordinal)
+
+def jalali_difference(start_date, end_date):
+    """
+    Get the exact (years, months, days) between two dates in the Jalali calendar,
+    borrowing the real length of the month before end_date's month.
+    """
+    y1, m1, d1 = to_jalali(start_date)
+    y2, m2, d2 = to_jalali(end_date)
+
+    years = y2 - y1
+    months = m2 - m1
+    days = d2 - d1
+    if days < 0:
+        months -= 1
+        previous_year, previous_month = (y2, m2 - 1) if m2 > 1 else (y2 - 1, 12)
+        days += month_length(previous_year, previous_month)
+    if months < 0:
+        years -= 1
+        months += 12
+    return years, months, days
+
+def to_persian_digits(value):
+    """Convert the ASCII digits of a value to Persian digits."""
+    return str(value).translate(PERSIAN_DIGITS)
+
+def month_name(month_number):
+    """Get the Persian name of a Jalali month."""
+    if 1 <= month_number <= 12:
+        return JALALI_MONTHS[month_number - 1]
+    return 'نامشخص'
+
+def format_jalali_date(date_obj):
+    """Format a date as a Persian Jalali date, e.g. ۱ تیر ۱۴۰۴."""
+    jy, jm, jd = to_jalali(date_obj)
+    return f"{to_persian_digits(jd)} {JALALI_MONTHS[jm - 1]} {to_persian_digits(jy)}"
+
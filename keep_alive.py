@@ -4,23 +4,34 @@ Keep-alive server for the Telegram relationship bot.
 Runs a simple Flask server to keep the bot alive on Replit.
 """
 
-from flask import Flask, jsonify, render_template_string
+from flask import Flask, Response, jsonify, render_template_string, request
+import hmac
+import io
+import os
 import threading
 import logging
 from datetime import datetime
+from config import Config
+from supervisor import get_supervisor
+from analytics import ANALYTICS
+from couple_db import detect_format, export_couples, import_couples
+from scheduler import COUPLES_RELOAD_INTERVAL
+from i18n import get_catalog
+from memory_profile import MEMORY_PROFILER, TRACE_FRAMES
+from utils import group_key
 
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Simple HTML template for the status page
+# Simple HTML template for the status page, texts from the language catalog
 HTML_TEMPLATE = """
 <!DOCTYPE html>
-<html lang="fa" dir="rtl">
+<html lang="{{ language }}" dir="{{ t('meta.direction') }}">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>ربات عاشقانه تلگرام</title>
+    <title>{{ t('web.title') }}</title>
     <style>
         body {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
@@ -74,18 +85,18 @@ HTML_TEMPLATE = """
 <body>
     <div class="container">
         <div class="emoji">💕</div>
-        <h1>ربات عاشقانه تلگرام</h1>
+        <h1>{{ t('web.title') }}</h1>
         <div class="status">
-            ✅ ربات فعال و در حال اجرا است
+            {{ t('web.status') }}
         </div>
         <div class="info">
-            <p><strong>📅 تاریخ:</strong> {{ current_date }}</p>
-            <p><strong>⏰ زمان:</strong> {{ current_time }}</p>
-            <p><strong>🤖 وضعیت:</strong> آنلاین</p>
-            <p><strong>💌 پیام روزانه:</strong> فعال</p>
+            <p><strong>{{ t('web.date') }}</strong> {{ current_date }}</p>
+            <p><strong>{{ t('web.time') }}</strong> {{ current_time }}</p>
+            <p><strong>{{ t('web.state') }}</strong> {{ t('web.online') }}</p>
+            <p><strong>{{ t('web.daily') }}</strong> {{ t('web.active') }}</p>
         </div>
         <div class="time">
-            آخرین بروزرسانی: {{ current_datetime }}
+            {{ t('web.updated') }} {{ current_datetime }}
         </div>
     </div>
 </body>
@@ -94,10 +105,13 @@ HTML_TEMPLATE = """
 
 @app.route('/')
 def home():
-    """Home page showing bot status."""
+    """Home page showing bot status, in the ?lang= language (default: LANGUAGE)."""
     try:
         now = datetime.now()
+        catalog = get_catalog(request.args.get('lang') or os.getenv('LANGUAGE'))
         return render_template_string(HTML_TEMPLATE, 
+                                    language=catalog.language,
+                                    t=catalog.text,
                                     current_date=now.strftime('%Y-%m-%d'),
                                     current_time=now.strftime('%H:%M:%S'),
                                     current_datetime=now.strftime('%Y-%m-%d %H:%M:%S'))
@@ -109,11 +123,14 @@ def home():
 def status():
     """API endpoint for bot status."""
     try:
+        supervisor = get_supervisor()
+        components = supervisor.status() if supervisor else {}
         return jsonify({
             'status': 'online',
             'message': 'Telegram Relationship Bot is running',
             'timestamp': datetime.now().isoformat(),
-            'uptime': 'Running'
+            'uptime': 'Running',
+            'components': components
         })
     except Exception as e:
         logger.error(f"❌ Error in status endpoint: {e}")
@@ -121,11 +138,140 @@ def status():
 
 @app.route('/health')
 def health():
-    """Health check endpoint."""
+    """Health check endpoint, 503 when a supervised component is down or stalled."""
+    supervisor = get_supervisor()
+    components = supervisor.status() if supervisor else {}
+    healthy = all(component['healthy'] for component in components.values())
     return jsonify({
-        'status': 'healthy',
-        'timestamp': datetime.now().isoformat()
-    })
+        'status': 'healthy' if healthy else 'unhealthy',
+        'timestamp': datetime.now().isoformat(),
+        'components': components
+    }), 200 if healthy else 503
+
+@app.route('/stats')
+def stats():
+    """Engagement totals and top quotes, or one group's counts with ?group_id=."""
+    try:
+        group_id = request.args.get('group_id')
+        if group_id is not None:
+            return jsonify({'group_id': group_key(group_id), 'events': ANALYTICS.group_stats(group_id)})
+        return jsonify(ANALYTICS.summary())
+    except Exception as e:
+        logger.error(f"❌ Error in stats endpoint: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/metrics')
+def metrics():
+    """Process memory, thread and GC stats, with the top allocation growth when profiling."""
+    try:
+        return jsonify(MEMORY_PROFILER.report())
+    except Exception as e:
+        logger.error(f"❌ Error in metrics endpoint: {e}")
+        return jsonify({'error': str(e)}), 500
+
+_config = None
+
+def get_config():
+    global _config
+    if _config is None:
+        _config = Config()
+    return _config
+
+def admin_error():
+    """Get an error response unless the request carries the admin token."""
+    config = get_config()
+    if not config.admin_token:
+        return jsonify({'error': 'admin endpoints are disabled'}), 404
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not hmac.compare_digest(supplied.encode('utf-8'), config.admin_token.encode('utf-8')):
+        return jsonify({'error': 'unauthorized'}), 401
+    return None
+
+def couples_error():
+    """Get an error response unless COUPLES_DB is configured."""
+    if not get_config().couples_db:
+        return jsonify({'error': 'COUPLES_DB is not configured'}), 404
+    return None
+
+@app.route('/admin/couples/import', methods=['POST'])
+def admin_import_couples():
+    """
+    Stream-import couples from a CSV or NDJSON request body. The running
+    scheduler and bot commands pick them up within COUPLES_RELOAD_INTERVAL seconds.
+    """
+    error = admin_error() or couples_error()
+    if error:
+        return error
+    record_format = request.args.get('format') or detect_format(request.content_type)
+    if record_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    try:
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        result = import_couples(get_config().couples_db, stream, record_format)
+        return jsonify(dict(result, scheduled_within_seconds=COUPLES_RELOAD_INTERVAL))
+    except Exception as e:
+        logger.error(f"❌ Error importing couples: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/couples/export')
+def admin_export_couples():
+    """Stream all couples as CSV or NDJSON (?format=)."""
+    error = admin_error() or couples_error()
+    if error:
+        return error
+    record_format = request.args.get('format', 'csv')
+    if record_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    mimetype = 'text/csv' if record_format == 'csv' else 'application/x-ndjson'
+    return Response(export_couples(get_config().couples_db, record_format), mimetype=f"{mimetype}; charset=utf-8")
+
+@app.route('/admin/memory/start', methods=['POST'])
+def admin_memory_start():
+    """Start allocation tracing (?interval= seconds, ?top= sites, ?frames= per allocation)."""
+    error = admin_error()
+    if error:
+        return error
+    try:
+        config = get_config()
+        interval = int(request.args.get('interval', config.memory_profile_interval))
+        top = int(request.args.get('top', config.memory_profile_top))
+        frames = int(request.args.get('frames', TRACE_FRAMES))
+    except ValueError:
+        return jsonify({'error': 'interval, top and frames must be integers'}), 400
+    if interval < 1 or top < 1 or frames < 1:
+        return jsonify({'error': 'interval, top and frames must be positive'}), 400
+    started = MEMORY_PROFILER.start(interval, top, frames)
+    return jsonify({'started': started, 'profiling': MEMORY_PROFILER.running})
+
+@app.route('/admin/memory/stop', methods=['POST'])
+def admin_memory_stop():
+    """Stop allocation tracing."""
+    error = admin_error()
+    if error:
+        return error
+    return jsonify({'stopped': MEMORY_PROFILER.stop(), 'profiling': MEMORY_PROFILER.running})
+
+@app.route('/admin/memory/snapshot', methods=['POST'])
+def admin_memory_snapshot():
+    """Take a snapshot now and get the top growth since the previous one."""
+    error = admin_error()
+    if error:
+        return error
+    if not MEMORY_PROFILER.running:
+        return jsonify({'error': 'memory profiling is not running'}), 409
+    return jsonify({'top_growth': MEMORY_PROFILER.snapshot()})
+
+@app.route('/admin/memory/report')
+def admin_memory_report():
+    """Detailed memory report: top allocation sites and live object types."""
+    error = admin_error()
+    if error:
+        return error
+    try:
+        return jsonify(MEMORY_PROFILER.report(details=True))
+    except Exception as e:
+        logger.error(f"❌ Error in memory report: {e}")
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/ping')
 def ping():
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Execution lanes for the Telegram relationship bot.
+Replies to commands run in the interactive lane (telebot's handler threads)
+and scheduled sends in the bulk lane (a small pool of worker threads fed
+from a bounded queue). Each lane has its own in-flight limit in the API
+client and its own HTTP connections (telebot keeps one session per thread),
+so a large broadcast cannot hold up replies.
+"""
+
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+import telebot
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+
+_local = threading.local()
+
+def current_lane():
+    """Get the lane of the calling thread (interactive unless set)."""
+    return getattr(_local, 'lane', INTERACTIVE)
+
+@contextmanager
+def use_lane(lane):
+    """Run the API calls made by this thread inside the block in a lane."""
+    previous = current_lane()
+    _local.lane = lane
+    try:
+        yield
+    finally:
+        _local.lane = previous
+
+class LaneBusyError(Exception):
+    """Raised when a lane is not admitting more work."""
+
+class BusyLaneHandler(telebot.ExceptionHandler):
+    """telebot exception handler that drops replies turned away by a full lane."""
+
+    def handle(self, exception):
+        if isinstance(exception, LaneBusyError):
+            logger.warning(f"⚠️ Dropped a reply: {exception}")
+            return True
+        return False
+
+class BulkLane:
+    """
+    Worker threads running bulk work in the bulk lane.
+
+    The queue is bounded, so submit() blocks the producer (the scheduler)
+    once max_queue items are waiting instead of buffering a whole broadcast.
+    """
+
+    def __init__(self, workers=4, max_queue=1000):
+        self.workers = max(int(workers), 1)
+        self.queue = queue.Queue(max(int(max_queue), 1))
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, function, *args, block=True, timeout=None):
+        """Queue a call, waiting for room (raises LaneBusyError if block is False or timeout passes)."""
+        self._start()
+        try:
+            self.queue.put((function, args), block=block, timeout=timeout)
+        except queue.Full:
+            raise LaneBusyError("Bulk lane queue is full")
+
+    def join(self):
+        """Wait until every queued call has run."""
+        self.queue.join()
+
+    def _start(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"bulk-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        with use_lane(BULK):
+            while True:
+                function, args = self.queue.get()
+                try:
+                    function(*args)
+                except Exception as e:
+                    logger.error(f"❌ Error in bulk lane: {e}")
+                finally:
+                    self.queue.task_done()
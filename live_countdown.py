@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Live countdown messages for the Telegram relationship bot.
+Keeps one pinned status message per group (days together, days to the next
+milestone) and edits it in place instead of sending new messages. Updates
+are coalesced per group and applied from a background thread, and edits are
+skipped when the rendered text has not changed since the last one.
+"""
+
+import atexit
+import logging
+import sqlite3
+import threading
+from telebot.apihelper import ApiTelegramException
+from api_client import is_transient_error
+from lanes import BULK, use_lane
+from message_selection import stable_hash
+from utils import group_key, rebuild_integer_key_table
+
+logger = logging.getLogger(__name__)
+
+# Edit errors meaning the pinned message is gone for good and a new one is needed
+LOST_MESSAGE_ERRORS = ('message to edit not found', "message can't be edited")
+
+# chat_id is a chat id or a channel username, so it is not a rowid alias
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS live_messages (
+    chat_id NOT NULL PRIMARY KEY,
+    message_id INTEGER NOT NULL,
+    text_hash INTEGER NOT NULL
+);
+"""
+
+def text_hash(text):
+    """Get a stable hash of a rendered text that fits an SQLite integer."""
+    return stable_hash(text) & 0x7FFFFFFFFFFFFFFF
+
+class LiveCountdown:
+    """
+    Pinned, edited-in-place status message of every group.
+
+    update() only records the latest text of a group, so any number of
+    updates between two flushes cost at most one API call per group. The
+    pinned message id and the hash of its text are stored in SQLite so
+    restarts keep editing the same message.
+    """
+
+    def __init__(self, api, db_path, flush_interval=2):
+        self.api = api
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.counts = {'sent': 0, 'edited': 0, 'unchanged': 0, 'coalesced': 0}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop_event = None
+        self._thread = None
+        connection = self.connect()
+        try:
+            self.messages = {
+                chat_id: (message_id, digest)
+                for chat_id, message_id, digest in connection.execute(
+                    'SELECT chat_id, message_id, text_hash FROM live_messages')
+            }
+        finally:
+            connection.close()
+
+    def connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(SCHEMA)
+        rebuild_integer_key_table(connection, 'live_messages', SCHEMA)
+        return connection
+
+    def update(self, chat_id, text):
+        """Queue the new text of a group's live message (replacing a queued one)."""
+        chat_id = group_key(chat_id)
+        with self._lock:
+            if chat_id in self._pending:
+                self.counts['coalesced'] += 1
+            self._pending[chat_id] = text
+            if self._thread is None:
+                self._start()
+
+    def flush(self):
+        """Apply the queued texts; returns the number of API calls made."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        calls = 0
+        for chat_id, text in pending.items():
+            try:
+                calls += self.apply(chat_id, text)
+            except Exception as e:
+                if not is_transient_error(e):
+                    logger.error(f"❌ Error updating live countdown in {chat_id}: {e}")
+                    continue
+                # Try again at the next flush, unless a newer text was queued meanwhile
+                logger.warning(f"⚠️ Live countdown in {chat_id} not updated ({e}), retrying later")
+                with self._lock:
+                    self._pending.setdefault(chat_id, text)
+        return calls
+
+    def apply(self, chat_id, text):
+        """Edit (or send and pin) a group's live message; returns the number of API calls made."""
+        digest = text_hash(text)
+        current = self.messages.get(chat_id)
+        if current is not None and current[1] == digest:
+            self.counts['unchanged'] += 1
+            return 0
+
+        if current is not None:
+            try:
+                self.api.edit_message_text(text, chat_id, current[0])
+                self.counts['edited'] += 1
+                self.save(chat_id, current[0], digest)
+                return 1
+            except ApiTelegramException as e:
+                description = e.description or ''
+                if 'message is not modified' in description:
+                    self.save(chat_id, current[0], digest)
+                    return 1
+                if not any(error in description for error in LOST_MESSAGE_ERRORS):
+                    # Rate limits or server errors left after retries: flush() tries again
+                    raise
+                # The message was deleted or can't be edited any more, post a new one
+                logger.warning(f"⚠️ Could not edit live countdown in {chat_id} ({description}), sending a new one")
+
+        message = self.api.send_message(chat_id, text, disable_notification=True)
+        self.counts['sent'] += 1
+        self.save(chat_id, message.message_id, digest)
+        try:
+            self.api.pin_chat_message(chat_id, message.message_id, disable_notification=True)
+        except Exception as e:
+            # Pinning needs admin rights, the message is still edited in place
+            logger.warning(f"⚠️ Could not pin live countdown in {chat_id}: {e}")
+        return 2 + (current is not None)
+
+    def save(self, chat_id, message_id, digest):
+        connection = self.connect()
+        try:
+            connection.execute(
+                'INSERT OR REPLACE INTO live_messages (chat_id, message_id, text_hash) VALUES (?, ?, ?)',
+                (chat_id, message_id, digest))
+        finally:
+            connection.close()
+        self.messages[chat_id] = (message_id, digest)
+
+    def _start(self):
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the flush thread after a final flush."""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        with use_lane(BULK):
+            while not self._stop_event.wait(self.flush_interval):
+                self.flush()
+            self.flush()
+
+_live_countdowns = {}
+_live_countdowns_lock = threading.Lock()
+
+def get_live_countdown(api, config):
+    """Get the shared live countdown if LIVE_COUNTDOWN is on, else None."""
+    if not config.live_countdown:
+        return None
+    with _live_countdowns_lock:
+        live = _live_countdowns.get(config.settings_db)
+        if live is None:
+            live = _live_countdowns[config.settings_db] = LiveCountdown(
+                api, config.settings_db, config.live_countdown_interval)
+    return live
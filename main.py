@@ -8,8 +8,9 @@ import threading
 import time
 import logging
 from bot import RelationshipBot
-from keep_alive import keep_alive
 from scheduler import start_scheduler
+from supervisor import Supervisor
+from memory_profile import start_memory_profiling
 
 # Configure logging
 logging.basicConfig(
@@ -23,27 +24,39 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+def run_keep_alive():
+    """Start the keep-alive server, importing Flask in its own thread."""
+    from keep_alive import keep_alive
+    keep_alive()
+
 def main():
     """Main function to start the bot and keep-alive server."""
     try:
         logger.info("🚀 Starting Telegram Relationship Bot...")
         
         # Start the keep-alive server in a separate thread
-        keep_alive_thread = threading.Thread(target=keep_alive, daemon=True)
+        keep_alive_thread = threading.Thread(target=run_keep_alive, daemon=True)
         keep_alive_thread.start()
         logger.info("✅ Keep-alive server started")
         
         # Initialize the bot
         bot = RelationshipBot()
         
-        # Start the scheduler in a separate thread
-        scheduler_thread = threading.Thread(target=start_scheduler, args=(bot,), daemon=True)
-        scheduler_thread.start()
+        # Memory stats on /metrics and SIGUSR1, allocation tracing with MEMORY_PROFILE
+        start_memory_profiling(bot.config)
+        
+        # Run the poller and the scheduler under the supervisor, which restarts
+        # either of them if it dies or stops sending heartbeats
+        supervisor = Supervisor()
+        supervisor.add('poller', bot.poll_updates, stall_timeout=60)
+        supervisor.add('scheduler', lambda stop_event: start_scheduler(bot, stop_event), stall_timeout=180)
+        supervisor.watch('dispatch', stall_timeout=60)
+        supervisor.start()
         logger.info("✅ Message scheduler started")
         
-        # Start the bot polling
+        # Supervise components from the main thread
         logger.info("✅ Bot is now running and listening for messages...")
-        bot.start_polling()
+        supervisor.run_forever()
         
     except Exception as e:
         logger.error(f"❌ Error starting bot: {e}")
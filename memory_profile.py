@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Memory profiling for the Telegram relationship bot.
+Reports the process RSS and garbage collector stats, and optionally traces
+allocations with tracemalloc: a background thread snapshots them
+periodically and logs the allocation sites that grew most since the last
+snapshot. A full report is logged on SIGUSR1.
+"""
+
+import gc
+import logging
+import os
+import signal
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is then not reported
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Stack frames stored per traced allocation; more frames cost more memory
+TRACE_FRAMES = 1
+
+# Allocations made by the profiler itself or by the import machinery
+IGNORED_FILES = (tracemalloc.__file__, '<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>', '<unknown>')
+
+def current_rss_kb():
+    """Get the resident set size of the process in KiB, or None if unknown."""
+    try:
+        with open('/proc/self/status', encoding='ascii') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def memory_stats():
+    """Get the process memory, thread and garbage collector stats."""
+    generations = gc.get_stats()
+    return {
+        'rss_kb': current_rss_kb(),
+        # ru_maxrss is in KiB on Linux
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+        'threads': threading.active_count(),
+        'gc': {
+            'counts': list(gc.get_count()),
+            'collections': [generation['collections'] for generation in generations],
+            'collected': sum(generation['collected'] for generation in generations),
+            'uncollectable': sum(generation['uncollectable'] for generation in generations),
+            'garbage': len(gc.garbage)
+        }
+    }
+
+def take_snapshot():
+    """Take a tracemalloc snapshot without the profiler's own allocations."""
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, filename) for filename in IGNORED_FILES])
+
+def describe_statistic(stat):
+    """Describe a tracemalloc Statistic or StatisticDiff as a dict."""
+    frame = stat.traceback[0]
+    described = {'site': f"{frame.filename}:{frame.lineno}", 'size_kb': round(stat.size / 1024, 1), 'count': stat.count}
+    if hasattr(stat, 'size_diff'):
+        described['size_diff_kb'] = round(stat.size_diff / 1024, 1)
+        described['count_diff'] = stat.count_diff
+    return described
+
+def top_types(limit=10):
+    """Get the most common live object types (walks every tracked object, so it is slow)."""
+    return Counter(type(obj).__name__ for obj in gc.get_objects()).most_common(limit)
+
+class MemoryProfiler:
+    """
+    tracemalloc snapshots taken every interval seconds from a background thread.
+
+    Only the previous snapshot is kept, and each new one is diffed with it,
+    so steadily growing allocation sites (leaks) show up as the top growth
+    of every snapshot.
+    """
+
+    def __init__(self):
+        self.interval = 300
+        self.top = 10
+        self.snapshots = 0
+        self.started_at = None
+        self.last_snapshot_at = None
+        self.last_growth = []
+        self._previous = None
+        self._lock = threading.Lock()
+        self._stop_event = None
+        self._thread = None
+        # Whether start() turned tracing on, so stop() leaves other tracers alone
+        self._owns_tracing = False
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, interval=300, top=10, frames=TRACE_FRAMES):
+        """Start tracing allocations and snapshotting them; returns False if already running."""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self.interval = interval
+            self.top = top
+            self._owns_tracing = not tracemalloc.is_tracing()
+            if self._owns_tracing:
+                tracemalloc.start(frames)
+            self.started_at = time.time()
+            self.snapshots = 0
+            self.last_growth = []
+            self._previous = take_snapshot()
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='memory-profiler', daemon=True)
+            self._thread.start()
+        logger.info(f"🧠 Memory profiling started, snapshots every {interval}s")
+        return True
+
+    def stop(self):
+        """Stop snapshotting, and tracing if start() began it; returns False if not running."""
+        with self._lock:
+            if self._thread is None:
+                return False
+            self._stop_event.set()
+            thread, self._thread = self._thread, None
+            owns_tracing, self._owns_tracing = self._owns_tracing, False
+        thread.join()
+        if owns_tracing:
+            tracemalloc.stop()
+        self._previous = None
+        logger.info("🧠 Memory profiling stopped")
+        return True
+
+    def snapshot(self):
+        """Take a snapshot, diff it with the previous one and log the top growth."""
+        current = take_snapshot()
+        with self._lock:
+            previous, self._previous = self._previous, current
+            self.snapshots += 1
+            number = self.snapshots
+            self.last_snapshot_at = time.time()
+        if previous is None:
+            return []
+        growth = [describe_statistic(stat) for stat in current.compare_to(previous, 'lineno')[:self.top]]
+        self.last_growth = growth
+        traced, _ = tracemalloc.get_traced_memory()
+        sites = ', '.join(f"{stat['site']} {stat['size_diff_kb']:+} KiB" for stat in growth[:3])
+        logger.info(f"🧠 Memory snapshot {number}: {traced / 1048576:.1f} MiB traced, top growth: {sites or 'none'}")
+        return growth
+
+    def report(self, details=False):
+        """
+        Get the memory stats and the latest top growth. With details, also the
+        current top allocation sites and live object types (slower).
+        """
+        report = {'process': memory_stats(), 'tracing': tracemalloc.is_tracing(), 'profiling': self.running}
+        if tracemalloc.is_tracing():
+            traced, peak = tracemalloc.get_traced_memory()
+            report.update({
+                'traced_kb': round(traced / 1024, 1),
+                'traced_peak_kb': round(peak / 1024, 1),
+                'snapshots': self.snapshots,
+                'interval': self.interval,
+                'last_snapshot_at': self.last_snapshot_at,
+                'top_growth': self.last_growth
+            })
+            if details:
+                report['top_allocations'] = [
+                    describe_statistic(stat) for stat in take_snapshot().statistics('lineno')[:self.top]]
+        if details:
+            report['top_types'] = top_types(self.top)
+        return report
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.snapshot()
+            except Exception as e:
+                logger.error(f"❌ Error taking memory snapshot: {e}")
+
+MEMORY_PROFILER = MemoryProfiler()
+
+def format_report(report):
+    """Format a memory report as text for the log."""
+    process = report['process']
+    lines = [
+        f"🧠 Memory report (pid {os.getpid()})",
+        f"RSS: {process['rss_kb']} KiB, peak {process['peak_rss_kb']} KiB, threads: {process['threads']}",
+        f"GC counts: {process['gc']['counts']}, collections: {process['gc']['collections']}, "
+        f"uncollectable: {process['gc']['uncollectable']}, garbage: {process['gc']['garbage']}"
+    ]
+    if report['tracing']:
+        lines.append(f"Traced: {report['traced_kb']} KiB, peak {report['traced_peak_kb']} KiB, {report['snapshots']} snapshots")
+        lines.append("Top growth since the previous snapshot:")
+        lines += [f"  {stat['size_diff_kb']:+} KiB ({stat['count_diff']:+} blocks) {stat['site']}" for stat in report['top_growth']]
+        lines.append("Top allocation sites:")
+        lines += [f"  {stat['size_kb']} KiB ({stat['count']} blocks) {stat['site']}" for stat in report.get('top_allocations', [])]
+    else:
+        lines.append("Allocation tracing is off (MEMORY_PROFILE or POST /admin/memory/start)")
+    lines.append("Most common object types:")
+    lines += [f"  {count} {name}" for name, count in report.get('top_types', [])]
+    return '\n'.join(lines)
+
+def dump_report():
+    """Log a detailed memory report."""
+    try:
+        logger.info(format_report(MEMORY_PROFILER.report(details=True)))
+    except Exception as e:
+        logger.error(f"❌ Error writing memory report: {e}")
+
+def install_report_signal():
+    """Log a memory report on SIGUSR1 (main thread only, not on Windows)."""
+    if not hasattr(signal, 'SIGUSR1') or threading.current_thread() is not threading.main_thread():
+        return False
+    # Report from a thread: the handler may interrupt code holding the logging lock
+    signal.signal(signal.SIGUSR1, lambda signum, frame: threading.Thread(target=dump_report, daemon=True).start())
+    return True
+
+def start_memory_profiling(config):
+    """Install the SIGUSR1 report and start profiling if MEMORY_PROFILE is on."""
+    install_report_signal()
+    if config.memory_profile:
+        MEMORY_PROFILER.start(config.memory_profile_interval, config.memory_profile_top)
+    return MEMORY_PROFILER
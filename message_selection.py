@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Deterministic message selection for the Telegram relationship bot.
+Maps each (couple, day, slot) to a fixed pick from a pool through a keyed
+permutation, without repeating a pick for a couple until the whole pool has
+been used. Picks are a pure function of their arguments, so every process
+renders the same message for a day, before or after a restart.
+"""
+
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+def stable_hash(*parts):
+    """Get a stable 64-bit hash of the given values (unlike hash(), same in every process)."""
+    raw = '\x1f'.join(str(part) for part in parts).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), 'big')
+
+# Rounds of the Feistel network that shuffles a pool for one cycle
+FEISTEL_ROUNDS = 4
+
+def permute(index, size, *key):
+    """
+    Map index to its position in a keyed permutation of range(size).
+
+    A balanced Feistel network over the smallest even-bit domain holding size
+    is a bijection; cycle-walking (re-applying it until the result is below
+    size) restricts it to range(size). Costs O(1) hashes per call whatever
+    the pool size, and needs no memory.
+    """
+    half_bits = max((size - 1).bit_length() + 1, 2) // 2
+    mask = (1 << half_bits) - 1
+    value = index
+    while True:
+        left, right = value >> half_bits, value & mask
+        for round_number in range(FEISTEL_ROUNDS):
+            left, right = right, left ^ (stable_hash(*key, round_number, right) & mask)
+        value = (left << half_bits) | right
+        if value < size:
+            return value
+
+def choose_index(pool_size, couple_key, day, slot):
+    """
+    Get the pool index picked for a couple on a day in a slot.
+
+    Days are split into cycles of pool_size days, and each cycle walks
+    through its own permutation of the pool (keyed by couple, slot and
+    cycle), so no pick repeats within a cycle and the pick only depends on
+    its arguments. The first pick of a cycle is swapped with the second
+    when it would repeat the previous day's pick.
+    """
+    if pool_size <= 0:
+        raise ValueError("Cannot choose from an empty pool")
+    if pool_size == 1:
+        return 0
+    if pool_size == 2:
+        return (stable_hash(couple_key, slot) + day) % 2
+
+    cycle, position = divmod(day, pool_size)
+    if position > 1:
+        return permute(position, pool_size, couple_key, slot, cycle)
+    first = permute(0, pool_size, couple_key, slot, cycle)
+    if first == permute(pool_size - 1, pool_size, couple_key, slot, cycle - 1):
+        position = 1 - position
+    return permute(position, pool_size, couple_key, slot, cycle)
+
+def choose(pool, couple_key, day, slot):
+    """Get the pool entry picked for a couple on a day in a slot."""
+    return pool[choose_index(len(pool), couple_key, day, slot)]
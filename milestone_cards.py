@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Milestone and birthday image cards for the Telegram relationship bot.
+Renders cards with Pillow and caches them twice: rendered PNGs on disk and the
+Telegram file_id of every PNG that has already been uploaded. Card texts come
+from the language catalogs (card.* keys) and need a font with Persian glyphs.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from i18n import get_catalog
+from utils import write_file_atomically
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # Pillow is optional, cards are skipped without it
+    Image = None
+
+try:
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+except ImportError:  # Without shaping libraries Persian text is drawn as-is
+    arabic_reshaper = None
+
+logger = logging.getLogger(__name__)
+
+CARD_SIZE = (1080, 1080)
+
+# Background gradient (top, bottom) and text color of each card template,
+# whose lines are the catalog text card.<template>
+CARD_TEMPLATES = {
+    'milestone': {
+        'gradient': ((255, 107, 107), (238, 90, 36)),
+        'color': (255, 255, 255),
+    },
+    'birthday': {
+        'gradient': ((162, 155, 254), (253, 121, 168)),
+        'color': (255, 255, 255),
+    },
+}
+
+# Font size of each card line
+LINE_SIZES = (160, 96, 72)
+
+# Letters a card font must have glyphs for (پ is Persian only, not in Arabic fonts)
+PERSIAN_SAMPLE = 'عشقپ'
+
+# A code point no font maps, drawn with the font's missing-glyph box
+UNMAPPED_CHARACTER = '\U0010FFFD'
+
+# Telegram photo captions are limited to 1024 characters
+MAX_CAPTION_LENGTH = 1024
+
+def cards_available():
+    """Check if card rendering is possible in this environment."""
+    return Image is not None
+
+def shape_text(text):
+    """Shape and reorder Persian text so it is drawn correctly."""
+    if arabic_reshaper is None:
+        return text
+    return get_display(arabic_reshaper.reshape(text))
+
+def glyph_bitmap(font, character):
+    """Get the pixels of one character drawn with a font."""
+    size = LINE_SIZES[-1]
+    image = Image.new('L', (size * 2, size * 2))
+    ImageDraw.Draw(image).text((0, 0), character, font=font, fill=255)
+    return image.tobytes()
+
+def check_card_font(font_path):
+    """
+    Check that font_path is a TrueType font with Persian glyphs, raising
+    ValueError if not. Pillow's default font has none, so cards would show
+    boxes (tofu) instead of text.
+    """
+    if not font_path:
+        raise ValueError("CARD_FONT_PATH is not set, cards need a font with Persian glyphs")
+    try:
+        font = ImageFont.truetype(font_path, LINE_SIZES[-1])
+    except OSError as e:
+        raise ValueError(f"Cannot load card font {font_path}: {e}")
+    missing = glyph_bitmap(font, UNMAPPED_CHARACTER)
+    for letter in PERSIAN_SAMPLE:
+        if glyph_bitmap(font, letter) == missing:
+            raise ValueError(f"Card font {font_path} has no glyph for {letter!r}")
+
+def card_lines(template, milestone, names, language=None):
+    """Get the text lines of a card in a language, from the catalog."""
+    catalog = get_catalog(language)
+    joined = f" {catalog.text('card.and')} ".join(names)
+    return catalog.text(f'card.{template}', days=milestone, names=joined).split('\n')
+
+def render_card(template, milestone, names, font_path, language=None):
+    """Render a card to PNG bytes with a font checked by check_card_font()."""
+    spec = CARD_TEMPLATES[template]
+    width, height = CARD_SIZE
+    image = Image.new('RGB', CARD_SIZE)
+    draw = ImageDraw.Draw(image)
+
+    # Vertical gradient background
+    (r1, g1, b1), (r2, g2, b2) = spec['gradient']
+    for y in range(height):
+        ratio = y / (height - 1)
+        color = (
+            int(r1 + (r2 - r1) * ratio),
+            int(g1 + (g2 - g1) * ratio),
+            int(b1 + (b2 - b1) * ratio)
+        )
+        draw.line([(0, y), (width, y)], fill=color)
+
+    lines = [shape_text(line) for line in card_lines(template, milestone, names, language)]
+
+    y = height // 4
+    for line, size in zip(lines, LINE_SIZES):
+        font = ImageFont.truetype(font_path, size)
+        left, top, right, bottom = draw.textbbox((0, 0), line, font=font)
+        draw.text(((width - (right - left)) / 2, y), line, font=font, fill=spec['color'])
+        y += (bottom - top) + size // 2
+
+    output = io.BytesIO()
+    image.save(output, format='PNG', optimize=True)
+    return output.getvalue()
+
+class CardCache:
+    """
+    Two-level card cache.
+
+    Level one keeps rendered PNGs on disk, keyed by (template, milestone, names, language).
+    Level two maps the hash of each PNG to the Telegram file_id returned by its
+    first upload, so the same card is never uploaded twice.
+    """
+
+    def __init__(self, cache_dir, font_path):
+        check_card_font(font_path)
+        self.cache_dir = cache_dir
+        self.font_path = font_path
+        self.file_ids_path = os.path.join(cache_dir, 'file_ids.json')
+        self._lock = threading.Lock()
+        self._png_hashes = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._file_ids = self._load_file_ids()
+
+    def _load_file_ids(self):
+        try:
+            with open(self.file_ids_path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"❌ Error loading card file_id cache: {e}")
+            return {}
+
+    def _save_file_ids(self):
+        write_file_atomically(self.file_ids_path, json.dumps(self._file_ids))
+
+    @staticmethod
+    def card_key(template, milestone, names, language=None):
+        """Get the disk cache key for a card."""
+        raw = json.dumps([template, milestone, list(names), get_catalog(language).language], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get_png(self, template, milestone, names, language=None):
+        """Get the path and content hash of a card's PNG, rendering it on a cache miss."""
+        key = self.card_key(template, milestone, names, language)
+        path = os.path.join(self.cache_dir, f"{key}.png")
+
+        png_hash = self._png_hashes.get(key)
+        if png_hash is not None and os.path.exists(path):
+            return path, png_hash
+
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+        else:
+            data = render_card(template, milestone, names, self.font_path, language)
+            write_file_atomically(path, data)
+            logger.info(f"🖼️ Rendered {template} card for {milestone}")
+
+        png_hash = hashlib.sha256(data).hexdigest()
+        self._png_hashes[key] = png_hash
+        return path, png_hash
+
+    def get_file_id(self, png_hash):
+        """Get the Telegram file_id of an already uploaded PNG, or None."""
+        return self._file_ids.get(png_hash)
+
+    def remember_file_id(self, png_hash, file_id):
+        """Store the Telegram file_id returned for an uploaded PNG."""
+        with self._lock:
+            self._file_ids[png_hash] = file_id
+            self._save_file_ids()
+
+def send_card(bot, cache, chat_id, template, milestone, names, caption=None, language=None):
+    """Send a card to a chat in a language, reusing the uploaded file_id when there is one."""
+    if caption and len(caption) > MAX_CAPTION_LENGTH:
+        caption = None
+
+    path, png_hash = cache.get_png(template, milestone, names, language)
+    file_id = cache.get_file_id(png_hash)
+    if file_id:
+        return bot.send_photo(chat_id, file_id, caption=caption)
+
+    with open(path, 'rb') as photo:
+        sent = bot.send_photo(chat_id, photo, caption=caption)
+    cache.remember_file_id(png_hash, sent.photo[-1].file_id)
+    return sent
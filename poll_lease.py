@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Single-poller lease for the Telegram relationship bot.
+Elects one process to call getUpdates through a lease row in SQLite, and hands
+the updates it receives to every process (leader included) through a shared
+queue, so replicas never poll against each other and hit 409 conflicts.
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from telebot import apihelper, types
+from supervisor import HEARTBEATS, beat_through_workers
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS poll_leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    token INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    last_update_id INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS update_queue (
+    update_id INTEGER PRIMARY KEY,
+    token INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    claimed_by TEXT,
+    claimed_at REAL
+);
+"""
+
+def connect(db_path):
+    """Open the shared state database."""
+    connection = sqlite3.connect(db_path, timeout=10, isolation_level=None, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+class PollLease:
+    """
+    Lease on the right to poll getUpdates.
+
+    The lease is a row holding its holder, an expiry time and a fencing token.
+    The token grows every time the lease changes hands, and updates are only
+    published together with a check that the publisher still holds the current
+    token, so a leader that lost its lease cannot publish anything afterwards.
+    """
+
+    def __init__(self, db_path, name='telegram_poller', ttl=30, holder=None):
+        self.connection = connect(db_path)
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.token = None
+
+    def try_acquire(self):
+        """Acquire or renew the lease. Returns the fencing token, or None if another process holds it."""
+        now = time.time()
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            row = self.connection.execute(
+                'SELECT holder, token, expires_at FROM poll_leases WHERE name = ?', (self.name,)
+            ).fetchone()
+
+            if row is None:
+                token = 1
+                self.connection.execute(
+                    'INSERT INTO poll_leases (name, holder, token, expires_at) VALUES (?, ?, ?, ?)',
+                    (self.name, self.holder, token, now + self.ttl)
+                )
+            elif row[0] == self.holder and row[2] >= now:
+                token = row[1]
+                self.connection.execute(
+                    'UPDATE poll_leases SET expires_at = ? WHERE name = ?', (now + self.ttl, self.name)
+                )
+            elif row[2] < now:
+                token = row[1] + 1
+                self.connection.execute(
+                    'UPDATE poll_leases SET holder = ?, token = ?, expires_at = ? WHERE name = ?',
+                    (self.holder, token, now + self.ttl, self.name)
+                )
+            else:
+                token = None
+
+        if token != self.token:
+            if token is not None:
+                logger.info(f"👑 Acquired polling lease (token {token})")
+            elif self.token is not None:
+                logger.warning("⚠️ Lost polling lease, standing by")
+        self.token = token
+        return token
+
+    def release(self):
+        """Give up the lease so a standby can take over right away."""
+        if self.token is None:
+            return
+        with self.connection:
+            self.connection.execute(
+                'UPDATE poll_leases SET expires_at = 0 WHERE name = ? AND holder = ?',
+                (self.name, self.holder)
+            )
+        self.token = None
+
+    def last_update_id(self):
+        """Get the id of the last update published by any leader."""
+        row = self.connection.execute(
+            'SELECT last_update_id FROM poll_leases WHERE name = ?', (self.name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def publish(self, token, raw_updates):
+        """
+        Queue raw updates for processing if token is still the current lease token.
+        Returns False when the caller has been fenced out.
+        """
+        if not raw_updates:
+            return True
+
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            row = self.connection.execute(
+                'SELECT holder, token FROM poll_leases WHERE name = ?', (self.name,)
+            ).fetchone()
+            if row is None or row[0] != self.holder or row[1] != token:
+                return False
+
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO update_queue (update_id, token, payload) VALUES (?, ?, ?)',
+                [(update['update_id'], token, json.dumps(update, ensure_ascii=False)) for update in raw_updates]
+            )
+            self.connection.execute(
+                'UPDATE poll_leases SET last_update_id = MAX(last_update_id, ?) WHERE name = ?',
+                (max(update['update_id'] for update in raw_updates), self.name)
+            )
+        return True
+
+    def claim(self, limit=100, claim_timeout=60):
+        """Claim queued updates for this process, including ones abandoned by a dead consumer."""
+        now = time.time()
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            rows = self.connection.execute(
+                'SELECT update_id, payload FROM update_queue '
+                'WHERE claimed_by IS NULL OR claimed_at < ? ORDER BY update_id LIMIT ?',
+                (now - claim_timeout, limit)
+            ).fetchall()
+            self.connection.executemany(
+                'UPDATE update_queue SET claimed_by = ?, claimed_at = ? WHERE update_id = ?',
+                [(self.holder, now, update_id) for update_id, _ in rows]
+            )
+        return rows
+
+    def ack(self, update_ids):
+        """Remove processed updates from the queue."""
+        with self.connection:
+            self.connection.executemany(
+                'DELETE FROM update_queue WHERE update_id = ?', [(update_id,) for update_id in update_ids]
+            )
+
+class LeasedPoller:
+    """
+    Poll loop that only calls getUpdates while holding the lease.
+
+    Every process runs this loop. The leader polls and publishes updates, and
+    all processes claim and handle queued updates, so work is shared even
+    though only one process talks to getUpdates. A standby takes over at most
+    about ttl + ttl / 3 seconds after the leader stops renewing.
+    """
+
+    def __init__(self, bot, lease, timeout=10, long_polling_timeout=5):
+        self.bot = bot
+        self.lease = lease
+        self.timeout = timeout
+        self.long_polling_timeout = long_polling_timeout
+
+    def run(self, stop_event):
+        """Run the poll loop until stop_event is set."""
+        try:
+            while not stop_event.is_set():
+                try:
+                    token = self.lease.try_acquire()
+                    if token is not None:
+                        self.poll_once(token)
+                    HEARTBEATS.beat('poller')
+
+                    handled = self.process_queued()
+                    # Beat every loop, as poll_updates does, so idle leaders and standbys stay healthy
+                    beat_through_workers(self.bot)
+                    if token is None and not handled:
+                        stop_event.wait(max(self.lease.ttl / 3, 1))
+                except Exception as e:
+                    logger.error(f"❌ Error in leased polling: {e}")
+                    stop_event.wait(3)
+        finally:
+            self.lease.release()
+
+    def poll_once(self, token):
+        """Fetch one batch of updates and publish it under the fencing token."""
+        raw_updates = apihelper.get_updates(
+            self.bot.token,
+            offset=self.lease.last_update_id() + 1,
+            timeout=self.timeout,
+            long_polling_timeout=self.long_polling_timeout
+        )
+        if not self.lease.publish(token, raw_updates):
+            logger.warning(f"⚠️ Dropped {len(raw_updates)} updates polled with stale lease token {token}")
+
+    def process_queued(self):
+        """Handle queued updates claimed by this process. Returns the number handled."""
+        rows = self.lease.claim()
+        if not rows:
+            return 0
+
+        updates = [types.Update.de_json(json.loads(payload)) for _, payload in rows]
+        self.bot.process_new_updates(updates)
+        self.lease.ack([update_id for update_id, _ in rows])
+        return len(rows)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Keyword search over the quote corpus for the Telegram relationship bot.
+Builds an inverted index once at load time, with Persian text normalization and
+character trigrams over the vocabulary for partial-word matches.
+"""
+
+from array import array
+from bisect import bisect_left
+import logging
+import re
+import threading
+from telebot import types
+from quotes import get_corpus, QUOTE_CATEGORY, ADVICE_CATEGORY
+
+logger = logging.getLogger(__name__)
+
+ZWNJ = '\u200c'
+
+# Arabic letter forms and digits mapped to their Persian/ASCII equivalents
+NORMALIZE_TABLE = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه', 'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا',
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    # Diacritics (harakat, tanwin, shadda, sukun, superscript alef) and tatweel
+    **{chr(code): None for code in range(0x064B, 0x0660)},
+    '\u0670': None,
+    '\u0640': None,
+})
+
+WORD_PATTERN = re.compile(r'[\w\u200c]+')
+
+TRIGRAM_SIZE = 3
+
+def normalize(text):
+    """Normalize Persian text for searching."""
+    return text.translate(NORMALIZE_TABLE).lower()
+
+def tokenize(text):
+    """
+    Split normalized text into search tokens.
+
+    A word joined with ZWNJ (e.g. می‌کنم) is indexed both as one word without
+    the ZWNJ and as its parts, so any spelling a user types finds it.
+    """
+    tokens = []
+    for word in WORD_PATTERN.findall(normalize(text)):
+        parts = [part for part in word.split(ZWNJ) if part]
+        if not parts:
+            continue
+        tokens.append(''.join(parts))
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+def trigrams(token):
+    """Get the character trigrams of a token."""
+    return {token[i:i + TRIGRAM_SIZE] for i in range(len(token) - TRIGRAM_SIZE + 1)}
+
+class SearchIndex:
+    """
+    Inverted index over corpus entries.
+
+    Exact tokens map to posting arrays of entry ids. Partial matches go through
+    a trigram index over the vocabulary (or a sorted vocabulary for short
+    prefixes), so lookups touch only matching words, not every entry.
+    """
+
+    def __init__(self, corpus, categories):
+        postings = {}
+        entry_ids = []
+        for category in categories:
+            for entry in corpus.categories.get(category, range(0)):
+                entry_ids.append(entry)
+                for token in set(tokenize(corpus[entry])):
+                    postings.setdefault(token, array('I')).append(entry)
+
+        self.corpus = corpus
+        self.entries = array('I', entry_ids)
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+        self.trigram_index = {}
+        for token in self.vocabulary:
+            for gram in trigrams(token):
+                self.trigram_index.setdefault(gram, []).append(token)
+
+    def matching_tokens(self, query_token):
+        """Get the vocabulary tokens containing query_token."""
+        if len(query_token) < TRIGRAM_SIZE:
+            # Too short for trigrams, match as a prefix
+            start = bisect_left(self.vocabulary, query_token)
+            result = []
+            for token in self.vocabulary[start:]:
+                if not token.startswith(query_token):
+                    break
+                result.append(token)
+            return result
+
+        candidates = None
+        for gram in trigrams(query_token):
+            tokens = self.trigram_index.get(gram)
+            if not tokens:
+                return []
+            candidates = set(tokens) if candidates is None else candidates.intersection(tokens)
+            if not candidates:
+                return []
+        return [token for token in candidates if query_token in token]
+
+    def search(self, query):
+        """Get the ids of entries matching every word of a query, exact word matches first."""
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return list(self.entries)
+
+        exact = None
+        partial = None
+        for query_token in query_tokens:
+            exact_entries = set(self.postings.get(query_token, ()))
+            partial_entries = set()
+            for token in self.matching_tokens(query_token):
+                partial_entries.update(self.postings[token])
+
+            exact = exact_entries if exact is None else exact & exact_entries
+            partial = partial_entries if partial is None else partial & partial_entries
+
+        return sorted(exact) + sorted(partial - exact)
+
+    def search_texts(self, query, offset=0, limit=None):
+        """Get (entry id, text) pairs for a page of search results."""
+        results = self.search(query)
+        end = len(results) if limit is None else offset + limit
+        return [(entry, self.corpus[entry]) for entry in results[offset:end]], len(results)
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_search_index():
+    """Get the shared search index, building it on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SearchIndex(get_corpus(), (QUOTE_CATEGORY, ADVICE_CATEGORY))
+                logger.info(f"✅ Quote search index built ({len(_index.vocabulary)} words)")
+    return _index
+
+def search_quotes(query, offset=0, limit=None):
+    """Search the quote and advice corpus. Returns ([(entry id, text)], total matches)."""
+    return get_search_index().search_texts(query, offset, limit)
+
+# Inline query results per page and how long Telegram may cache each page
+INLINE_PAGE_SIZE = 20
+INLINE_CACHE_TIME = 3600
+
+def inline_results(query, offset):
+    """Get one page of inline query results and the offset of the next page ('' when done)."""
+    offset = int(offset) if str(offset).isdigit() else 0
+    page, total = search_quotes(query, offset, INLINE_PAGE_SIZE)
+    results = [
+        types.InlineQueryResultArticle(
+            id=str(entry),
+            title=text[:60],
+            input_message_content=types.InputTextMessageContent(f"💝 {text}")
+        )
+        for entry, text in page
+    ]
+    next_offset = str(offset + INLINE_PAGE_SIZE) if offset + INLINE_PAGE_SIZE < total else ''
+    return results, next_offset
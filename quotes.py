@@ -2,77 +2,65 @@
 """
 Love quotes database for the Telegram relationship bot.
 Contains Persian love quotes.
+
+The quotes live in data/quotes.tsv and are served from the memory-mapped
+binary corpus built from it (see corpus.py).
 """
 
+import os
 import random
+import threading
+from corpus import load_corpus
+from message_selection import choose
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+CORPUS_SOURCE = os.getenv('QUOTES_SOURCE', os.path.join(DATA_DIR, 'quotes.tsv'))
+CORPUS_PATH = os.getenv('QUOTES_CORPUS', os.path.join(DATA_DIR, 'quotes.corpus'))
+
+# Corpus categories behind the PERSIAN_QUOTES and RELATIONSHIP_ADVICE names
+QUOTE_CATEGORY = 'quote'
+ADVICE_CATEGORY = 'advice'
+
+_corpus = None
+_corpus_lock = threading.Lock()
 
-# Persian love quotes
-PERSIAN_QUOTES = [
-    "عشق تنها احساسی است که هرچه بیشتر بدهی، بیشتر داری. 💕",
-    "در عشق، کوچکترین لحظه‌ها بزرگترین خاطره‌ها می‌شوند. 🌹",
-    "عشق یعنی دیدن آینده در چشمان کسی که دوستش داری. 👁️‍🗨️",
-    "هر صبح که چشمانم را باز می‌کنم، خوشحالم که تو در زندگی‌ام هستی. ☀️",
-    "عشق واقعی نیازی به کلمات ندارد، صدای قلب کافی است. 💗",
-    "تو نه تنها عشق زندگی‌ام، بلکه زندگی عشق‌ام هستی. 💖",
-    "عشق زبان مشترک همه قلب‌هاست. 💞",
-    "در دنیای پر از سر و صدا، عشق تو آرامش من است. 🕊️",
-    "عشق یعنی مراقبت، احترام و درک متقابل. 🤝",
-    "هر روز با تو، هدیه‌ای از آسمان است. 🎁",
-    "عشق حقیقی زمان را متوقف می‌کند. ⏰",
-    "تو همان کسی هستی که قلبم بدون گفتن اسمت می‌طپد. 💓",
-    "عشق یعنی خانه‌ای که در قلب کسی می‌سازی. 🏠",
-    "دستان تو، امن‌ترین جای دنیا برای من است. 🤲",
-    "عشق تو نوری است که تاریکی‌های زندگی‌ام را روشن می‌کند. 🌟",
-    "هر نفسی که می‌کشم، پر از عشق تو است. 💨",
-    "عشق یعنی دیدن زیبایی در عادی‌ترین لحظه‌ها. 🌺",
-    "قلب من خانه‌ای است که تنها تو کلیدش را داری. 🗝️",
-    "عشق تو مثل موسیقی است که جان‌ام را می‌نوازد. 🎵",
-    "در عشق، دو نفر یک روح می‌شوند. 👫",
-    "عشق تو گنجینه‌ای است که هر روز ارزشمندتر می‌شود. 💎",
-    "با تو، هر لحظه یک ماجراجویی عاشقانه است. 🌄",
-    "عشق یعنی لبخند تو که دنیایم را روشن می‌کند. 😊",
-    "تو آهنگ قلب منی، همیشه در حال نواختن. 🎶",
-    "عشق تو مثل باران است، زندگی‌ام را سرسبز می‌کند. ☔",
-    "تو دلیل هر تپش قلب منی. 💓",
-    "عشق یعنی با تو بودن، حتی در خیالم. 🌌",
-    "تو ستاره‌ای هستی که آسمان زندگی‌ام را روشن می‌کند. ⭐",
-    "عشق یعنی با هم خندیدن، حتی در سخت‌ترین روزها. 😄",
-    "تو رویایی هستی که هر روز به حقیقت می‌پیوندد. 🌈",
-    "عشق تو مثل نسیمی است که قلبم را نوازش می‌دهد. 🍃",
-    "با تو، هر روز یک صفحه جدید از داستان عشق ماست. 📖",
-    "عشق یعنی قلب تو که همیشه در کنار من می‌تپد. 💖",
-    "تو گلی هستی که باغ زندگی‌ام را زیبا کرده‌ای. 🌸",
-    "عشق یعنی انتخاب تو، هر روز و هر لحظه. 💝",
-]
+def get_corpus():
+    """Get the shared quote corpus, loading it on first use."""
+    global _corpus
+    if _corpus is None:
+        with _corpus_lock:
+            if _corpus is None:
+                _corpus = load_corpus(CORPUS_SOURCE, CORPUS_PATH)
+    return _corpus
 
-# Daily relationship advice
-RELATIONSHIP_ADVICE = [
-    "امروز با یک لبخند کوچک، روز همدیگر را زیبا کنید! 😊",
-    "به حرف‌های هم گوش دهید، گوش دادن واقعی عشق را عمیق‌تر می‌کند. 👂",
-    "یک لحظه را برای قدردانی از حضور هم در زندگی‌تان اختصاص دهید. 🙏",
-    "امروز با هم یک خاطره جدید بسازید، حتی اگر کوچک باشد. 📸",
-    "صبر و مهربانی کلید یک رابطه قوی است، امروز آن را تمرین کنید. 💕",
-    "به هم یادآوری کنید که چقدر برای یکدیگر مهم هستید. 💖",
-    "یک کار کوچک عاشقانه انجام دهید، مثل نوشتن یک یادداشت کوتاه. ✍️",
-    "امروز با هم بخندید، خنده عشق را شیرین‌تر می‌کند. 😄",
-    "به رویاهای یکدیگر احترام بگذارید و حمایت کنید. 🌟",
-    "امروز لحظه‌ای را برای گفتن «دوستت دارم» پیدا کنید. 💞",
-    "با هم یک هدف مشترک تعیین کنید، حتی اگر کوچک باشد. 🎯",
-    "صداقت امروز را در رابطه‌تان تقویت کنید، حتی در مسائل کوچک. 🤝",
-    "امروز به هم فرصت دهید تا خود واقعی‌تان باشید. 🌈",
-    "یک گفتگوی عمیق درباره آرزوهایتان داشته باشید. 🌌",
-    "امروز با یک لمس ساده، عشقتان را نشان دهید. 🤲",
-    "به یکدیگر فضا بدهید تا رشد کنید، عشق در آزادی شکوفا می‌شود. 🕊️",
-    "امروز یک عادت خوب برای رابطه‌تان شروع کنید. 🌱",
-    "با هم به یک خاطره زیبا فکر کنید و درباره‌اش صحبت کنید. 🕰️",
-    "امروز با مهربانی، هر اختلاف کوچکی را حل کنید. 🥰",
-    "عشقتان را با یک عمل ساده اما معنادار جشن بگیرید. 🎉",
-]
+def get_quotes():
+    """Get the Persian love quotes as a lazily decoded sequence."""
+    return get_corpus().category(QUOTE_CATEGORY)
+
+def get_advice_list():
+    """Get the relationship advice as a lazily decoded sequence."""
+    return get_corpus().category(ADVICE_CATEGORY)
+
+def __getattr__(name):
+    # PERSIAN_QUOTES and RELATIONSHIP_ADVICE used to be list literals
+    if name == 'PERSIAN_QUOTES':
+        return get_quotes()
+    if name == 'RELATIONSHIP_ADVICE':
+        return get_advice_list()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_random_quote():
     """Get a random Persian love quote."""
-    return random.choice(PERSIAN_QUOTES)
+    return random.choice(get_quotes())
 
 def get_random_advice():
     """Get a random relationship advice."""
-    return random.choice(RELATIONSHIP_ADVICE)
\ No newline at end of file
+    return random.choice(get_advice_list())
+
+def get_quote_for(couple_key, day, slot='quote'):
+    """Get the quote picked for a couple on a given day (same answer on every call)."""
+    return choose(get_quotes(), couple_key, day, slot)
+
+def get_advice_for(couple_key, day, slot='advice'):
+    """Get the advice picked for a couple on a given day (same answer on every call)."""
+    return choose(get_advice_list(), couple_key, day, slot)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Message rendering for the Telegram relationship bot.
+Builds the daily, milestone and birthday messages of a couple in the
+couple's language. The renderer holds no Telegram state, so one shared
+instance serves bot.py, interactive_bot.py and simple_bot.py.
+"""
+
+import logging
+import threading
+from datetime import timedelta
+from i18n import get_language_preferences
+from quotes import get_quote_for, get_advice_for
+from timezones import local_date
+from utils import calculate_days_together, is_special_milestone
+
+logger = logging.getLogger(__name__)
+
+CELEBRATION_EMOJIS = "🎉🎊🥳🎈🎁💐🌹"
+
+class MessageRenderer:
+    """
+    Renders the messages of a couple (default: the configured one).
+
+    A couple is any object with the Config couple fields (group_id,
+    relationship_start_date, timezone, partner names and birthdays).
+    """
+
+    def __init__(self, config, languages):
+        self.config = config
+        self.languages = languages
+
+    def days_together(self, couple=None, today=None):
+        """Get a couple's day count, today by default in the couple's timezone."""
+        couple = couple or self.config
+        return calculate_days_together(couple.relationship_start_date, today or local_date(couple.timezone))
+
+    def daily_message(self, days, couple=None):
+        """Create a regular daily message with the couple's quote and advice for the day."""
+        couple = couple or self.config
+        couple_key = couple.group_id
+        catalog = self.languages.catalog(couple_key)
+        quote = get_quote_for(couple_key, days)
+        advice = get_advice_for(couple_key, days)
+
+        today = couple.relationship_start_date + timedelta(days=days - 1)
+        return catalog.text(
+            'daily.message',
+            greeting=catalog.choose('daily.greeting', couple_key, days, 'greeting'),
+            date=catalog.format_date(today),
+            day=catalog.choose('daily.day', couple_key, days, 'day_description', days=days),
+            quote=quote,
+            advice=advice,
+            closing=catalog.choose('daily.closing', couple_key, days, 'closing')
+        )
+
+    def special_milestone_message(self, days, couple=None):
+        """Create a special milestone celebration message with per-couple variations."""
+        couple_key = (couple or self.config).group_id
+        catalog = self.languages.catalog(couple_key)
+        quote = get_quote_for(couple_key, days)
+        advice = get_advice_for(couple_key, days)
+
+        # Milestones with their own celebration texts, others share a generic one
+        if f'milestone.text.{days}' in catalog:
+            special_text = catalog.choose(f'milestone.text.{days}', couple_key, days, 'milestone_text')
+        else:
+            special_text = catalog.text('milestone.text', days=days)
+
+        return catalog.text(
+            'milestone.message',
+            emojis=catalog.choose('milestone.emojis', couple_key, days, 'celebration_emojis'),
+            text=special_text,
+            celebration=catalog.choose('milestone.celebration', couple_key, days, 'celebration', days=days),
+            quote=quote,
+            advice=advice,
+            ending=catalog.choose('milestone.ending', couple_key, days, 'ending')
+        )
+
+    def birthday_message(self, partner_name, couple=None):
+        """Create the birthday message for a partner of a couple."""
+        couple = couple or self.config
+        days = self.days_together(couple)
+        quote = get_quote_for(couple.group_id, days, 'birthday_quote')
+        advice = get_advice_for(couple.group_id, days, 'birthday_advice')
+        return self.languages.catalog(couple.group_id).text(
+            'birthday.message', name=partner_name, days=days, quote=quote, advice=advice)
+
+    def birthday_person(self, couple=None, today=None):
+        """Get the name of the partner whose birthday it is, or None."""
+        couple = couple or self.config
+        return couple.get_birthday_partner_name(today or local_date(couple.timezone))
+
+    def simple_message(self, couple=None, today=None):
+        """Create the short all-in-one daily message of simple_bot.py."""
+        couple = couple or self.config
+        catalog = self.languages.catalog(couple.group_id)
+        days = self.days_together(couple, today)
+        quote = get_quote_for(couple.group_id, days)
+        advice = get_advice_for(couple.group_id, days)
+
+        message = catalog.text('simple.message', days=days, quote=quote, advice=advice)
+
+        # Check for special milestone
+        if is_special_milestone(days):
+            message += f"\n\n{CELEBRATION_EMOJIS}\n"
+            if f'simple.celebration.{days}' in catalog:
+                message += catalog.text(f'simple.celebration.{days}')
+            else:
+                message += catalog.text('simple.celebration', days=days)
+            message += f"\n{CELEBRATION_EMOJIS}"
+
+        # Check for birthdays
+        birthday_person = self.birthday_person(couple, today)
+        if birthday_person:
+            message += "\n\n" + catalog.text('simple.birthday', name=birthday_person)
+
+        return message
+
+_renderers = {}
+_renderers_lock = threading.Lock()
+
+def get_renderer(config):
+    """Get the shared renderer for a Config, creating it on first use."""
+    with _renderers_lock:
+        renderer = _renderers.get(config.settings_db)
+        if renderer is None:
+            languages = get_language_preferences(config.settings_db, config.language)
+            renderer = _renderers[config.settings_db] = MessageRenderer(config, languages)
+    return renderer
@@ -4,71 +4,330 @@ Scheduler module for the Telegram relationship bot.
 Handles daily message scheduling and special occasion detection.
 """
 
-import schedule
+import heapq
 import time
 import threading
-from datetime import datetime, date
+from datetime import date
 import logging
-import pytz
 from config import Config
-from utils import calculate_days_together
+from utils import write_file_atomically
+from couple_store import CoupleStore
+from send_windows import format_send_time, plan_store_slots
+from timezones import get_transition_table, local_date, store_next_local_times
+from supervisor import HEARTBEATS
+from message_selection import stable_hash
+from snapshot import load_snapshot, write_snapshot
+from couple_db import database_generation, load_couple_store
+from lanes import BULK, BulkLane, use_lane
 
 logger = logging.getLogger(__name__)
 
-def start_scheduler(bot):
-    """Start the message scheduler."""
+# Kinds of scheduled work
+DAILY_MESSAGE = 0
+BIRTHDAY_CHECK = 1
+
+# Birthday checks run at 00:01 local time
+BIRTHDAY_CHECK_SECOND = 60
+
+# Seconds between checks for couples imported into the couples database
+COUPLES_RELOAD_INTERVAL = 60
+
+# Daily messages more than this late (e.g. after downtime) are skipped, not sent
+MISSED_SEND_GRACE = 3600
+
+# Due-queue entries are packed into one int: due timestamp, kind and couple index
+INDEX_BITS = 22
+KIND_BITS = 1
+MAX_COUPLES = 1 << INDEX_BITS
+
+class DueQueue:
+    """Min-heap of upcoming per-couple work, packed as plain ints."""
+
+    def __init__(self, entries=()):
+        self.heap = list(entries)
+        heapq.heapify(self.heap)
+
+    @classmethod
+    def from_heap(cls, heap):
+        """Create a queue from entries that are already in heap order."""
+        queue = cls()
+        queue.heap = list(heap)
+        return queue
+
+    @staticmethod
+    def pack(due, kind, index):
+        """Pack an entry, raising ValueError for fields that would spill into each other."""
+        if not 0 <= index < MAX_COUPLES:
+            raise ValueError(f"Couple index {index} does not fit in {INDEX_BITS} bits")
+        if not 0 <= kind < (1 << KIND_BITS):
+            raise ValueError(f"Unknown scheduled work kind {kind}")
+        if due < 0:
+            raise ValueError(f"Due timestamp {due} is negative")
+        return (int(due) << (INDEX_BITS + KIND_BITS)) | (kind << INDEX_BITS) | index
+
+    @staticmethod
+    def unpack(entry):
+        return (
+            entry >> (INDEX_BITS + KIND_BITS),
+            (entry >> INDEX_BITS) & ((1 << KIND_BITS) - 1),
+            entry & ((1 << INDEX_BITS) - 1)
+        )
+
+    def push(self, due, kind, index):
+        heapq.heappush(self.heap, self.pack(due, kind, index))
+
+    def pop_due(self, now):
+        """Pop every entry due at or before now as (due, kind, index) tuples."""
+        limit = (int(now) + 1) << (INDEX_BITS + KIND_BITS)
+        while self.heap and self.heap[0] < limit:
+            yield self.unpack(heapq.heappop(self.heap))
+
+    def next_due(self):
+        """Get the timestamp of the earliest entry, or None when empty."""
+        if not self.heap:
+            return None
+        return self.heap[0] >> (INDEX_BITS + KIND_BITS)
+
+    def __len__(self):
+        return len(self.heap)
+
+def build_due_queue(store, slots, now):
+    """Build the due queue holding every couple's next daily message and birthday check."""
+    if len(store) > MAX_COUPLES:
+        raise ValueError(f"{len(store)} couples is more than the scheduler supports ({MAX_COUPLES})")
+    daily = store_next_local_times(store, now, slots)
+    birthdays = store_next_local_times(store, now, [BIRTHDAY_CHECK_SECOND] * len(store))
+    queue = DueQueue(
+        [DueQueue.pack(due, DAILY_MESSAGE, index) for index, due in enumerate(daily)] +
+        [DueQueue.pack(due, BIRTHDAY_CHECK, index) for index, due in enumerate(birthdays)]
+    )
+    return queue
+
+def state_fingerprint(config):
+    """Get a hash of the settings the couple store and send slots are built from."""
+    couples_db = (config.couples_db, database_generation(config.couples_db)) if config.couples_db else ()
+    return stable_hash(
+        config.group_id, config.relationship_start_date, config.partner1_name, config.partner2_name,
+        config.partner1_birthday, config.partner2_birthday, config.timezone,
+        config.daily_message_hour, config.daily_message_minute,
+        config.send_window_minutes, config.send_rate_limit, *couples_db
+    )
+
+def load_couples(config):
+    """Build the couple store from the couples database, or from the Config's single couple."""
+    if config.couples_db:
+        store = load_couple_store(config.couples_db)
+        logger.info(f"✅ Loaded {len(store)} couples from {config.couples_db}")
+        if len(store):
+            return store
+        logger.warning("⚠️ Couples database is empty, using the configured couple")
+    return CoupleStore.from_config(config)
+
+def load_state(config, now):
+    """
+    Get (store, slots, queue, fingerprint), restored from the snapshot when
+    possible. The fingerprint identifies the settings the state was built from.
+    """
+    fingerprint = state_fingerprint(config)
+    snapshot = load_snapshot(config.snapshot_path, fingerprint)
+    if snapshot is not None:
+        queue = DueQueue.from_heap(snapshot.section('due_heap'))
+        store, slots = snapshot.couple_store(), snapshot.section('slots')
+        logger.info(f"✅ Restored scheduler state for {len(snapshot.section('group_ids'))} groups from snapshot")
+        # Work run after the snapshot was written must not run again
+        skipped = skip_handled(store, slots, queue, load_handled_through(config))
+        if skipped:
+            logger.info(f"✅ Skipped {skipped} entries already handled before the restart")
+        return store, slots, queue, fingerprint
+
+    store = load_couples(config)
+    slots = plan_store_slots(store, config.send_window_minutes, config.send_rate_limit, now)
+    queue = build_due_queue(store, slots, now)
+    if config.snapshot_path:
+        save_state(config, store, slots, queue, fingerprint)
+    return store, slots, queue, fingerprint
+
+def handled_through_path(config):
+    """Get the file recording the time up to which all due work has run."""
+    return f"{config.snapshot_path}.handled"
+
+def save_handled_through(config, now):
+    """
+    Record that every entry due at or before now has run. The snapshot is only
+    written every snapshot_interval, so after a crash this keeps the restored
+    queue from sending the same daily messages again.
+    """
+    try:
+        write_file_atomically(handled_through_path(config), str(int(now)), sync=True)
+    except Exception as e:
+        logger.error(f"❌ Error recording handled scheduler work: {e}")
+
+def load_handled_through(config):
+    """Get the time up to which all due work has run, or 0 if unknown."""
+    try:
+        with open(handled_through_path(config), encoding='ascii') as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return 0
+
+def skip_handled(store, slots, queue, handled_through):
+    """Move entries due at or before handled_through to their next occurrence without running them."""
+    skipped = 0
+    for due, kind, index in list(queue.pop_due(handled_through)):
+        second = slots[index] if kind == DAILY_MESSAGE else BIRTHDAY_CHECK_SECOND
+        queue.push(get_transition_table(store[index].timezone).next_local_time(due, second), kind, index)
+        skipped += 1
+    return skipped
+
+def save_state(config, store, slots, queue, fingerprint):
+    """Write a snapshot of the scheduler state."""
+    try:
+        size = write_snapshot(config.snapshot_path, store, slots, queue.heap, fingerprint)
+        logger.debug(f"Scheduler snapshot written ({size} bytes)")
+    except Exception as e:
+        logger.error(f"❌ Error writing scheduler snapshot: {e}")
+
+def start_scheduler(bot, stop_event=None):
+    """Start the message scheduler (runs until stop_event is set)."""
+    stop_event = stop_event or threading.Event()
     config = Config()
-    
-    # Schedule daily messages at 9:00 AM Asia/Tehran
-    tz = pytz.timezone('Asia/Tehran')
-    schedule_time = datetime.now(tz).replace(
-        hour=config.daily_message_hour,
-        minute=config.daily_message_minute,
-        second=0,
-        microsecond=0
-    ).strftime('%H:%M')
-    schedule.every().day.at(schedule_time, tz).do(send_scheduled_message, bot)
-    
-    # Schedule birthday checks at midnight Asia/Tehran
-    schedule.every().day.at("00:01", tz).do(check_birthdays, bot)
-    
-    logger.info(f"✅ Scheduler started - Daily messages at {schedule_time} Asia/Tehran")
-    
-    # Run scheduler in a loop
-    while True:
+
+    # Daily messages go out at 9:00 AM in each couple's own timezone, shifted by
+    # the group's stable offset inside the send window
+    store, slots, queue, fingerprint = load_state(config, time.time())
+    bot.couples = store
+
+    if len(slots):
+        schedule_time = format_send_time(0, 0, min(slots))
+        logger.info(f"✅ Scheduler started - Daily messages at {schedule_time} {config.timezone}")
+    else:
+        logger.warning("⚠️ Scheduler started without any couples, no daily messages will be sent")
+
+    # Scheduled sends run in the bulk lane, apart from replies to commands
+    lane = BulkLane(config.bulk_workers, config.bulk_queue_size)
+
+    # Run scheduler in a loop; snapshots are taken between runs so they are consistent
+    last_snapshot = last_reload_check = time.monotonic()
+    while not stop_event.is_set():
         try:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
+            now = time.time()
+            with use_lane(BULK):
+                handled = run_due(bot, store, slots, queue, now, lane)
+            if handled and config.snapshot_path:
+                save_handled_through(config, now)
+            HEARTBEATS.beat('scheduler')
+            if config.snapshot_path and time.monotonic() - last_snapshot >= config.snapshot_interval:
+                save_state(config, store, slots, queue, fingerprint)
+                last_snapshot = time.monotonic()
+            if config.couples_db and time.monotonic() - last_reload_check >= COUPLES_RELOAD_INTERVAL:
+                store, slots, queue, fingerprint = reload_state(bot, config, store, slots, queue, fingerprint)
+                last_reload_check = time.monotonic()
+            stop_event.wait(1)  # Check every second so send window slots are kept
         except Exception as e:
             logger.error(f"❌ Error in scheduler: {e}")
-            time.sleep(60)
+            stop_event.wait(60)
+
+    if config.snapshot_path:
+        save_state(config, store, slots, queue, fingerprint)
+
+def reload_state(bot, config, store, slots, queue, fingerprint):
+    """Rebuild the scheduler state if couples were imported since it was built, and hand the bot the new store."""
+    if state_fingerprint(config) == fingerprint:
+        return store, slots, queue, fingerprint
+    store, slots, queue, fingerprint = load_state(config, time.time())
+    bot.couples = store
+    logger.info(f"🔄 Couples database changed, scheduling {len(store)} couples")
+    return store, slots, queue, fingerprint
+
+def run_due(bot, store, slots, queue, now, lane=None):
+    """
+    Run all work that is due and queue each couple's next occurrence (daily
+    sends on lane if given). Returns the number of entries handled; all of
+    them are done when it returns.
+    """
+    daily_indices = []
+    skipped = 0
+    entries = list(queue.pop_due(now))
+    for due, kind, index in entries:
+        table = get_transition_table(store[index].timezone)
+        if kind == DAILY_MESSAGE:
+            if now - due > MISSED_SEND_GRACE:
+                # Missed while the bot was down; wait for the next day instead
+                skipped += 1
+                queue.push(table.next_local_time(now, slots[index]), kind, index)
+                continue
+            daily_indices.append(index)
+            queue.push(table.next_local_time(due, slots[index]), kind, index)
+        elif table.local_ordinal(due) != table.local_ordinal(int(now)):
+            # A birthday check from an earlier day, only today's is still useful
+            queue.push(table.next_local_time(now, BIRTHDAY_CHECK_SECOND), kind, index)
+        else:
+            today = date.fromordinal(table.local_ordinal(due))
+            check_birthdays(bot, store[index], today)
+            check_events(bot, store[index], today)
+            refresh_countdown(bot, store[index], today)
+            queue.push(table.next_local_time(due, BIRTHDAY_CHECK_SECOND), kind, index)
 
-def send_scheduled_message(bot):
-    """Send the scheduled daily message."""
+    if skipped:
+        logger.warning(f"⚠️ Skipped {skipped} daily messages missed by more than {MISSED_SEND_GRACE // 60} minutes")
+    if daily_indices:
+        send_scheduled_batch(bot, store, daily_indices, lane)
+    return len(entries)
+
+def send_scheduled_batch(bot, store, indices, lane=None):
+    """
+    Send the scheduled daily message to a batch of couples from the store,
+    in parallel on a BulkLane if given, and wait until all are sent.
+    """
+    logger.info(f"⏰ Sending scheduled daily message to {len(indices)} groups...")
+    for index in indices:
+        if lane is not None:
+            lane.submit(send_scheduled_to, bot, store[index])
+        else:
+            send_scheduled_to(bot, store[index])
+    if lane is not None:
+        lane.join()
+
+def send_scheduled_to(bot, couple):
+    """Send the scheduled daily message to one couple."""
+    HEARTBEATS.beat('scheduler')
     try:
-        logger.info("⏰ Sending scheduled daily message...")
-        bot.send_daily_message()
+        bot.send_daily_message(couple)
     except Exception as e:
         logger.error(f"❌ Error sending scheduled message: {e}")
 
-def check_birthdays(bot):
+def check_birthdays(bot, couple=None, today=None):
     """Check if today is anyone's birthday."""
     try:
-        config = Config()
-        today = date.today()
-        
-        if config.is_partner_birthday(today):
-            partner_name = config.get_birthday_partner_name(today)
+        couple = couple or Config()
+        today = today or local_date(couple.timezone)
+
+        if couple.is_partner_birthday(today):
+            partner_name = couple.get_birthday_partner_name(today)
             logger.info(f"🎂 Today is {partner_name}'s birthday!")
-            bot.send_birthday_message(partner_name)
-        
+            bot.send_birthday_message(partner_name, couple)
+
     except Exception as e:
         logger.error(f"❌ Error checking birthdays: {e}")
 
+def check_events(bot, couple, today):
+    """Send the messages of a couple's custom events due today."""
+    try:
+        bot.send_event_messages(couple, today)
+    except Exception as e:
+        logger.error(f"❌ Error checking events: {e}")
+
+def refresh_countdown(bot, couple, today):
+    """Move a couple's pinned countdown message to the new day."""
+    try:
+        bot.refresh_live_countdown(couple, today)
+    except Exception as e:
+        logger.error(f"❌ Error refreshing live countdown: {e}")
+
 def manual_send_message(bot):
     """Manually send a message (for testing purposes)."""
     try:
         logger.info("📤 Manually sending message...")
         bot.send_daily_message()
     except Exception as e:
-        logger.error(f"❌ Error manually sending message: {e}")
\ No newline at end of file
+        logger.error(f"❌ Error manually sending message: {e}")
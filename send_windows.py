@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Send window planning for the Telegram relationship bot.
+Spreads daily messages over a window so couples are not all sent at the same second.
+"""
+
+from array import array
+import hashlib
+import logging
+import time
+from timezones import get_transition_table
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+
+def couple_offset_seconds(couple_key, window_minutes):
+    """Get a stable offset in seconds for a couple within the send window."""
+    window_seconds = int(window_minutes) * 60
+    if window_seconds <= 0:
+        return 0
+
+    digest = hashlib.blake2b(str(couple_key).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % window_seconds
+
+def plan_send_slots(couple_keys, window_minutes, rate_limit):
+    """
+    Assign every couple a send offset (in seconds) inside the send window.
+
+    Couples keep their stable offset when there is capacity for it; otherwise they
+    move to the next second with a free slot, so no second gets more than
+    rate_limit messages. Couples that do not fit before the end of the window
+    take free slots earlier in the window, and only when the whole window is full
+    do sends spill past its end.
+    """
+    window_seconds = max(int(window_minutes) * 60, 1)
+    rate_limit = max(int(rate_limit), 1)
+
+    preferred = sorted(
+        (couple_offset_seconds(key, window_minutes), key) for key in couple_keys
+    )
+    used = [0] * window_seconds
+    slots = {}
+    overflow = []
+
+    # Forward pass: keep each couple at or after its own offset
+    cursor = 0
+    for offset, key in preferred:
+        second = max(offset, cursor)
+        while second < window_seconds and used[second] >= rate_limit:
+            second += 1
+        if second >= window_seconds:
+            overflow.append(key)
+            continue
+        used[second] += 1
+        slots[key] = second
+        cursor = second
+
+    # Second pass: place the rest in free slots earlier in the window
+    second = 0
+    for index, key in enumerate(overflow):
+        while second < window_seconds and used[second] >= rate_limit:
+            second += 1
+        if second >= window_seconds:
+            spill = overflow[index:]
+            logger.warning(
+                f"⚠️ Send window of {window_minutes} minutes is full, "
+                f"{len(spill)} messages will be sent after the window"
+            )
+            for extra, spill_key in enumerate(spill):
+                slots[spill_key] = window_seconds + extra // rate_limit
+            break
+        used[second] += 1
+        slots[key] = second
+
+    return slots
+
+def format_send_time(hour, minute, offset_seconds=0):
+    """Format the base send time plus an offset as HH:MM:SS for the scheduler."""
+    total = (hour * 3600 + minute * 60 + int(offset_seconds)) % SECONDS_PER_DAY
+    return f"{total // 3600:02d}:{total % 3600 // 60:02d}:{total % 60:02d}"
+
+def peak_rate(slots):
+    """Get the highest number of messages planned for a single second."""
+    counts = {}
+    for second in (slots.values() if isinstance(slots, dict) else slots):
+        counts[second] = counts.get(second, 0) + 1
+    return max(counts.values(), default=0)
+
+class FreeSeconds:
+    """
+    Per-second send counts of a day with a "next second that is not full"
+    lookup (union-find with path compression, wrapping around midnight).
+    """
+
+    def __init__(self, rate_limit):
+        self.rate_limit = rate_limit
+        self.used = array('I', bytes(4 * SECONDS_PER_DAY))
+        self.next = array('l', range(SECONDS_PER_DAY))
+
+    def find(self, second):
+        """Get the first second at or after second (mod one day) that is not full."""
+        root = second % SECONDS_PER_DAY
+        while self.next[root] != root:
+            root = self.next[root]
+        # Point every second on the way straight at the result
+        second %= SECONDS_PER_DAY
+        while self.next[second] != root:
+            self.next[second], second = root, self.next[second]
+        return root
+
+    def take(self, second):
+        """Count one send in a second that is not full."""
+        self.used[second] += 1
+        if self.used[second] >= self.rate_limit:
+            self.next[second] = (second + 1) % SECONDS_PER_DAY
+
+def plan_store_slots(store, window_minutes, rate_limit, now=None):
+    """
+    Plan the local send time (second of the day) of every couple in a CoupleStore.
+
+    Each couple starts from its own send minute plus its stable window offset,
+    and the same per-second rate limit is applied across all couples. Seconds
+    are counted in UTC with each timezone's offset at now, so couples in
+    different timezones sharing a local second do not share a rate limit
+    bucket unless they really send at the same instant. Like
+    plan_send_slots, couples that do not fit at or after their offset take
+    free seconds earlier in their window, and only when the whole window is
+    full do sends spill past its end. Raises ValueError when the couples can
+    not be sent within one day at rate_limit messages per second.
+    """
+    rate_limit = max(int(rate_limit), 1)
+    if len(store) > rate_limit * SECONDS_PER_DAY:
+        raise ValueError(
+            f"{len(store)} daily messages do not fit in one day at {rate_limit} messages per second")
+    window_seconds = max(int(window_minutes) * 60, 1)
+    now = int(time.time() if now is None else now)
+    zone_offsets = [get_transition_table(name).offset_at(now) for name in store.timezones.strings]
+    offsets = array('l', (zone_offsets[tz_id] for tz_id in store.timezone_ids))
+    # Preferred and window start seconds in UTC
+    preferred = array('l', (
+        minute * 60 + couple_offset_seconds(group_id, window_minutes) - offset
+        for minute, group_id, offset in zip(store.send_minutes, store.group_ids, offsets)
+    ))
+
+    free = FreeSeconds(rate_limit)
+    slots = array('l', bytes(preferred.itemsize * len(preferred)))
+    overflow = []
+
+    # Forward pass: keep each couple at or after its own offset, inside its window
+    order = sorted(range(len(preferred)), key=lambda index: preferred[index] % SECONDS_PER_DAY)
+    for index in order:
+        window_start = store.send_minutes[index] * 60 - offsets[index]
+        second = free.find(preferred[index])
+        if (second - window_start) % SECONDS_PER_DAY >= window_seconds:
+            overflow.append(index)
+            continue
+        free.take(second)
+        slots[index] = (second + offsets[index]) % SECONDS_PER_DAY
+
+    # Second pass: free seconds earlier in the window, else the first ones after it
+    spilled = 0
+    for index in overflow:
+        window_start = store.send_minutes[index] * 60 - offsets[index]
+        second = free.find(window_start)
+        if (second - window_start) % SECONDS_PER_DAY >= window_seconds:
+            spilled += 1
+        free.take(second)
+        slots[index] = (second + offsets[index]) % SECONDS_PER_DAY
+    if spilled:
+        logger.warning(
+            f"⚠️ Send window of {window_minutes} minutes is full, "
+            f"{spilled} messages will be sent after the window"
+        )
+
+    return slots
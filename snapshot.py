@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Binary snapshots of scheduler state for the Telegram relationship bot.
+Saves the couple store columns, its interned strings and indexes, the planned
+send slots and the due-queue heap in one versioned file, written atomically.
+On boot the file is memory-mapped and the columns are used in place, so
+restoring costs about the same for ten couples as for a million.
+
+File layout (native byte order, recorded in the header):
+    header      magic, version, byte order, section count, created at,
+                state fingerprint, CRC-32 of everything after the header
+    sections    per section: name (24 bytes), array typecode, data offset, item count
+    data        each section's raw array bytes, 8-byte aligned
+"""
+
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from couple_store import CoupleStore, StringTable
+from utils import write_file_atomically
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RBSS'
+VERSION = 2
+HEADER = struct.Struct('<4sHBxHxxqQI4x')
+SECTION = struct.Struct('<24sc7xQQ')
+BYTE_ORDERS = {'little': 0, 'big': 1}
+
+def pack_strings(strings):
+    """Pack strings into an offsets array and one UTF-8 blob."""
+    offsets = array('I', [0])
+    blob = bytearray()
+    for value in strings:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    return offsets, array('B', blob)
+
+class PackedStrings:
+    """Sequence of strings decoded lazily from an offsets array and a UTF-8 blob."""
+
+    __slots__ = ('offsets', 'blob')
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError(f"String index {index} out of range")
+        return str(self.blob[self.offsets[index]:self.offsets[index + 1]], 'utf-8')
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+def build_snapshot_bytes(store, slots, heap, fingerprint=0, created=None):
+    """Build the snapshot of a couple store, its send slots and a due-queue heap."""
+    sections = dict(store.columns())
+    sections['names.offsets'], sections['names.blob'] = pack_strings(store.names.strings)
+    sections['zones.offsets'], sections['zones.blob'] = pack_strings(store.timezones.strings)
+    sections['usernames.offsets'], sections['usernames.blob'] = pack_strings(store.usernames.strings)
+    sections['group_order'] = store.group_order()
+    sections['start_order'] = store.start_order()
+    sections['slots'] = slots
+    sections['due_heap'] = heap if isinstance(heap, array) else array('q', heap)
+
+    table_size = HEADER.size + SECTION.size * len(sections)
+    entries = []
+    chunks = []
+    position = table_size
+    for name, column in sections.items():
+        typecode = getattr(column, 'typecode', None) or column.format
+        data = column.tobytes() if isinstance(column, array) else bytes(column)
+        padding = -position % 8
+        chunks.append(b'\0' * padding)
+        position += padding
+        entries.append(SECTION.pack(name.encode('ascii'), typecode.encode('ascii'), position, len(column)))
+        chunks.append(data)
+        position += len(data)
+
+    body = b''.join(entries) + b''.join(chunks)
+    header = HEADER.pack(
+        MAGIC, VERSION, BYTE_ORDERS[sys.byteorder], len(sections),
+        int(created if created is not None else time.time()), fingerprint, zlib.crc32(body)
+    )
+    return header + body
+
+def write_snapshot(path, store, slots, heap, fingerprint=0):
+    """Write a snapshot file atomically; returns its size in bytes."""
+    data = build_snapshot_bytes(store, slots, heap, fingerprint)
+    write_file_atomically(path, data, sync=True)
+
+    # Make the rename itself durable
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return len(data)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+    return len(data)
+
+class Snapshot:
+    """Read-only view of a snapshot. Sections are zero-copy memoryviews of the buffer."""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        magic, version, byte_order, count, created, fingerprint, crc = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a version {VERSION} scheduler snapshot")
+        if byte_order != BYTE_ORDERS[sys.byteorder]:
+            raise ValueError("Snapshot was written on a machine with a different byte order")
+        if zlib.crc32(view[HEADER.size:]) != crc:
+            raise ValueError("Snapshot checksum mismatch")
+
+        self.created = created
+        self.fingerprint = fingerprint
+        self.sections = {}
+        for number in range(count):
+            name, typecode, offset, items = SECTION.unpack_from(view, HEADER.size + SECTION.size * number)
+            typecode = typecode.decode('ascii')
+            size = array(typecode).itemsize * items
+            self.sections[name.rstrip(b'\0').decode('ascii')] = view[offset:offset + size].cast(typecode)
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a snapshot file read-only."""
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped)
+
+    def section(self, name):
+        return self.sections[name]
+
+    def couple_store(self):
+        """Get a CoupleStore backed by the snapshot's columns."""
+        store = CoupleStore()
+        for name in store.columns():
+            setattr(store, name, self.sections[name])
+        store.names = StringTable.from_sequence(
+            PackedStrings(self.sections['names.offsets'], self.sections['names.blob']))
+        store.timezones = StringTable.from_sequence(
+            PackedStrings(self.sections['zones.offsets'], self.sections['zones.blob']))
+        store.usernames = StringTable.from_sequence(
+            PackedStrings(self.sections['usernames.offsets'], self.sections['usernames.blob']))
+        store.set_indexes(self.sections['group_order'], self.sections['start_order'])
+        return store
+
+def load_snapshot(path, fingerprint=None):
+    """
+    Open a snapshot, or return None when it is missing, damaged, or was taken
+    for different settings (fingerprint mismatch).
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        snapshot = Snapshot.open(path)
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f"⚠️ Ignoring scheduler snapshot {path}: {e}")
+        return None
+    if fingerprint is not None and snapshot.fingerprint != fingerprint:
+        logger.info(f"Scheduler snapshot {path} is for other settings, rebuilding")
+        return None
+    return snapshot
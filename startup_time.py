@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Startup time measurement for the Telegram relationship bot.
+Starts each bot entry point in fresh interpreters, times importing it,
+creating the bot and rendering the first daily message, and compares the
+medians with a saved baseline so startup regressions can be caught.
+"""
+
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Code run in each fresh interpreter; prints the phase timings as JSON
+PROBE = """
+import json, logging, sys, time
+logging.disable(logging.CRITICAL)
+target = sys.argv[1]
+started = time.perf_counter()
+if target == 'main':
+    import main, keep_alive, scheduler
+    from bot import RelationshipBot
+elif target == 'interactive':
+    import interactive_bot
+else:
+    import simple_bot
+imported = time.perf_counter()
+if target == 'main':
+    RelationshipBot()
+created = time.perf_counter()
+from config import Config
+from renderer import get_renderer
+renderer = get_renderer(Config())
+renderer.daily_message(renderer.days_together())
+rendered = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'init_ms': (created - imported) * 1000,
+    'first_message_ms': (rendered - created) * 1000,
+    'total_ms': (rendered - started) * 1000,
+    'modules': len(sys.modules)
+}))
+"""
+
+TARGETS = ('main', 'interactive', 'simple')
+
+def probe(target):
+    """Start a target once in a fresh interpreter and get its phase timings."""
+    env = dict(os.environ, PYTHONPATH=PACKAGE_DIR, PYTHONDONTWRITEBYTECODE='1')
+    # Never talk to Telegram, and keep the SQLite files out of the working tree
+    env['BOT_TOKEN'] = '0:startup-time'
+    env.setdefault('GROUP_ID', '-1')
+    for name in ('TRACE_FILE', 'POLL_LEASE_DB', 'ANALYTICS_DB', 'COUPLES_DB', 'SNAPSHOT_PATH'):
+        env.pop(name, None)
+    with tempfile.TemporaryDirectory() as workdir:
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE, target],
+            cwd=workdir, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def measure(target, runs=5):
+    """Get the median phase timings of a target over several fresh starts."""
+    samples = [probe(target) for _ in range(runs)]
+    return {key: round(statistics.median(sample[key] for sample in samples), 1) for key in samples[0]}
+
+def compare(report, baseline, tolerance=0.25):
+    """Get the targets whose median total startup is over the baseline by more than tolerance."""
+    regressions = []
+    for target, timings in report.items():
+        expected = baseline.get(target, {}).get('total_ms')
+        if expected and timings['total_ms'] > expected * (1 + tolerance):
+            regressions.append(f"{target}: {timings['total_ms']} ms, baseline {expected} ms")
+    return regressions
+
+def main(argv):
+    """Command line: python startup_time.py [--target main|interactive|simple|all] [--runs N] [--save FILE] [--baseline FILE] [--tolerance 0.25]"""
+    options = {'--target': 'all', '--runs': '5', '--save': None, '--baseline': None, '--tolerance': '0.25'}
+    arguments = argv[1:]
+    while arguments:
+        option = arguments.pop(0)
+        if option not in options or not arguments:
+            print(main.__doc__)
+            return 2
+        options[option] = arguments.pop(0)
+
+    targets = TARGETS if options['--target'] == 'all' else (options['--target'],)
+    report = {target: measure(target, int(options['--runs'])) for target in targets}
+    print(json.dumps(report, indent=2))
+
+    if options['--save']:
+        with open(options['--save'], 'w', encoding='utf-8') as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+    if options['--baseline']:
+        with open(options['--baseline'], encoding='utf-8') as baseline_file:
+            regressions = compare(report, json.load(baseline_file), float(options['--tolerance']))
+        for regression in regressions:
+            print(f"❌ Startup regression - {regression}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
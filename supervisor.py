@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Component supervisor for the Telegram relationship bot.
+Runs the poller and scheduler loops, tracks their heartbeats and restarts any
+component that dies or stops making progress.
+"""
+
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class Heartbeats:
+    """
+    Last heartbeat of every component.
+
+    A heartbeat is a single dict store of a monotonic timestamp, which is atomic
+    under the GIL, so hot loops can call beat() without taking a lock.
+    """
+
+    def __init__(self):
+        self._beats = {}
+
+    def beat(self, name):
+        """Record that a component made progress just now."""
+        self._beats[name] = time.monotonic()
+
+    def last(self, name):
+        """Get the monotonic time of a component's last heartbeat, or None."""
+        return self._beats.get(name)
+
+    def lag(self, name, since=None):
+        """Get seconds since a component's last heartbeat, or since `since` if that is later."""
+        last = self._beats.get(name)
+        if since is not None and (last is None or since > last):
+            last = since
+        if last is None:
+            return None
+        return time.monotonic() - last
+
+HEARTBEATS = Heartbeats()
+
+def beat_through_workers(bot, name='dispatch'):
+    """
+    Send a heartbeat through a TeleBot's handler worker pool, so a backed-up
+    dispatch queue shows up as lag.
+    """
+    worker_pool = getattr(bot, 'worker_pool', None)
+    if worker_pool is not None:
+        worker_pool.put(HEARTBEATS.beat, name)
+    else:
+        HEARTBEATS.beat(name)
+
+class Component:
+    """A supervised component: an optional loop target plus its stall timeout."""
+
+    def __init__(self, name, target, stall_timeout):
+        self.name = name
+        self.target = target
+        self.stall_timeout = stall_timeout
+        self.thread = None
+        self.stop_event = None
+        self.started_at = time.monotonic()
+        self.restarts = 0
+        self.restart_delay = Supervisor.MIN_RESTART_DELAY
+        self.next_restart_at = 0.0
+        # Monotonic time the component was asked to stop, until its thread exits
+        self.stopping_since = None
+
+def exit_process():
+    """Exit the whole process so the outer restart (Replit, systemd) starts it fresh."""
+    logging.shutdown()
+    os._exit(1)
+
+class Supervisor:
+    """
+    Supervises long-running component loops.
+
+    Each target is called as target(stop_event) in its own thread and is
+    expected to call HEARTBEATS.beat(name) while it makes progress. A component
+    whose thread has died or whose heartbeat is older than its stall timeout is
+    asked to stop and started again, with exponential backoff between restarts.
+    A new thread is only started once the old one has exited, so two copies of
+    a loop (two schedulers, two getUpdates callers) never run side by side; if
+    the old thread does not exit within stop_timeout seconds the whole process
+    exits instead. Components without a target are only watched and reported.
+    """
+
+    MIN_RESTART_DELAY = 1
+    MAX_RESTART_DELAY = 300
+    STOP_TIMEOUT = 30
+
+    def __init__(self, heartbeats=HEARTBEATS, check_interval=5, stop_timeout=STOP_TIMEOUT, on_stuck=exit_process):
+        self.heartbeats = heartbeats
+        self.check_interval = check_interval
+        self.stop_timeout = stop_timeout
+        self.on_stuck = on_stuck
+        self.components = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, target, stall_timeout):
+        """Register a component loop to run and supervise."""
+        self.components[name] = Component(name, target, stall_timeout)
+
+    def watch(self, name, stall_timeout):
+        """Register a heartbeat-only component that is reported but not restarted."""
+        self.components[name] = Component(name, None, stall_timeout)
+
+    def start(self):
+        """Start every component and make this the active supervisor."""
+        global _active_supervisor
+        _active_supervisor = self
+        for component in self.components.values():
+            if component.target is not None:
+                self._start_component(component)
+
+    def _start_component(self, component):
+        component.stopping_since = None
+        component.stop_event = threading.Event()
+        component.started_at = time.monotonic()
+        component.thread = threading.Thread(
+            target=self._run_component,
+            args=(component, component.stop_event),
+            name=component.name,
+            daemon=True
+        )
+        component.thread.start()
+        logger.info(f"✅ Component {component.name} started")
+
+    def _run_component(self, component, stop_event):
+        try:
+            component.target(stop_event)
+        except Exception as e:
+            logger.error(f"❌ Component {component.name} crashed: {e}")
+        else:
+            if not stop_event.is_set():
+                logger.error(f"❌ Component {component.name} exited unexpectedly")
+
+    def lag(self, component):
+        return self.heartbeats.lag(component.name, since=component.started_at)
+
+    def check(self):
+        """Restart every component that has died or stalled."""
+        now = time.monotonic()
+        with self._lock:
+            for component in self.components.values():
+                if component.target is None:
+                    continue
+
+                if component.stopping_since is not None:
+                    self._finish_stopping(component, now)
+                    continue
+
+                dead = not component.thread.is_alive()
+                stalled = self.lag(component) > component.stall_timeout
+                if not dead and not stalled:
+                    component.restart_delay = self.MIN_RESTART_DELAY
+                    continue
+                if now < component.next_restart_at:
+                    continue
+
+                reason = 'died' if dead else f"stalled for {self.lag(component):.0f}s"
+                logger.warning(f"🔄 Restarting component {component.name} ({reason})...")
+                component.stop_event.set()
+                component.restarts += 1
+                component.next_restart_at = now + component.restart_delay
+                component.restart_delay = min(component.restart_delay * 2, self.MAX_RESTART_DELAY)
+                component.stopping_since = now
+                self._finish_stopping(component, now)
+
+    def _finish_stopping(self, component, now):
+        """Start a stopping component again once its old thread has exited."""
+        if not component.thread.is_alive():
+            self._start_component(component)
+            return
+        waited = now - component.stopping_since
+        if waited < self.stop_timeout:
+            logger.info(f"⏳ Waiting for component {component.name} to stop ({waited:.0f}s)")
+            return
+        logger.critical(f"❌ Component {component.name} did not stop within {self.stop_timeout}s, exiting the process")
+        self.on_stuck()
+
+    def run_forever(self):
+        """Check components periodically, forever."""
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"❌ Error in supervisor: {e}")
+            time.sleep(self.check_interval)
+
+    def status(self):
+        """Get the liveness of every component."""
+        result = {}
+        for component in self.components.values():
+            lag = self.lag(component)
+            alive = component.thread.is_alive() if component.thread else component.target is None
+            result[component.name] = {
+                'alive': alive,
+                'lag_seconds': round(lag, 3),
+                'stall_timeout': component.stall_timeout,
+                'restarts': component.restarts,
+                'stopping': component.stopping_since is not None,
+                'healthy': alive and lag <= component.stall_timeout,
+            }
+        return result
+
+    def healthy(self):
+        """Check if every component is alive and making progress."""
+        return all(component['healthy'] for component in self.status().values())
+
+_active_supervisor = None
+
+def get_supervisor():
+    """Get the running supervisor, or None if components are not supervised."""
+    return _active_supervisor
@@ -0,0 +1,26 @@
+"""Tests for the engagement analytics rollups."""
+
+from analytics import Analytics
+
+NOW = 1_700_000_000
+
+def test_channel_username_groups_are_counted(tmp_path):
+    analytics = Analytics()
+    analytics.db_path = str(tmp_path / 'analytics.db')
+    analytics.record('@couple_channel', 'daily', now=NOW)
+    analytics.record(-1001, 'quote', 'quote text', now=NOW)
+    assert analytics.group_stats('@couple_channel', NOW)['daily'] == {'today': 1, 'week': 1, 'total': 1}
+    assert analytics.flush() == 2
+
+    reloaded = Analytics()
+    reloaded.db_path = analytics.db_path
+    reloaded.load(NOW)
+    assert reloaded.group_stats('@couple_channel', NOW)['daily']['total'] == 1
+    assert reloaded.group_stats(-1001, NOW)['quote']['total'] == 1
+
+def test_numeric_group_id_strings_count_with_chat_ids():
+    analytics = Analytics()
+    analytics.record('-1001', 'daily', now=NOW)
+    analytics.record(-1001, 'daily', now=NOW)
+    assert analytics.group_stats(-1001, NOW)['daily']['total'] == 2
+    assert len(analytics.groups) == 1
@@ -0,0 +1,97 @@
+"""Tests for the circuit breaker of the Telegram API client."""
+
+import threading
+import pytest
+from telebot.apihelper import ApiTelegramException
+from api_client import CircuitBreaker, CircuitOpenError, TelegramApiClient
+from lanes import LaneBusyError
+
+def rate_limited(*args, **kwargs):
+    raise ApiTelegramException('sendMessage', None, {
+        'error_code': 429, 'description': 'Too Many Requests', 'parameters': {'retry_after': 0}})
+
+def server_error(*args, **kwargs):
+    raise ApiTelegramException('sendMessage', None, {'error_code': 502, 'description': 'Bad Gateway'})
+
+def lane_busy(*args, **kwargs):
+    raise LaneBusyError("busy")
+
+def programming_error(*args, **kwargs):
+    raise TypeError("send_message() got an unexpected keyword argument")
+
+def ok(*args, **kwargs):
+    return 'ok'
+
+def half_open_client():
+    """A client whose breaker has opened and is ready for its trial call."""
+    client = TelegramApiClient(None, max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0))
+    with pytest.raises(ApiTelegramException):
+        client.call(server_error)
+    assert client.breaker.state == CircuitBreaker.OPEN
+    return client
+
+def test_rate_limited_trial_releases_the_half_open_slot():
+    client = half_open_client()
+    with pytest.raises(ApiTelegramException):
+        client.call(rate_limited)
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+    assert not client.breaker._trial_running
+    # The next call is the new trial and closes the circuit
+    assert client.call(ok) == 'ok'
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+def test_rate_limited_trial_does_not_count_as_a_failure():
+    client = half_open_client()
+    failures = client.breaker.failures
+    with pytest.raises(ApiTelegramException):
+        client.call(rate_limited)
+    assert client.breaker.failures == failures
+
+def test_lane_busy_trial_releases_the_half_open_slot():
+    client = half_open_client()
+    with pytest.raises(LaneBusyError):
+        client.call(lane_busy)
+    assert client.call(ok) == 'ok'
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+def test_rate_limited_retries_keep_trying_as_trials():
+    client = half_open_client()
+    client.max_retries = 2
+    calls = []
+
+    def limited_then_ok():
+        calls.append(1)
+        if len(calls) < 3:
+            rate_limited()
+        return 'ok'
+
+    assert client.call(limited_then_ok) == 'ok'
+    assert len(calls) == 3
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+def test_only_the_trial_thread_releases_the_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    other = threading.Thread(target=breaker.record_neutral)
+    other.start()
+    other.join()
+    assert not breaker.allow()
+    breaker.record_neutral()
+    assert breaker.allow()
+
+def test_unknown_error_trial_leaves_the_circuit_half_open():
+    client = half_open_client()
+    failures = client.breaker.failures
+    with pytest.raises(TypeError):
+        client.call(programming_error)
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+    assert client.breaker.failures == failures
+    assert not client.breaker._trial_running
+
+def test_open_circuit_rejects_calls():
+    client = TelegramApiClient(None, max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    with pytest.raises(ApiTelegramException):
+        client.call(server_error)
+    with pytest.raises(CircuitOpenError):
+        client.call(ok)
@@ -0,0 +1,76 @@
+"""Tests for the command handlers shared by bot.py and interactive_bot.py."""
+
+import signal
+import sys
+from datetime import date
+from types import SimpleNamespace
+from commands import register_command_handlers
+from i18n import LanguagePreferences
+from renderer import MessageRenderer
+from timezones import local_date
+
+class FakeBot:
+    def __init__(self):
+        self.handlers = {}
+
+    def message_handler(self, commands):
+        def register(handler):
+            self.handlers[commands[0]] = handler
+            return handler
+        return register
+
+    def inline_handler(self, query_filter):
+        return self.message_handler(['inline'])
+
+class FakeApi:
+    def __init__(self):
+        self.replies = []
+
+    def reply_to(self, message, text):
+        self.replies.append(text)
+
+def couple(group_id, start_date):
+    return SimpleNamespace(group_id=group_id, relationship_start_date=start_date, timezone='UTC')
+
+def register(tmp_path, couples):
+    bot, api = FakeBot(), FakeApi()
+    languages = LanguagePreferences(str(tmp_path / 'settings.db'), 'en')
+    renderer = MessageRenderer(couples[-1], languages)
+    register_command_handlers(bot, api, renderer, languages, None, couples.__getitem__)
+    return bot, api
+
+def message(chat_id, text):
+    return SimpleNamespace(chat=SimpleNamespace(id=chat_id), text=text)
+
+def test_shared_commands_are_registered(tmp_path):
+    bot, _ = register(tmp_path, {-1: couple(-1, date(2024, 1, 1))})
+    assert set(bot.handlers) == {'start', 'help', 'milestone', 'quote', 'inline', 'advice', 'test', 'daily', 'stats'}
+
+def test_test_command_counts_the_chats_couple(tmp_path):
+    today = local_date('UTC')
+    couples = {-1: couple(-1, today), -2: couple(-2, date.fromordinal(today.toordinal() - 9))}
+    bot, api = register(tmp_path, couples)
+    bot.handlers['test'](message(-2, '/test'))
+    assert 'day 10 ' in api.replies[0]
+
+def test_start_lists_the_daily_command(tmp_path):
+    bot, api = register(tmp_path, {-1: couple(-1, date(2024, 1, 1))})
+    bot.handlers['start'](message(-1, '/start'))
+    assert '/daily' in api.replies[0]
+
+def registered_commands(telegram_bot):
+    return sorted(tuple(handler['filters']['commands']) for handler in telegram_bot.message_handlers)
+
+def test_both_bots_register_the_same_handlers(tmp_path, monkeypatch):
+    # Any process sharing POLL_LEASE_DB may claim any update
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('BOT_TOKEN', '0:test')
+    monkeypatch.setenv('GROUP_ID', '-1')
+    monkeypatch.setattr(signal, 'signal', lambda signum, handler: None)
+    monkeypatch.delitem(sys.modules, 'interactive_bot', raising=False)
+    import interactive_bot
+    from bot import RelationshipBot
+    main_bot = RelationshipBot().bot
+    assert registered_commands(main_bot) == registered_commands(interactive_bot.bot)
+    assert ('daily',) in registered_commands(main_bot)
+    assert len(main_bot.inline_handlers) == len(interactive_bot.bot.inline_handlers) == 1
@@ -0,0 +1,129 @@
+"""Tests for the columnar couple store."""
+
+import io
+import sqlite3
+from datetime import date
+from types import SimpleNamespace
+import pytest
+import couple_store
+from couple_db import import_couples, load_couple_store, validate_couple
+from couple_store import USERNAME_ID_BASE, CoupleStore
+
+@pytest.fixture(autouse=True)
+def plain_arrays(monkeypatch):
+    # The same results are expected with and without NumPy
+    monkeypatch.setattr(couple_store, 'np', None)
+
+def make_store():
+    store = CoupleStore()
+    store.add(-300, date(2024, 1, 1), 'Sara', 'Ali', '03-05', '02-29', 'Asia/Tehran', 9 * 60)
+    store.add(-100, date(2023, 6, 1), 'Mina', 'Reza', None, '07-10', 'Europe/Berlin', 8 * 60 + 30)
+    store.add(-200, date(2024, 1, 1), 'Sara', 'Omid', '07-10', None, 'Asia/Tehran', 21 * 60)
+    return store
+
+def test_add_returns_row_indexes_and_views_read_the_columns():
+    store = CoupleStore()
+    assert store.add(-300, date(2024, 1, 1), 'Sara', 'Ali', '03-05', '02-29', 'Asia/Tehran', 9 * 60) == 0
+    assert store.add(-100, date(2023, 6, 1), 'Mina', 'Reza', timezone='Europe/Berlin', send_minute=510) == 1
+    couple = store[0]
+    assert (couple.group_id, couple.relationship_start_date) == (-300, date(2024, 1, 1))
+    assert (couple.partner1_name, couple.partner2_name) == ('Sara', 'Ali')
+    assert (couple.partner1_birthday, couple.partner2_birthday) == ('03-05', '02-29')
+    assert couple.timezone == 'Asia/Tehran'
+    assert (store[1].daily_message_hour, store[1].daily_message_minute) == (8, 30)
+    assert store[1].partner1_birthday is None
+    assert len(store) == 2
+    with pytest.raises(IndexError):
+        store[2]
+
+def test_names_and_timezones_are_interned():
+    store = make_store()
+    assert len(store.names) == 5
+    assert len(store.timezones) == 2
+    assert store.partner1_name_ids[0] == store.partner1_name_ids[2]
+
+def test_find_by_group_id():
+    store = make_store()
+    assert store.find(-100).index == 1
+    assert store.find('-200').index == 2
+    assert store.find(-999) is None
+    store.add(-400, date(2024, 2, 1), 'A', 'B')
+    assert store.find(-400).index == 3
+
+def test_group_and_start_order():
+    store = make_store()
+    assert list(store.group_order()) == [0, 2, 1]
+    assert list(store.start_order()) == [1, 0, 2]
+
+def test_indices_with_days():
+    store = make_store()
+    today = date(2024, 4, 9).toordinal()
+    # Both couples of 2024-01-01 are on day 100, the 2023-06-01 one on day 314
+    assert list(store.indices_with_days(today, {100})) == [0, 2]
+    assert list(store.indices_with_days(today, {314, 1000})) == [1]
+    assert list(store.days_together(today)) == [100, 314, 100]
+
+def test_birthday_indices():
+    store = make_store()
+    assert list(store.birthday_indices(date(2024, 7, 10))) == [1, 2]
+    assert list(store.birthday_indices(date(2024, 2, 29))) == [0]
+    assert list(store.birthday_indices(date(2024, 3, 6))) == []
+
+def test_from_config():
+    config = SimpleNamespace(
+        group_id='-1001', relationship_start_date=date(2024, 1, 1), partner1_name='Sara', partner2_name='Ali',
+        partner1_birthday='09-22', partner2_birthday='11-05', timezone='Asia/Tehran',
+        daily_message_hour=9, daily_message_minute=15)
+    store = CoupleStore.from_config(config)
+    couple = store[0]
+    assert (len(store), couple.group_id, couple.partner2_birthday) == (1, -1001, '11-05')
+    assert (couple.daily_message_hour, couple.daily_message_minute) == (9, 15)
+
+def test_channel_usernames_are_group_ids():
+    store = make_store()
+    index = store.add('@couple_channel', date(2024, 1, 1), 'Sara', 'Ali')
+    assert store[index].group_id == '@couple_channel'
+    assert store.group_ids[index] >= USERNAME_ID_BASE
+    assert store.find('@couple_channel').index == index
+    assert store.find('@other_channel') is None
+    assert store.find(-100).index == 1
+
+def test_from_config_with_a_channel_username():
+    config = SimpleNamespace(
+        group_id='@couple_channel', relationship_start_date=date(2024, 1, 1), partner1_name='Sara',
+        partner2_name='Ali', partner1_birthday=None, partner2_birthday=None, timezone='Asia/Tehran',
+        daily_message_hour=9, daily_message_minute=0)
+    assert CoupleStore.from_config(config)[0].group_id == '@couple_channel'
+
+def test_out_of_range_group_ids_are_rejected():
+    with pytest.raises(ValueError):
+        CoupleStore().add(USERNAME_ID_BASE, date(2024, 1, 1), 'A', 'B')
+    with pytest.raises(ValueError):
+        CoupleStore().add(' ', date(2024, 1, 1), 'A', 'B')
+
+def test_couples_database_holds_channel_usernames(tmp_path):
+    db_path = str(tmp_path / 'couples.db')
+    csv = 'group_id,relationship_start_date,partner1_name,partner2_name\n-100,2024-01-01,A,B\n@couple_channel,2024-01-01,C,D\n'
+    assert import_couples(db_path, io.StringIO(csv))['imported'] == 2
+    store = load_couple_store(db_path)
+    assert store.find('@couple_channel').partner1_name == 'C'
+    assert store.find(-100).partner1_name == 'A'
+    with pytest.raises(ValueError):
+        validate_couple({'group_id': 'not a chat', 'relationship_start_date': '2024-01-01',
+                         'partner1_name': 'A', 'partner2_name': 'B'})
+
+def test_couples_table_with_integer_key_is_rebuilt(tmp_path):
+    db_path = str(tmp_path / 'couples.db')
+    connection = sqlite3.connect(db_path)
+    connection.execute(
+        'CREATE TABLE couples (group_id INTEGER PRIMARY KEY, relationship_start_date TEXT NOT NULL, '
+        'partner1_name TEXT NOT NULL, partner2_name TEXT NOT NULL, partner1_birthday TEXT, '
+        'partner2_birthday TEXT, timezone TEXT NOT NULL, daily_message_hour INTEGER NOT NULL, '
+        'daily_message_minute INTEGER NOT NULL)')
+    connection.execute("INSERT INTO couples VALUES (-100, '2024-01-01', 'A', 'B', NULL, NULL, 'Asia/Tehran', 9, 0)")
+    connection.commit()
+    connection.close()
+
+    csv = 'group_id,relationship_start_date,partner1_name,partner2_name\n@couple_channel,2024-01-01,C,D\n'
+    assert import_couples(db_path, io.StringIO(csv))['imported'] == 1
+    assert len(load_couple_store(db_path)) == 2
@@ -0,0 +1,81 @@
+"""Tests for the couple event calendar and the /addevent command."""
+
+from datetime import date
+from types import SimpleNamespace
+from events import EventCalendar, ONCE, YEARLY, format_event_message, register_event_handlers
+from i18n import LanguagePreferences
+
+TODAY = date(2024, 5, 10)
+
+def test_events_added_by_another_calendar_are_due(tmp_path):
+    db_path = str(tmp_path / 'events.db')
+    scheduler_calendar = EventCalendar(db_path)
+    assert scheduler_calendar.due_for_group(-1, TODAY) == []
+
+    # e.g. interactive_bot or the polling process adding an event
+    EventCalendar(db_path).add(-1, YEARLY, None, 5, 10, 'first date')
+
+    due = scheduler_calendar.due_for_group(-1, TODAY)
+    assert [(event.title, days_left) for event, days_left in due] == [('first date', 0)]
+
+def test_events_removed_by_another_calendar_are_not_due(tmp_path):
+    db_path = str(tmp_path / 'events.db')
+    scheduler_calendar = EventCalendar(db_path)
+    event = scheduler_calendar.add(-1, ONCE, 2024, 5, 17, 'trip')
+    assert len(scheduler_calendar.due_for_group(-1, date(2024, 5, 10))) == 1
+
+    assert EventCalendar(db_path).remove(-1, event.id)
+
+    assert scheduler_calendar.due_for_group(-1, date(2024, 5, 10)) == []
+    assert scheduler_calendar.for_group(-1) == []
+
+def test_own_writes_do_not_reload(tmp_path):
+    calendar = EventCalendar(str(tmp_path / 'events.db'))
+    calendar.add(-1, YEARLY, None, 5, 10, 'first date')
+    assert not calendar.refresh()
+
+class FakeBot:
+    def __init__(self):
+        self.handlers = {}
+
+    def message_handler(self, commands):
+        def register(handler):
+            self.handlers[commands[0]] = handler
+            return handler
+        return register
+
+class FakeApi:
+    def __init__(self):
+        self.replies = []
+
+    def reply_to(self, message, text):
+        self.replies.append(text)
+
+def add_event(tmp_path, text):
+    bot, api = FakeBot(), FakeApi()
+    calendar = EventCalendar(str(tmp_path / 'events.db'))
+    languages = LanguagePreferences(str(tmp_path / 'settings.db'), 'en')
+    register_event_handlers(bot, api, calendar, lambda chat_id: TODAY, languages)
+    bot.handlers['addevent'](SimpleNamespace(chat=SimpleNamespace(id=-1), text=text))
+    return calendar, api.replies
+
+def test_yearly_event_in_a_future_year_is_rejected(tmp_path):
+    calendar, replies = add_event(tmp_path, '/addevent yearly 2030-05-10 wedding')
+    assert calendar.for_group(-1) == []
+    assert replies[0].startswith('❌')
+
+def test_yearly_event_in_a_past_year_is_added(tmp_path):
+    calendar, replies = add_event(tmp_path, '/addevent yearly 2020-05-10 wedding')
+    assert [event.year for event in calendar.for_group(-1)] == [2020]
+    assert replies[0].startswith('✅')
+
+def test_anniversary_years_are_never_negative(tmp_path):
+    calendar = EventCalendar(str(tmp_path / 'events.db'))
+    event = calendar.add(-1, YEARLY, 2030, 5, 10, 'wedding')
+    assert format_event_message(event, 0, TODAY, 'en') == '🎉 Today is wedding! 💖'
+
+def test_channel_username_events_are_due(tmp_path):
+    calendar = EventCalendar(str(tmp_path / 'events.db'))
+    calendar.add('@couple_channel', YEARLY, None, 5, 10, 'first date')
+    assert [event.title for event, _ in calendar.due_for_group('@couple_channel', TODAY)] == ['first date']
+    assert EventCalendar(str(tmp_path / 'events.db')).for_group('@couple_channel')[0].group_id == '@couple_channel'
@@ -0,0 +1,70 @@
+"""Tests for the language catalogs."""
+
+import glob
+import os
+import re
+import pytest
+from analytics import EVENTS
+from i18n import DEFAULT_LANGUAGE, Catalog, available_languages, get_catalog
+from milestone_cards import CARD_TEMPLATES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# catalog.text('key'), .choose('key', ...), .variants('key'), t(language, 'key') and t('key') in templates
+LOOKUP_PATTERN = re.compile(r"""(?:\.text|\.choose|\.variants|\bt)\((?:\w+,\s*)?['"]([\w.]+)['"]""")
+
+def looked_up_keys():
+    keys = set()
+    for path in glob.glob(os.path.join(ROOT, '*.py')):
+        with open(path, encoding='utf-8') as f:
+            keys.update(LOOKUP_PATTERN.findall(f.read()))
+    # Keys built at run time without checking the catalog first
+    keys.update(f'stats.{event}' for event in EVENTS)
+    keys.update(f'card.{template}' for template in CARD_TEMPLATES)
+    keys.update(f'summary.note.{days}' for days in (7, 30, 100, 365, 1000))
+    keys.update(f'duration.{unit}{plural}' for unit in ('year', 'month', 'day') for plural in ('', 's'))
+    return keys
+
+def test_lookups_are_found():
+    keys = looked_up_keys()
+    assert {'start', 'web.title', 'daily.greeting', 'weekday', 'events.usage'} <= keys
+
+@pytest.mark.parametrize('language', ['fa', 'en'])
+def test_catalog_defines_every_key_the_code_looks_up(language):
+    assert language in available_languages()
+    catalog = get_catalog(language)
+    keys = looked_up_keys()
+    if catalog.text('meta.calendar') == 'jalali':
+        # Jalali dates use jalali.JALALI_MONTHS
+        keys.discard('month')
+    assert sorted(key for key in keys if key not in catalog.corpus.categories) == []
+
+@pytest.mark.parametrize('language', ['fa', 'en'])
+def test_calendar_names_are_complete(language):
+    catalog = get_catalog(language)
+    assert len(catalog.variants('weekday')) == 7
+    if catalog.text('meta.calendar') != 'jalali':
+        assert len(catalog.variants('month')) == 12
+
+class FakeCorpus:
+    def __init__(self, texts):
+        self.categories = {key: None for key in texts}
+        self.texts = texts
+
+    def category(self, key):
+        return [self.texts[key]]
+
+def test_missing_key_falls_back_to_the_default_language():
+    default = get_catalog(DEFAULT_LANGUAGE)
+    catalog = Catalog('xx', FakeCorpus({'start': 'Hi {commands}'}), default)
+    assert catalog.text('start', commands='/help') == 'Hi /help'
+    assert 'help' in catalog
+    assert catalog.text('help', commands='/help') == default.text('help', commands='/help')
+
+def test_missing_key_without_fallback_raises():
+    with pytest.raises(KeyError):
+        Catalog('xx', FakeCorpus({})).text('start')
+
+def test_unknown_language_uses_the_default_catalog():
+    assert get_catalog('xx') is get_catalog(DEFAULT_LANGUAGE)
+    assert get_catalog('../fa') is get_catalog(DEFAULT_LANGUAGE)
@@ -0,0 +1,63 @@
+"""Tests for the Jalali calendar conversions."""
+
+from datetime import date, timedelta
+import pytest
+from jalali import (
+    TABLE_FIRST_YEAR, TABLE_LAST_YEAR, format_jalali_date, from_jalali, jalali_difference,
+    month_length, to_jalali, year_start_ordinal
+)
+
+@pytest.mark.parametrize('gregorian, jalali', [
+    (date(2025, 3, 21), (1404, 1, 1)),
+    (date(2025, 6, 22), (1404, 4, 1)),
+    (date(2024, 3, 20), (1403, 1, 1)),
+    (date(1979, 2, 11), (1357, 11, 22)),
+])
+def test_known_dates(gregorian, jalali):
+    assert to_jalali(gregorian) == jalali
+    assert from_jalali(*jalali) == gregorian
+
+def test_last_day_of_esfand_in_a_leap_year():
+    # 1403 is a leap year, Esfand has 30 days
+    assert month_length(1403, 12) == 30
+    assert to_jalali(date(2025, 3, 20)) == (1403, 12, 30)
+
+def test_last_day_of_esfand_in_a_common_year():
+    assert month_length(1402, 12) == 29
+    assert to_jalali(date(2024, 3, 19)) == (1402, 12, 29)
+    with pytest.raises(ValueError):
+        from_jalali(1402, 12, 30)
+
+def test_first_table_boundary():
+    first = date.fromordinal(year_start_ordinal(TABLE_FIRST_YEAR))
+    assert first == date(1921, 3, 21)
+    assert to_jalali(first) == (TABLE_FIRST_YEAR, 1, 1)
+    previous_year = TABLE_FIRST_YEAR - 1
+    assert to_jalali(first - timedelta(days=1)) == (previous_year, 12, month_length(previous_year, 12))
+
+def test_last_table_boundary():
+    end = date.fromordinal(year_start_ordinal(TABLE_LAST_YEAR + 1))
+    assert to_jalali(end) == (TABLE_LAST_YEAR + 1, 1, 1)
+    assert to_jalali(end - timedelta(days=1)) == (TABLE_LAST_YEAR, 12, month_length(TABLE_LAST_YEAR, 12))
+
+def test_table_and_direct_conversion_agree():
+    for day in (date(1921, 3, 20), date(2000, 1, 1), date(2121, 3, 21)):
+        jalali = to_jalali(day)
+        assert from_jalali(*jalali) == day
+
+@pytest.mark.parametrize('start, end, difference', [
+    (date(2024, 3, 20), date(2025, 3, 21), (1, 0, 0)),
+    (date(2024, 3, 20), date(2024, 3, 20), (0, 0, 0)),
+    # 1403-01-01 to 1403-03-05
+    (date(2024, 3, 20), date(2024, 5, 25), (0, 2, 4)),
+    # 1403-06-31 to 1403-07-30: borrows the 31 days of Shahrivar
+    (date(2024, 9, 21), date(2024, 10, 21), (0, 0, 30)),
+    # 1402-12-10 to 1403-01-05: borrows the 29 days of Esfand 1402
+    (date(2024, 2, 29), date(2024, 3, 24), (0, 0, 24)),
+])
+def test_jalali_difference(start, end, difference):
+    assert jalali_difference(start, end) == difference
+
+def test_format_jalali_date():
+    assert format_jalali_date(date(2025, 6, 22)) == '۱ تیر ۱۴۰۴'
+    assert format_jalali_date(date(2025, 3, 20)) == '۳۰ اسفند ۱۴۰۳'
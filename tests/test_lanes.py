@@ -0,0 +1,103 @@
+"""Tests for the interactive and bulk execution lanes."""
+
+import threading
+import pytest
+from telebot.apihelper import ApiTelegramException
+from api_client import AIMDLimiter, TelegramApiClient
+from lanes import BULK, INTERACTIVE, BulkLane, BusyLaneHandler, LaneBusyError, current_lane, use_lane
+
+def test_use_lane_sets_and_restores_the_lane():
+    assert current_lane() == INTERACTIVE
+    with use_lane(BULK):
+        assert current_lane() == BULK
+        with use_lane(INTERACTIVE):
+            assert current_lane() == INTERACTIVE
+        assert current_lane() == BULK
+    assert current_lane() == INTERACTIVE
+
+def test_bulk_work_runs_in_the_bulk_lane():
+    lane = BulkLane(workers=2)
+    lanes = []
+    for _ in range(5):
+        lane.submit(lambda: lanes.append(current_lane()))
+    lane.join()
+    assert lanes == [BULK] * 5
+
+def test_errors_do_not_stop_the_workers():
+    lane = BulkLane(workers=1)
+    done = []
+    lane.submit(lambda: 1 / 0)
+    lane.submit(done.append, 'next')
+    lane.join()
+    assert done == ['next']
+
+def test_full_bulk_queue_pushes_back():
+    lane = BulkLane(workers=1, max_queue=1)
+    started, release = threading.Event(), threading.Event()
+    ran = []
+
+    def blocking():
+        started.set()
+        release.wait(5)
+        ran.append('blocking')
+
+    lane.submit(blocking)
+    assert started.wait(5)
+    lane.submit(ran.append, 'queued')
+    with pytest.raises(LaneBusyError):
+        lane.submit(ran.append, 'dropped', block=False)
+    with pytest.raises(LaneBusyError):
+        lane.submit(ran.append, 'dropped', timeout=0.01)
+
+    release.set()
+    lane.join()
+    assert ran == ['blocking', 'queued']
+
+def test_replies_do_not_wait_for_a_busy_bulk_lane():
+    client = TelegramApiClient(None, limiter=AIMDLimiter(1, max_limit=1), bulk_limiter=AIMDLimiter(1, max_limit=1))
+    lane = BulkLane(workers=2)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_send():
+        started.set()
+        release.wait(5)
+
+    # One bulk call holds the only bulk slot, the next one waits behind it
+    lane.submit(client.call, slow_send)
+    assert started.wait(5)
+    lane.submit(client.call, lambda: None)
+    assert client.call(lambda: 'reply') == 'reply'
+    assert client.bulk_limiter.in_flight == 1
+
+    release.set()
+    lane.join()
+    assert client.bulk_limiter.in_flight == 0
+
+def rate_limited():
+    raise ApiTelegramException('sendMessage', None, {
+        'error_code': 429, 'description': 'Too Many Requests', 'parameters': {'retry_after': 0}})
+
+def test_reply_rate_limits_slow_down_bulk_sends_too():
+    client = TelegramApiClient(None, max_retries=0, limiter=AIMDLimiter(8), bulk_limiter=AIMDLimiter(8))
+    with pytest.raises(ApiTelegramException):
+        client.call(rate_limited)
+    assert (client.limiter.limit, client.bulk_limiter.limit) == (4, 4)
+
+def test_bulk_rate_limits_leave_replies_alone():
+    client = TelegramApiClient(None, max_retries=0, limiter=AIMDLimiter(8), bulk_limiter=AIMDLimiter(8))
+    with use_lane(BULK), pytest.raises(ApiTelegramException):
+        client.call(rate_limited)
+    assert (client.limiter.limit, client.bulk_limiter.limit) == (8, 4)
+
+def test_full_interactive_lane_turns_replies_away():
+    limiter = AIMDLimiter(1, max_limit=1, max_waiting=0)
+    with limiter:
+        with pytest.raises(LaneBusyError):
+            with limiter:
+                pass
+    assert limiter.in_flight == 0
+
+def test_busy_lane_handler_only_swallows_lane_busy_errors():
+    handler = BusyLaneHandler()
+    assert handler.handle(LaneBusyError("full"))
+    assert not handler.handle(ValueError("bug"))
@@ -0,0 +1,87 @@
+"""Tests for editing the pinned live countdown message."""
+
+from types import SimpleNamespace
+import pytest
+from telebot.apihelper import ApiTelegramException
+from live_countdown import LiveCountdown, text_hash
+
+def api_error(code, description):
+    return ApiTelegramException('editMessageText', None, {'error_code': code, 'description': description})
+
+class FakeApi:
+    def __init__(self, edit_error=None):
+        self.edit_error = edit_error
+        self.calls = []
+
+    def edit_message_text(self, text, chat_id, message_id):
+        self.calls.append(('edit', chat_id, message_id))
+        if self.edit_error:
+            raise self.edit_error
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.calls.append(('send', chat_id))
+        return SimpleNamespace(message_id=100 + len(self.calls))
+
+    def pin_chat_message(self, chat_id, message_id, **kwargs):
+        self.calls.append(('pin', chat_id, message_id))
+
+def live_with_message(tmp_path, api):
+    live = LiveCountdown(api, str(tmp_path / 'settings.db'))
+    live.save(-1, 7, 0)
+    return live
+
+@pytest.mark.parametrize('description', [
+    'Bad Request: message to edit not found',
+    "Bad Request: message can't be edited",
+])
+def test_lost_message_is_sent_and_pinned_again(tmp_path, description):
+    api = FakeApi(api_error(400, description))
+    live = live_with_message(tmp_path, api)
+    assert live.apply(-1, 'day 2') == 3
+    assert [call[0] for call in api.calls] == ['edit', 'send', 'pin']
+
+@pytest.mark.parametrize('error', [
+    api_error(429, 'Too Many Requests: retry after 5'),
+    api_error(502, 'Bad Gateway'),
+    api_error(403, 'Forbidden: bot was kicked from the group chat'),
+])
+def test_other_edit_errors_do_not_post_a_new_message(tmp_path, error):
+    api = FakeApi(error)
+    live = live_with_message(tmp_path, api)
+    with pytest.raises(ApiTelegramException):
+        live.apply(-1, 'day 2')
+    assert [call[0] for call in api.calls] == ['edit']
+    assert live.messages[-1] == (7, 0)
+
+def test_transient_errors_keep_the_text_queued(tmp_path):
+    api = FakeApi(api_error(502, 'Bad Gateway'))
+    live = live_with_message(tmp_path, api)
+    live._pending[-1] = 'day 2'
+    assert live.flush() == 0
+    assert live._pending == {-1: 'day 2'}
+
+    api.edit_error = None
+    assert live.flush() == 1
+    assert live._pending == {}
+    assert live.messages[-1] == (7, text_hash('day 2'))
+
+def test_permanent_errors_drop_the_text(tmp_path):
+    live = live_with_message(tmp_path, FakeApi(api_error(403, 'Forbidden: bot was kicked from the group chat')))
+    live._pending[-1] = 'day 2'
+    live.flush()
+    assert live._pending == {}
+
+def test_not_modified_counts_as_edited(tmp_path):
+    api = FakeApi(api_error(400, 'Bad Request: message is not modified'))
+    live = live_with_message(tmp_path, api)
+    assert live.apply(-1, 'day 2') == 1
+    assert live.messages[-1][0] == 7
+
+def test_channel_username_messages_are_kept(tmp_path):
+    api = FakeApi()
+    live = LiveCountdown(api, str(tmp_path / 'settings.db'))
+    live.save('@couple_channel', 7, 0)
+    live.update('@couple_channel', 'day 2')
+    live.stop()
+    assert api.calls == [('edit', '@couple_channel', 7)]
+    assert LiveCountdown(api, str(tmp_path / 'settings.db')).messages['@couple_channel'][0] == 7
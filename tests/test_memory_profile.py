@@ -0,0 +1,23 @@
+"""Tests for starting and stopping the memory profiler."""
+
+import tracemalloc
+from memory_profile import MemoryProfiler
+
+def test_stop_leaves_tracing_started_elsewhere_on():
+    tracemalloc.start()
+    try:
+        profiler = MemoryProfiler()
+        assert profiler.start(interval=3600)
+        assert profiler.stop()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+def test_stop_ends_tracing_it_started():
+    assert not tracemalloc.is_tracing()
+    profiler = MemoryProfiler()
+    assert profiler.start(interval=3600)
+    assert tracemalloc.is_tracing()
+    assert profiler.stop()
+    assert not tracemalloc.is_tracing()
+    assert not profiler.stop()
@@ -0,0 +1,34 @@
+"""Tests for the deterministic per-couple message selection."""
+
+import pytest
+from message_selection import choose_index, permute
+
+@pytest.mark.parametrize('size', [3, 7, 35, 64, 100, 1000])
+def test_permute_is_a_bijection(size):
+    assert sorted(permute(index, size, 'couple', 'slot', 0) for index in range(size)) == list(range(size))
+
+@pytest.mark.parametrize('size', [1, 2, 3, 20, 35])
+def test_no_repeat_within_a_cycle(size):
+    for cycle in range(5):
+        picks = [choose_index(size, -100, day, 'quote') for day in range(cycle * size, (cycle + 1) * size)]
+        assert sorted(picks) == list(range(size))
+
+@pytest.mark.parametrize('size', [2, 3, 5, 35])
+def test_no_repeat_on_consecutive_days(size):
+    picks = [choose_index(size, -100, day, 'quote') for day in range(1, 50 * size)]
+    assert all(a != b for a, b in zip(picks, picks[1:]))
+
+def test_pick_does_not_depend_on_call_order():
+    forward = [choose_index(35, -100, day, 'quote') for day in range(1, 200)]
+    backward = [choose_index(35, -100, day, 'quote') for day in reversed(range(1, 200))][::-1]
+    assert forward == backward
+    assert choose_index(35, -100, 150, 'quote') == forward[149]
+
+def test_couples_and_slots_get_different_sequences():
+    first = [choose_index(35, -100, day, 'quote') for day in range(35)]
+    assert first != [choose_index(35, -101, day, 'quote') for day in range(35)]
+    assert first != [choose_index(35, -100, day, 'advice') for day in range(35)]
+
+def test_empty_pool_raises():
+    with pytest.raises(ValueError):
+        choose_index(0, -100, 1, 'quote')
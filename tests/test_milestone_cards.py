@@ -0,0 +1,23 @@
+"""Tests for the milestone and birthday image card texts."""
+
+import pytest
+from milestone_cards import CARD_TEMPLATES, card_lines, check_card_font
+
+def test_card_lines_come_from_the_catalog():
+    assert card_lines('milestone', 100, ('سارا', 'علی'), 'fa') == ['100', 'روز عشق', 'سارا و علی']
+    assert card_lines('milestone', 100, ('Sara', 'Ali'), 'en') == ['100', 'days of love', 'Sara & Ali']
+    assert card_lines('birthday', 0, ('Sara',), 'en') == ['🎂', 'Happy birthday', 'Sara']
+
+@pytest.mark.parametrize('language', ['fa', 'en'])
+def test_every_template_has_catalog_lines(language):
+    for template in CARD_TEMPLATES:
+        assert len(card_lines(template, 7, ('A', 'B'), language)) == 3
+
+def test_cards_need_a_font():
+    with pytest.raises(ValueError):
+        check_card_font(None)
+
+def test_unloadable_fonts_are_refused(tmp_path):
+    pytest.importorskip('PIL')
+    with pytest.raises(ValueError):
+        check_card_font(str(tmp_path / 'missing.ttf'))
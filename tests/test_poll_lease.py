@@ -0,0 +1,106 @@
+"""Tests for the single-poller lease and the shared update queue."""
+
+import threading
+import pytest
+import poll_lease
+from poll_lease import LeasedPoller, PollLease
+from supervisor import HEARTBEATS
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(poll_lease, 'time', clock)
+    return clock
+
+@pytest.fixture
+def leases(tmp_path, clock):
+    db_path = str(tmp_path / 'lease.db')
+    return PollLease(db_path, ttl=30, holder='a'), PollLease(db_path, ttl=30, holder='b')
+
+def updates(*update_ids):
+    return [{'update_id': update_id, 'message': {'text': f'/start {update_id}'}} for update_id in update_ids]
+
+def test_only_one_process_holds_the_lease(leases, clock):
+    a, b = leases
+    assert a.try_acquire() == 1
+    assert b.try_acquire() is None
+    clock.now += 20
+    assert a.try_acquire() == 1
+    # Renewed at +20, so still held at +40
+    clock.now += 20
+    assert b.try_acquire() is None
+
+def test_expired_lease_is_taken_over_with_a_new_token(leases, clock):
+    a, b = leases
+    assert a.try_acquire() == 1
+    clock.now += 31
+    assert b.try_acquire() == 2
+    assert a.try_acquire() is None
+    assert a.token is None
+
+def test_released_lease_is_taken_over_at_once(leases):
+    a, b = leases
+    a.try_acquire()
+    a.release()
+    assert b.try_acquire() == 2
+
+def test_stale_holder_cannot_publish(leases, clock):
+    a, b = leases
+    a.try_acquire()
+    clock.now += 31
+    b.try_acquire()
+    assert not a.publish(1, updates(10))
+    assert b.claim() == []
+    assert b.publish(2, updates(10, 11))
+    assert b.last_update_id() == 11
+
+def test_publish_claim_and_ack(leases, clock):
+    a, b = leases
+    a.try_acquire()
+    assert a.publish(1, updates(5, 6))
+    assert a.publish(1, updates(6))  # Already queued, ignored
+
+    claimed = b.claim(limit=1)
+    assert [update_id for update_id, _ in claimed] == [5]
+    assert [update_id for update_id, _ in a.claim()] == [6]
+    assert a.claim() == []
+    a.ack([6])
+
+    # b died before acking 5: after the claim timeout another process gets it
+    clock.now += 61
+    assert [update_id for update_id, _ in a.claim()] == [5]
+    a.ack([5])
+    clock.now += 61
+    assert a.claim() == []
+
+class StandbyLease:
+    ttl = 30
+
+    def try_acquire(self):
+        return None
+
+    def claim(self):
+        return []
+
+    def release(self):
+        pass
+
+class OneLoop(threading.Event):
+    """Stop event that stops the loop at its first wait."""
+
+    def wait(self, timeout=None):
+        self.set()
+        return True
+
+def test_idle_standby_beats_through_the_workers():
+    HEARTBEATS._beats.pop('dispatch', None)
+    bot = type('Bot', (), {'worker_pool': None})()
+    LeasedPoller(bot, StandbyLease()).run(OneLoop())
+    assert HEARTBEATS.last('dispatch') is not None
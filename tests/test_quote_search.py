@@ -0,0 +1,67 @@
+"""Tests for the quote search index and inline query pages."""
+
+import pytest
+import quote_search
+from quote_search import INLINE_PAGE_SIZE, SearchIndex, inline_results, normalize, tokenize
+
+class FakeCorpus(list):
+    def __init__(self, quotes, advice=()):
+        super().__init__([*quotes, *advice])
+        self.categories = {'quote': range(len(quotes)), 'advice': range(len(quotes), len(self))}
+
+def test_arabic_letters_are_normalized():
+    assert normalize('علي') == normalize('علی') == 'علی'
+    assert normalize('كتاب') == 'کتاب'
+    assert tokenize('دلي كه') == tokenize('دلی که')
+
+def test_diacritics_and_tatweel_are_removed():
+    assert normalize('عِشْق') == 'عشق'
+    assert normalize('عـــشق') == 'عشق'
+    assert normalize('Love ۱۲۳') == 'love 123'
+
+def test_zwnj_words_are_indexed_whole_and_in_parts():
+    assert tokenize('دوستت دارم و می‌خواهمت') == ['دوستت', 'دارم', 'و', 'میخواهمت', 'می', 'خواهمت']
+
+def test_partial_words_match_through_trigrams():
+    index = SearchIndex(FakeCorpus(['عاشقانه می‌خوانم', 'قلب من', 'عشق']), ('quote',))
+    assert index.search('شقان') == [0]
+    assert sorted(index.matching_tokens('خوان')) == ['خوانم', 'میخوانم']
+    assert index.search('خوان') == [0]
+    assert index.search('نیست') == []
+
+def test_short_query_words_match_as_prefixes():
+    index = SearchIndex(FakeCorpus(['قلب من', 'قلم', 'عشق']), ('quote',))
+    assert index.search('قل') == [0, 1]
+
+def test_exact_matches_rank_before_partial_ones():
+    corpus = FakeCorpus(['عشقی بزرگ', 'این عشق است', 'عشق و قلب'], ['عشقت'])
+    index = SearchIndex(corpus, ('quote', 'advice'))
+    assert index.search('عشق') == [1, 2, 0, 3]
+    # Every word must match
+    assert index.search('عشق قلب') == [2]
+    assert index.search('') == [0, 1, 2, 3]
+
+def test_search_texts_pages():
+    index = SearchIndex(FakeCorpus(['عشق یک', 'عشق دو', 'عشق سه']), ('quote',))
+    assert index.search_texts('عشق', 1, 1) == ([(1, 'عشق دو')], 3)
+    assert index.search_texts('عشق', 2) == ([(2, 'عشق سه')], 3)
+
+@pytest.fixture
+def inline_corpus(monkeypatch):
+    quotes = [f'عشق {number}' for number in range(INLINE_PAGE_SIZE + 5)]
+    monkeypatch.setattr(quote_search, '_index', SearchIndex(FakeCorpus(quotes), ('quote',)))
+
+def test_inline_results_pages(inline_corpus):
+    results, next_offset = inline_results('عشق', '')
+    assert len(results) == INLINE_PAGE_SIZE
+    assert next_offset == str(INLINE_PAGE_SIZE)
+    assert results[0].id == '0'
+    assert results[0].input_message_content.message_text == '💝 عشق 0'
+
+    results, next_offset = inline_results('عشق', next_offset)
+    assert [result.id for result in results] == [str(entry) for entry in range(INLINE_PAGE_SIZE, INLINE_PAGE_SIZE + 5)]
+    assert next_offset == ''
+
+def test_inline_results_ignore_bad_offsets(inline_corpus):
+    results, _ = inline_results('عشق', 'abc')
+    assert results[0].id == '0'
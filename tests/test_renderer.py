@@ -0,0 +1,46 @@
+"""Tests for rendering a couple's messages."""
+
+import sqlite3
+from datetime import date
+import pytest
+from config import Config
+from i18n import LanguagePreferences
+from renderer import MessageRenderer
+
+@pytest.fixture
+def channel_renderer(tmp_path, monkeypatch):
+    monkeypatch.setenv('BOT_TOKEN', '0:test')
+    monkeypatch.setenv('GROUP_ID', '@chan')
+    monkeypatch.setenv('RELATIONSHIP_START_DATE', '2024-01-01')
+    config = Config()
+    return MessageRenderer(config, LanguagePreferences(str(tmp_path / 'settings.db'), 'fa'))
+
+def test_channel_username_group_renders_every_message(channel_renderer):
+    today = date(2024, 4, 9)
+    days = channel_renderer.days_together(today=today)
+    assert days == 100
+    assert channel_renderer.daily_message(days)
+    assert channel_renderer.special_milestone_message(days)
+    assert channel_renderer.birthday_message('سهیل')
+    assert channel_renderer.simple_message(today=today)
+
+def test_channel_username_language_is_stored(tmp_path):
+    languages = LanguagePreferences(str(tmp_path / 'settings.db'), 'fa')
+    languages.set('@chan', 'en')
+    assert languages.get(' @chan') == 'en'
+    assert LanguagePreferences(str(tmp_path / 'settings.db'), 'fa').get('@chan') == 'en'
+    languages.set('-100', 'en')
+    assert languages.get(-100) == 'en'
+
+def test_languages_of_the_integer_table_are_migrated(tmp_path):
+    db_path = str(tmp_path / 'settings.db')
+    connection = sqlite3.connect(db_path)
+    connection.execute('CREATE TABLE chat_languages (chat_id INTEGER PRIMARY KEY, language TEXT NOT NULL)')
+    connection.execute("INSERT INTO chat_languages VALUES (-100, 'en')")
+    connection.commit()
+    connection.close()
+
+    languages = LanguagePreferences(db_path, 'fa')
+    assert languages.get(-100) == 'en'
+    languages.set('@chan', 'en')
+    assert LanguagePreferences(db_path, 'fa').get('@chan') == 'en'
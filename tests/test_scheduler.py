@@ -0,0 +1,98 @@
+"""Tests for the scheduler's packed due queue and state reloads."""
+
+import io
+from datetime import date
+from types import SimpleNamespace
+import pytest
+from couple_db import import_couples
+from scheduler import (
+    BIRTHDAY_CHECK, DAILY_MESSAGE, MAX_COUPLES, DueQueue, load_state, reload_state, run_due, save_handled_through
+)
+
+def test_pack_round_trips():
+    entry = DueQueue.pack(1717200000, BIRTHDAY_CHECK, MAX_COUPLES - 1)
+    assert DueQueue.unpack(entry) == (1717200000, BIRTHDAY_CHECK, MAX_COUPLES - 1)
+
+@pytest.mark.parametrize('due, kind, index', [
+    (1717200000, DAILY_MESSAGE, MAX_COUPLES),
+    (1717200000, DAILY_MESSAGE, -1),
+    (1717200000, 2, 0),
+    (-1, DAILY_MESSAGE, 0),
+])
+def test_pack_rejects_out_of_range_fields(due, kind, index):
+    with pytest.raises(ValueError):
+        DueQueue.pack(due, kind, index)
+
+def test_pop_due_in_time_order():
+    queue = DueQueue()
+    queue.push(300, DAILY_MESSAGE, 2)
+    queue.push(100, BIRTHDAY_CHECK, 7)
+    queue.push(200, DAILY_MESSAGE, 1)
+    assert list(queue.pop_due(200)) == [(100, BIRTHDAY_CHECK, 7), (200, DAILY_MESSAGE, 1)]
+    assert queue.next_due() == 300
+
+def couples_config(couples_db):
+    return SimpleNamespace(
+        group_id='-1', relationship_start_date=date(2024, 1, 1), partner1_name='A', partner2_name='B',
+        partner1_birthday=None, partner2_birthday=None, timezone='Asia/Tehran',
+        daily_message_hour=9, daily_message_minute=0, send_window_minutes=30, send_rate_limit=25,
+        couples_db=couples_db, snapshot_path=None)
+
+def import_csv(db_path, *group_ids):
+    rows = ''.join(f"{group_id},2024-01-01,A,B\n" for group_id in group_ids)
+    import_couples(db_path, io.StringIO('group_id,relationship_start_date,partner1_name,partner2_name\n' + rows))
+
+def test_reload_state_picks_up_imported_couples(tmp_path):
+    config = couples_config(str(tmp_path / 'couples.db'))
+    import_csv(config.couples_db, -101)
+    bot = SimpleNamespace(couples=None)
+    state = load_state(config, 1717200000)
+
+    assert reload_state(bot, config, *state) == state
+    assert bot.couples is None
+
+    import_csv(config.couples_db, -102)
+    store, slots, queue, fingerprint = reload_state(bot, config, *state)
+    assert bot.couples is store
+    assert store.find(-102) is not None
+    assert len(slots) == 2 and len(queue) == 4
+    assert fingerprint != state[3]
+
+class FakeBot:
+    def __init__(self):
+        self.daily = []
+        self.events = []
+
+    def send_daily_message(self, couple):
+        self.daily.append(couple.group_id)
+
+    def send_birthday_message(self, partner_name, couple):
+        pass
+
+    def send_event_messages(self, couple, today):
+        self.events.append(couple.group_id)
+
+    def refresh_live_countdown(self, couple, today):
+        pass
+
+def test_restored_snapshot_does_not_resend_handled_work(tmp_path):
+    config = couples_config(str(tmp_path / 'couples.db'))
+    config.snapshot_path = str(tmp_path / 'scheduler.snapshot')
+    import_csv(config.couples_db, -101, -102)
+    start = 1717200000
+    store, slots, queue, _ = load_state(config, start)
+
+    # Run a day of work, then crash before the next snapshot is written
+    bot = FakeBot()
+    now = queue.next_due()
+    while now < start + 86400:
+        if run_due(bot, store, slots, queue, now):
+            save_handled_through(config, now)
+        now = queue.next_due()
+    assert sorted(bot.daily) == [-102, -101] and sorted(bot.events) == [-102, -101]
+
+    restarted = FakeBot()
+    store, slots, queue, _ = load_state(config, now - 60)
+    assert queue.next_due() > now - 60
+    run_due(restarted, store, slots, queue, now - 60)
+    assert restarted.daily == [] and restarted.events == []
@@ -0,0 +1,78 @@
+"""Tests for planning the send slots of the couple store."""
+
+from collections import Counter
+from datetime import date
+import pytest
+from couple_store import CoupleStore
+from send_windows import SECONDS_PER_DAY, couple_offset_seconds, plan_store_slots
+
+def make_store(count, send_minute=9 * 60, timezone='Asia/Tehran'):
+    store = CoupleStore()
+    for group_id in range(count):
+        store.add(-1000 - group_id, date(2024, 1, 1), 'A', 'B', timezone=timezone, send_minute=send_minute)
+    return store
+
+def test_every_second_stays_under_the_rate_limit():
+    store = make_store(5000)
+    slots = plan_store_slots(store, 2, 25)
+    assert max(Counter(slots).values()) <= 25
+
+def test_couples_keep_their_offset_when_there_is_room():
+    store = make_store(50)
+    slots = plan_store_slots(store, 10, 25)
+    for index, group_id in enumerate(store.group_ids):
+        assert slots[index] == 9 * 3600 + couple_offset_seconds(group_id, 10)
+
+def test_full_tail_of_window_back_fills_earlier_seconds():
+    store = make_store(60)
+    # One minute window, 1 message per second: all 60 seconds must be used, none spill
+    slots = plan_store_slots(store, 1, 1)
+    assert sorted(slots) == list(range(9 * 3600, 9 * 3600 + 60))
+
+def test_full_window_spills_right_after_it():
+    store = make_store(70)
+    slots = plan_store_slots(store, 1, 1)
+    assert sorted(slots) == list(range(9 * 3600, 9 * 3600 + 70))
+
+def test_more_couples_than_a_day_holds_raises():
+    store = make_store(SECONDS_PER_DAY + 1)
+    with pytest.raises(ValueError):
+        plan_store_slots(store, 0, 1)
+
+def test_a_full_day_terminates():
+    store = make_store(SECONDS_PER_DAY, send_minute=23 * 60 + 30)
+    slots = plan_store_slots(store, 0, 1)
+    assert len(set(slots)) == SECONDS_PER_DAY
+
+def test_spill_wraps_past_midnight():
+    store = make_store(3600, send_minute=23 * 60 + 30)
+    slots = plan_store_slots(store, 0, 1)
+    assert min(slots) == 0 and max(slots) == SECONDS_PER_DAY - 1
+
+def test_rate_limit_above_16_bits():
+    store = make_store(100)
+    slots = plan_store_slots(store, 0, 70000)
+    assert set(slots) == {9 * 3600}
+
+def test_rate_limit_is_counted_per_utc_second_across_timezones():
+    store = CoupleStore()
+    # 09:00 in Kolkata (+05:30) and 07:00 in Tehran (+03:30) are both 03:30 UTC
+    for group_id in range(10):
+        store.add(-2000 - group_id, date(2024, 1, 1), 'A', 'B', timezone='Asia/Kolkata', send_minute=9 * 60)
+        store.add(-3000 - group_id, date(2024, 1, 1), 'A', 'B', timezone='Asia/Tehran', send_minute=7 * 60)
+    now = 1717200000  # 2024-06-01, no DST in either zone
+    slots = plan_store_slots(store, 0, 5, now)
+    offsets = {'Asia/Kolkata': 19800, 'Asia/Tehran': 12600}
+    utc_seconds = Counter(
+        (slot - offsets[store.timezones.strings[tz_id]]) % SECONDS_PER_DAY
+        for slot, tz_id in zip(slots, store.timezone_ids))
+    assert max(utc_seconds.values()) <= 5
+    assert sum(utc_seconds.values()) == 20
+
+def test_same_local_second_in_different_timezones_does_not_share_a_bucket():
+    store = CoupleStore()
+    for group_id in range(5):
+        store.add(-2000 - group_id, date(2024, 1, 1), 'A', 'B', timezone='Asia/Dubai', send_minute=9 * 60)
+        store.add(-3000 - group_id, date(2024, 1, 1), 'A', 'B', timezone='Asia/Tehran', send_minute=9 * 60)
+    slots = plan_store_slots(store, 0, 5, 1717200000)
+    assert set(slots) == {9 * 3600}
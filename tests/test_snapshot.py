@@ -0,0 +1,84 @@
+"""Tests for the binary scheduler snapshots."""
+
+from array import array
+from datetime import date
+import pytest
+import couple_store
+from couple_store import CoupleStore
+from snapshot import HEADER, Snapshot, build_snapshot_bytes, load_snapshot, write_snapshot
+
+@pytest.fixture(autouse=True)
+def plain_arrays(monkeypatch):
+    monkeypatch.setattr(couple_store, 'np', None)
+
+def make_store():
+    store = CoupleStore()
+    store.add(-300, date(2024, 1, 1), 'Sara', 'Ali', '03-05', '02-29', 'Asia/Tehran', 9 * 60)
+    store.add(-100, date(2023, 6, 1), 'Mina', 'Reza', None, '07-10', 'Europe/Berlin', 8 * 60 + 30)
+    store.add('@couple_channel', date(2024, 2, 14), 'Nazanin', 'Ali', timezone='Asia/Tehran')
+    return store
+
+def couples(store):
+    return [
+        (couple.group_id, couple.relationship_start_date, couple.partner1_name, couple.partner2_name,
+         couple.partner1_birthday, couple.partner2_birthday, couple.timezone,
+         couple.daily_message_hour, couple.daily_message_minute)
+        for couple in (store[index] for index in range(len(store)))
+    ]
+
+def test_round_trip():
+    store = make_store()
+    slots = array('i', [32400, 30600, 32460])
+    heap = array('q', [5, 7, 9])
+    snapshot = Snapshot(build_snapshot_bytes(store, slots, heap, fingerprint=42, created=1700000000))
+    assert (snapshot.fingerprint, snapshot.created) == (42, 1700000000)
+    assert list(snapshot.section('slots')) == [32400, 30600, 32460]
+    assert list(snapshot.section('due_heap')) == [5, 7, 9]
+
+    restored = snapshot.couple_store()
+    assert couples(restored) == couples(store)
+    assert restored.find('@couple_channel').index == 2
+    assert restored.find(-100).index == 1
+    assert list(restored.group_order()) == list(store.group_order())
+    assert list(restored.start_order()) == list(store.start_order())
+
+def test_load_snapshot_from_file(tmp_path):
+    path = str(tmp_path / 'scheduler.snapshot')
+    size = write_snapshot(path, make_store(), array('i', [0, 0, 0]), [1, 2], fingerprint=42)
+    assert size == (tmp_path / 'scheduler.snapshot').stat().st_size
+    snapshot = load_snapshot(path, 42)
+    assert couples(snapshot.couple_store()) == couples(make_store())
+    assert list(snapshot.section('due_heap')) == [1, 2]
+
+def test_checksum_mismatch_is_rejected(tmp_path):
+    data = bytearray(build_snapshot_bytes(make_store(), array('i', [0, 0, 0]), [1, 2]))
+    data[-1] ^= 0xff
+    with pytest.raises(ValueError):
+        Snapshot(bytes(data))
+
+    path = tmp_path / 'scheduler.snapshot'
+    path.write_bytes(data)
+    assert load_snapshot(str(path)) is None
+
+def test_other_settings_are_rejected(tmp_path):
+    path = str(tmp_path / 'scheduler.snapshot')
+    write_snapshot(path, make_store(), array('i', [0, 0, 0]), [], fingerprint=42)
+    assert load_snapshot(path, 43) is None
+    assert load_snapshot(path, 42) is not None
+
+def test_missing_or_truncated_snapshot_is_ignored(tmp_path):
+    path = tmp_path / 'scheduler.snapshot'
+    assert load_snapshot(str(path)) is None
+    path.write_bytes(build_snapshot_bytes(make_store(), array('i', [0, 0, 0]), [])[:HEADER.size - 1])
+    assert load_snapshot(str(path)) is None
+
+def test_restored_store_can_be_written_to(tmp_path):
+    path = str(tmp_path / 'scheduler.snapshot')
+    write_snapshot(path, make_store(), array('i', [0, 0, 0]), [])
+    store = load_snapshot(path).couple_store()
+    index = store.add('@other_channel', date(2024, 3, 1), 'Sara', 'Omid', '07-10', None, 'Europe/Berlin', 600)
+    assert index == 3
+    assert store.find('@other_channel').partner2_name == 'Omid'
+    assert store[3].timezone == 'Europe/Berlin'
+    assert store.find(-300).partner1_name == 'Sara'
+    assert list(store.birthday_indices(date(2024, 7, 10))) == [1, 3]
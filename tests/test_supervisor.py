@@ -0,0 +1,57 @@
+"""Tests for restarting stalled components in the supervisor."""
+
+import threading
+import time
+from supervisor import Heartbeats, Supervisor
+
+def wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_stalled_component_is_restarted_only_after_its_thread_exits():
+    running = []
+    release = threading.Event()
+
+    def stuck_loop(stop_event):
+        # Ignores stop_event until released, like a loop blocked in a long call
+        running.append(threading.current_thread())
+        release.wait()
+
+    supervisor = Supervisor(Heartbeats(), stop_timeout=60)
+    supervisor.add('loop', stuck_loop, stall_timeout=0)
+    supervisor.start()
+    assert wait_until(lambda: len(running) == 1)
+
+    supervisor.check()
+    supervisor.check()
+    assert len(running) == 1
+    assert supervisor.status()['loop']['stopping']
+
+    release.set()
+    assert wait_until(lambda: not running[0].is_alive())
+    supervisor.check()
+    assert wait_until(lambda: len(running) == 2)
+    assert supervisor.components['loop'].restarts == 1
+
+def test_component_that_never_stops_exits_the_process():
+    stuck = []
+    release = threading.Event()
+    supervisor = Supervisor(Heartbeats(), stop_timeout=0, on_stuck=lambda: stuck.append(True))
+    supervisor.add('loop', lambda stop_event: release.wait(), stall_timeout=0)
+    supervisor.start()
+    supervisor.check()
+    assert stuck == [True]
+    release.set()
+
+def test_dead_component_is_restarted_right_away():
+    runs = []
+    supervisor = Supervisor(Heartbeats())
+    supervisor.add('loop', lambda stop_event: runs.append(1), stall_timeout=60)
+    supervisor.start()
+    assert wait_until(lambda: not supervisor.components['loop'].thread.is_alive())
+    supervisor.check()
+    assert wait_until(lambda: len(runs) == 2)
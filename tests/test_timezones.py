@@ -0,0 +1,84 @@
+"""DST edge cases of the timezone transition tables."""
+
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo
+import pytest
+from timezones import EPOCH, get_transition_table, local_date
+
+def local_seconds(*fields):
+    """Wall-clock seconds since the epoch of a naive local datetime."""
+    return int((datetime(*fields) - EPOCH).total_seconds())
+
+def utc_ts(*fields):
+    return int(datetime(*fields, tzinfo=timezone.utc).timestamp())
+
+def test_spring_forward_gap_moves_send_time_forward():
+    table = get_transition_table('America/New_York')
+    # 02:30 does not exist on 2024-03-10, the clock jumps from 02:00 EST to 03:00 EDT
+    due = table.local_to_utc(local_seconds(2024, 3, 10, 2, 30))
+    assert due == utc_ts(2024, 3, 10, 7, 30)
+    assert table.local_seconds(due) == local_seconds(2024, 3, 10, 3, 30)
+
+def test_fall_back_overlap_takes_first_occurrence():
+    table = get_transition_table('America/New_York')
+    # 01:30 happens twice on 2024-11-03, first in EDT (-4h) then in EST (-5h)
+    assert table.local_to_utc(local_seconds(2024, 11, 3, 1, 30)) == utc_ts(2024, 11, 3, 5, 30)
+
+def test_times_outside_transitions_round_trip():
+    table = get_transition_table('Europe/Berlin')
+    for fields in ((2024, 1, 15, 9, 0), (2024, 7, 15, 9, 0), (2024, 3, 31, 3, 0), (2024, 10, 27, 3, 0)):
+        assert table.local_seconds(table.local_to_utc(local_seconds(*fields))) == local_seconds(*fields)
+
+@pytest.mark.parametrize('day, expected_utc_hour, expected_utc_minute', [
+    # Iran observed DST (+04:30) in summer until 2022
+    (date(2021, 6, 1), 4, 30),
+    (date(2021, 12, 1), 5, 30),
+    # DST was abolished from 2023, +03:30 all year
+    (date(2023, 6, 1), 5, 30),
+    (date(2024, 6, 1), 5, 30),
+])
+def test_tehran_before_and_after_dst_was_abolished(day, expected_utc_hour, expected_utc_minute):
+    table = get_transition_table('Asia/Tehran')
+    due = table.local_to_utc(local_seconds(day.year, day.month, day.day, 9, 0))
+    assert due == utc_ts(day.year, day.month, day.day, expected_utc_hour, expected_utc_minute)
+
+def test_tehran_has_no_transition_after_2022():
+    table = get_transition_table('Asia/Tehran')
+    start = utc_ts(2023, 1, 1)
+    assert all(transition < start for transition in table.transitions)
+
+def test_next_local_time_across_spring_forward():
+    table = get_transition_table('America/New_York')
+    # Saturday 10:00 EST, the next 09:00 is Sunday, already in EDT
+    after = utc_ts(2024, 3, 9, 15, 0)
+    assert table.next_local_time(after, 9 * 3600) == utc_ts(2024, 3, 10, 13, 0)
+
+def test_next_local_time_across_fall_back():
+    table = get_transition_table('America/New_York')
+    after = utc_ts(2024, 11, 2, 14, 0)
+    assert table.next_local_time(after, 9 * 3600) == utc_ts(2024, 11, 3, 14, 0)
+
+def test_next_local_time_in_a_skipped_hour():
+    table = get_transition_table('America/New_York')
+    # A 02:30 send on the spring-forward day goes out at 03:30 EDT
+    after = utc_ts(2024, 3, 10, 0, 0)
+    assert table.next_local_time(after, 2 * 3600 + 30 * 60) == utc_ts(2024, 3, 10, 7, 30)
+
+def test_next_local_time_is_after_the_given_time():
+    table = get_transition_table('Asia/Tehran')
+    now = utc_ts(2024, 6, 1, 5, 30)
+    assert table.next_local_time(now, 9 * 3600) == utc_ts(2024, 6, 2, 5, 30)
+
+@pytest.mark.parametrize('name', ['Asia/Tehran', 'America/New_York', 'Europe/London', 'Australia/Sydney'])
+def test_offsets_match_zoneinfo(name):
+    table = get_transition_table(name)
+    zone = ZoneInfo(name)
+    start = utc_ts(2020, 1, 1)
+    for hour in range(0, 5 * 365 * 24, 7):
+        moment = start + hour * 3600
+        expected = datetime.fromtimestamp(moment, zone).utcoffset().total_seconds()
+        assert table.offset_at(moment) == expected
+
+def test_local_date_changes_at_local_midnight():
+    assert local_date('Asia/Tehran', utc_ts(2024, 6, 1, 20, 29)) == date(2024, 6, 1)
+    assert local_date('Asia/Tehran', utc_ts(2024, 6, 1, 20, 31)) == date(2024, 6, 2)
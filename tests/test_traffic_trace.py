@@ -0,0 +1,73 @@
+"""Tests for recording traffic traces and replaying them against the stub API."""
+
+import json
+import os
+import telebot
+from telebot import types
+from traffic_trace import TraceRecorder, read_trace, recorded_latencies, replay
+
+TRACE_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'trace.jsonl')
+
+def replay_bot():
+    """A bot answering /quote, /start and inline queries, remembering what it received."""
+    bot = telebot.TeleBot('123456:replay', threaded=False)
+    bot.received = []
+
+    @bot.message_handler(commands=['quote', 'start'])
+    def handle_command(message):
+        bot.received.append((message.chat.type, message.text))
+        bot.reply_to(message, 'reply')
+
+    @bot.inline_handler(lambda query: True)
+    def handle_inline(query):
+        bot.received.append(('inline', query.query))
+        bot.answer_inline_query(query.id, [])
+
+    return bot
+
+def test_replay_sends_the_recorded_traffic_to_the_stub():
+    bot = replay_bot()
+    report = replay(TRACE_FIXTURE, bot, speed=0, workers=1)
+    assert report['updates'] == 4
+    assert report['errors'] == 0
+    assert report['api_calls'] == {'answerInlineQuery': 1, 'sendMessage': 2}
+    # Same commands, argument lengths and chat types, never the original text
+    assert sorted(bot.received) == [('group', '/quote اااا'), ('inline', 'ااا'), ('private', '/start')]
+
+def test_recorded_latencies_are_medians_per_api_method():
+    assert recorded_latencies(read_trace(TRACE_FIXTURE)) == {'sendMessage': 0.004, 'answerInlineQuery': 0.006}
+
+def update(update_id, text, chat_id=-1001234, chat_type='supergroup'):
+    return types.Update.de_json(json.dumps({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': 1717200000, 'text': text,
+            'chat': {'id': chat_id, 'type': chat_type, 'title': 'Sara & Ali'},
+            'from': {'id': 42, 'is_bot': False, 'first_name': 'Sara'}
+        }
+    }))
+
+def test_recorded_trace_is_sanitized_and_replays(tmp_path):
+    path = str(tmp_path / 'trace.jsonl')
+    recorder = TraceRecorder(path)
+    recorder.record_updates([update(1, '/quote@love_bot عشق'), update(2, 'hello', 42, 'private')])
+    recorder.record_call('reply_to', 1717200000.0, 0.005)
+    recorder.record_call('send_message', 1717200001.0, 0.2, 'server_error')
+    recorder.close()
+
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+    for private in ('عشق', 'hello', 'Sara', '1001234', 'love_bot'):
+        assert private not in content
+
+    records = list(read_trace(path))
+    assert [record['k'] for record in records] == ['trace', 'u', 'u', 'c', 'c']
+    command, text = records[1], records[2]
+    assert (command['cmd'], command['args'], command['len'], command['chat_type']) == ('/quote', 3, 19, 'supergroup')
+    assert 'cmd' not in text and text['len'] == 5
+    assert records[4] == {'k': 'c', 't': 1717200001.0, 'm': 'send_message', 'ms': 200.0, 'ok': False, 'err': 'server_error'}
+
+    bot = replay_bot()
+    report = replay(path, bot, speed=0, workers=1)
+    assert report['api_calls'] == {'sendMessage': 1}
+    assert bot.received == [('supergroup', '/quote ااا')]
@@ -0,0 +1,24 @@
+"""Tests for the atomic file writes used by the corpus, snapshot and card cache."""
+
+import os
+import pytest
+from utils import write_file_atomically
+
+def test_writes_bytes_and_text(tmp_path):
+    path = str(tmp_path / 'file')
+    write_file_atomically(path, b'\x00bytes', sync=True)
+    with open(path, 'rb') as f:
+        assert f.read() == b'\x00bytes'
+    write_file_atomically(path, 'متن')
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == 'متن'
+    assert os.listdir(tmp_path) == ['file']
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / 'file')
+    write_file_atomically(path, b'old')
+    with pytest.raises(TypeError):
+        write_file_atomically(path, ['not', 'bytes'])
+    with open(path, 'rb') as f:
+        assert f.read() == b'old'
+    assert os.listdir(tmp_path) == ['file']
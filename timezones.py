@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Timezone helpers for the Telegram relationship bot.
+Resolves IANA timezones through precomputed UTC offset transition tables so local
+dates and send times are plain integer arithmetic.
+"""
+
+from array import array
+from bisect import bisect_right
+from datetime import date, datetime
+import logging
+import threading
+import time
+import pytz
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+EPOCH = datetime(1970, 1, 1)
+
+# Sentinel for "since the beginning of time" in a transition table
+BEGINNING = -(1 << 62)
+
+class TransitionTable:
+    """UTC offset transitions of one timezone as two parallel integer arrays."""
+
+    __slots__ = ('name', 'transitions', 'offsets')
+
+    def __init__(self, name, transitions, offsets):
+        self.name = name
+        self.transitions = transitions
+        self.offsets = offsets
+
+    @classmethod
+    def from_pytz(cls, name):
+        """Build the transition table of an IANA timezone from pytz data."""
+        tz = pytz.timezone(name)
+        transitions = array('q', [BEGINNING])
+
+        if hasattr(tz, '_utc_transition_times'):
+            offsets = array('i', [int(tz._transition_info[0][0].total_seconds())])
+            for moment, info in zip(tz._utc_transition_times[1:], tz._transition_info[1:]):
+                offset = int(info[0].total_seconds())
+                if offset != offsets[-1]:
+                    transitions.append(int((moment - EPOCH).total_seconds()))
+                    offsets.append(offset)
+        else:
+            offsets = array('i', [int(tz.utcoffset(datetime(2000, 1, 1)).total_seconds())])
+
+        return cls(name, transitions, offsets)
+
+    def offset_at(self, utc_ts):
+        """Get the UTC offset in seconds in effect at a UTC timestamp."""
+        return self.offsets[bisect_right(self.transitions, utc_ts) - 1]
+
+    def local_seconds(self, utc_ts):
+        """Get local wall-clock seconds since the epoch for a UTC timestamp."""
+        return int(utc_ts) + self.offset_at(utc_ts)
+
+    def local_ordinal(self, utc_ts):
+        """Get the local date ordinal for a UTC timestamp."""
+        return self.local_seconds(utc_ts) // SECONDS_PER_DAY + EPOCH_ORDINAL
+
+    def local_to_utc(self, local_seconds):
+        """
+        Convert local wall-clock seconds since the epoch to a UTC timestamp.
+
+        Ambiguous times (clocks going back) resolve to the first occurrence and
+        times skipped by clocks going forward move forward by the size of the gap.
+        """
+        before = self.offset_at(local_seconds - SECONDS_PER_DAY)
+        after = self.offset_at(local_seconds + SECONDS_PER_DAY)
+
+        valid = [
+            local_seconds - offset for offset in (before, after)
+            if self.offset_at(local_seconds - offset) == offset
+        ]
+        if valid:
+            return min(valid)
+        return local_seconds - before
+
+    def next_local_time(self, utc_ts, second_of_day):
+        """Get the next UTC timestamp after utc_ts when the local clock shows second_of_day."""
+        day = self.local_seconds(utc_ts) // SECONDS_PER_DAY
+        for candidate_day in (day, day + 1, day + 2):
+            due = self.local_to_utc(candidate_day * SECONDS_PER_DAY + second_of_day)
+            if due > utc_ts:
+                return due
+        return due
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+def get_transition_table(name):
+    """Get the (cached) transition table for an IANA timezone name."""
+    table = _tables.get(name)
+    if table is None:
+        with _tables_lock:
+            table = _tables.get(name)
+            if table is None:
+                table = TransitionTable.from_pytz(name)
+                _tables[name] = table
+    return table
+
+def local_date(tz_name, utc_ts=None):
+    """Get today's date in a timezone."""
+    if utc_ts is None:
+        utc_ts = time.time()
+    return date.fromordinal(get_transition_table(tz_name).local_ordinal(int(utc_ts)))
+
+def store_local_ordinals(store, utc_ts):
+    """Get the local date ordinal of every couple in a CoupleStore at a UTC timestamp."""
+    utc_ts = int(utc_ts)
+    ordinals = array('i', (
+        get_transition_table(name).local_ordinal(utc_ts) for name in store.timezones.strings
+    ))
+    return array('i', (ordinals[tz_id] for tz_id in store.timezone_ids))
+
+def store_next_local_times(store, utc_ts, seconds_of_day):
+    """
+    Get the next UTC timestamp at which each couple's local clock shows its
+    entry in seconds_of_day. Couples sharing a timezone and send second share
+    one computation.
+    """
+    utc_ts = int(utc_ts)
+    tables = [get_transition_table(name) for name in store.timezones.strings]
+    cache = {}
+    result = array('q')
+    for tz_id, second in zip(store.timezone_ids, seconds_of_day):
+        key = (tz_id, second)
+        due = cache.get(key)
+        if due is None:
+            due = tables[tz_id].next_local_time(utc_ts, second)
+            cache[key] = due
+        result.append(due)
+    return result
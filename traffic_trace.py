@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Record-and-replay traffic traces for the Telegram relationship bot.
+Records incoming updates and outgoing API calls, sanitized, to an append-only
+JSON lines file, and replays a trace against a local stub of the Telegram API
+at 1x, 10x or maximum speed to measure latency and throughput, optionally
+while a bulk broadcast runs alongside.
+
+Trace lines (one JSON object each, .gz paths are gzip compressed):
+    {"k": "trace", "v": 1, "t": ...}                        header
+    {"k": "u", "t": ..., "type": "message", "chat": ..., "chat_type": ...,
+     "cmd": "/quote", "args": 4, "len": 11}                 incoming update
+    {"k": "c", "t": ..., "m": "send_message", "ms": 85.2, "ok": true}
+                                                            outgoing API call
+
+Only command names, text lengths and salted chat hashes are recorded, never
+message text, names or real chat ids.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+import gzip
+import json
+import logging
+import os
+import secrets
+import statistics
+import sys
+import threading
+import time
+from telebot import apihelper, types
+from lanes import BulkLane
+from message_selection import stable_hash
+
+logger = logging.getLogger(__name__)
+
+TRACE_VERSION = 1
+
+# Flush buffered trace lines at least this often (seconds)
+FLUSH_INTERVAL = 1.0
+
+# Update fields recorded as the update type, in telebot's order
+UPDATE_TYPES = (
+    'message', 'edited_message', 'channel_post', 'edited_channel_post',
+    'inline_query', 'chosen_inline_result', 'callback_query', 'my_chat_member', 'chat_member'
+)
+
+def open_trace(path, mode):
+    """Open a trace file as text, gzip compressed when the path ends in .gz."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def read_trace(path):
+    """Read the records of a trace file."""
+    with open_trace(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+class TraceRecorder:
+    """Appends sanitized update and API call records to a trace file."""
+
+    def __init__(self, path):
+        self.path = path
+        # Chat ids are hashed with a salt that never leaves this process
+        self._salt = secrets.token_hex(8)
+        self._lock = threading.Lock()
+        self._file = open_trace(path, 'a')
+        self._last_flush = time.monotonic()
+        self.records = 0
+        self._write({'k': 'trace', 'v': TRACE_VERSION, 't': round(time.time(), 3)})
+
+    def attach(self, bot, api=None):
+        """Record the updates processed by a TeleBot and the calls made through an api client."""
+        process_new_updates = bot.process_new_updates
+
+        def recording_process_new_updates(updates):
+            self.record_updates(updates)
+            return process_new_updates(updates)
+
+        bot.process_new_updates = recording_process_new_updates
+        if api is not None:
+            api.recorder = self
+        logger.info(f"✅ Recording traffic trace to {self.path}")
+        return self
+
+    def chat_hash(self, chat_id):
+        return stable_hash(self._salt, chat_id) % 10 ** 9
+
+    def record_updates(self, updates):
+        """Record a batch of incoming updates."""
+        now = round(time.time(), 3)
+        for update in updates:
+            try:
+                self._write(self.sanitize_update(update, now))
+            except Exception as e:
+                logger.warning(f"⚠️ Could not record update: {e}")
+
+    def sanitize_update(self, update, now):
+        """Reduce an update to its shape: type, hashed chat, command and text lengths."""
+        record = {'k': 'u', 't': now, 'type': 'other'}
+        for update_type in UPDATE_TYPES:
+            payload = getattr(update, update_type, None)
+            if payload is not None:
+                record['type'] = update_type
+                break
+        else:
+            return record
+
+        if update_type == 'inline_query':
+            record['chat'] = self.chat_hash(payload.from_user.id)
+            record['len'] = len(payload.query or '')
+            return record
+
+        chat = getattr(payload, 'chat', None)
+        if chat is not None:
+            record['chat'] = self.chat_hash(chat.id)
+            record['chat_type'] = chat.type
+        text = getattr(payload, 'text', None) or ''
+        record['len'] = len(text)
+        if text.startswith('/'):
+            command, _, arguments = text.partition(' ')
+            record['cmd'] = command.split('@')[0]
+            record['args'] = len(arguments.strip())
+        return record
+
+    def record_call(self, method, started, duration, error_class=None):
+        """Record one outgoing API call attempt."""
+        record = {'k': 'c', 't': round(started, 3), 'm': method, 'ms': round(duration * 1000, 1)}
+        record['ok'] = error_class is None
+        if error_class is not None:
+            record['err'] = error_class
+        self._write(record)
+
+    def _write(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + '\n')
+            self.records += 1
+            if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+                self._file.flush()
+                self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def start_recording(bot, api, path):
+    """Start recording a bot's traffic to a trace file."""
+    return TraceRecorder(path).attach(bot, api)
+
+class StubTelegramApi:
+    """
+    Local HTTP stand-in for the Telegram Bot API.
+
+    Answers every method with a successful result, after a per-method latency
+    (seconds), and counts the calls it receives.
+    """
+
+    def __init__(self, latencies=None, default_latency=0.0):
+        self.latencies = latencies or {}
+        self.default_latency = default_latency
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._message_id = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def api_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/bot{{0}}/{{1}}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def result_for(self, method, params):
+        """Build a plausible result for an API method."""
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self._message_id += 1
+            message_id = self._message_id
+
+        if method == 'getMe':
+            return {'id': 1, 'is_bot': True, 'first_name': 'Replay', 'username': 'replay_bot'}
+        if method == 'getUpdates':
+            return []
+        if method.startswith('send') or method == 'editMessageText':
+            chat_id = int(params.get('chat_id', 0) or 0)
+            return {
+                'message_id': message_id,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private' if chat_id > 0 else 'group'},
+                'text': params.get('text', '')
+            }
+        return True
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def handle_request(self):
+                url = urlsplit(self.path)
+                method = url.path.rsplit('/', 1)[-1]
+                params = dict(parse_qsl(url.query))
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                if body and 'multipart' not in (self.headers.get('Content-Type') or ''):
+                    params.update(parse_qsl(body.decode('utf-8', 'replace')))
+
+                latency = stub.latencies.get(method, stub.default_latency)
+                if latency:
+                    time.sleep(latency)
+                payload = json.dumps({'ok': True, 'result': stub.result_for(method, params)}).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = handle_request
+            do_POST = handle_request
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+# Telebot method names as recorded -> Bot API method names served by the stub
+API_METHOD_NAMES = {
+    'send_message': 'sendMessage',
+    'reply_to': 'sendMessage',
+    'send_photo': 'sendPhoto',
+    'answer_inline_query': 'answerInlineQuery',
+    'edit_message_text': 'editMessageText',
+    'pin_chat_message': 'pinChatMessage',
+}
+
+def recorded_latencies(records):
+    """Get the median recorded latency (seconds) of each Bot API method."""
+    durations = {}
+    for record in records:
+        if record.get('k') == 'c' and record.get('ok'):
+            method = API_METHOD_NAMES.get(record['m'], record['m'])
+            durations.setdefault(method, []).append(record['ms'] / 1000)
+    return {method: statistics.median(values) for method, values in durations.items()}
+
+def synthesize_update(record, update_id):
+    """Build a Telegram update dict with the shape of a recorded update."""
+    now = int(time.time())
+    chat_hash = record.get('chat', 0)
+    if record['type'] == 'inline_query':
+        return {
+            'update_id': update_id,
+            'inline_query': {
+                'id': str(update_id),
+                'from': {'id': chat_hash + 1, 'is_bot': False, 'first_name': 'Replay'},
+                'query': 'ا' * record.get('len', 0),
+                'offset': ''
+            }
+        }
+
+    chat_type = record.get('chat_type', 'group')
+    chat_id = chat_hash + 1 if chat_type == 'private' else -(10 ** 12 + chat_hash)
+    if 'cmd' in record:
+        text = record['cmd']
+        if record.get('args'):
+            text += ' ' + 'ا' * record['args']
+    else:
+        text = 'ا' * max(record.get('len', 0), 1)
+
+    message = {
+        'message_id': update_id,
+        'date': now,
+        'chat': {'id': chat_id, 'type': chat_type},
+        'from': {'id': chat_hash + 1, 'is_bot': False, 'first_name': 'Replay'},
+        'text': text
+    }
+    if 'cmd' in record:
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(record['cmd'])}]
+    return {'update_id': update_id, record['type'] if record['type'] != 'other' else 'message': message}
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def replay(trace_path, bot, speed=1.0, workers=4, api_latency=None, broadcast=0, api=None, bulk_workers=4):
+    """
+    Replay the updates of a trace into a TeleBot against a local stub API.
+
+    speed scales the recorded gaps between updates (10 = ten times faster,
+    0 = as fast as possible). api_latency (seconds) overrides the latency the
+    stub adds to each call; by default the recorded median of each method is used.
+    With broadcast, that many messages are sent through api on a bulk lane
+    while the updates are replayed, like a scheduled broadcast.
+    Returns a report dict with throughput and latency percentiles in milliseconds.
+    """
+    records = list(read_trace(trace_path))
+    updates = [record for record in records if record.get('k') == 'u']
+    if api_latency is None:
+        stub = StubTelegramApi(recorded_latencies(records))
+    else:
+        stub = StubTelegramApi(default_latency=api_latency)
+
+    original_api_url = apihelper.API_URL
+    original_threaded = bot.threaded
+    apihelper.API_URL = stub.api_url
+    # Run handlers inside the replay workers so each latency covers the whole update
+    bot.threaded = False
+    stub.start()
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    broadcast_seconds = None
+
+    def send_broadcast():
+        nonlocal broadcast_seconds
+        started = time.perf_counter()
+        lane = BulkLane(bulk_workers, bulk_workers * 4)
+        for number in range(broadcast):
+            lane.submit(api.send_message, -1000000000000 - number, 'broadcast')
+        lane.join()
+        broadcast_seconds = time.perf_counter() - started
+
+    broadcaster = threading.Thread(target=send_broadcast, daemon=True) if broadcast and api else None
+
+    def process(update_dict, scheduled):
+        nonlocal errors
+        try:
+            bot.process_new_updates([types.Update.de_json(update_dict)])
+        except Exception as e:
+            logger.warning(f"⚠️ Replayed update failed: {e}")
+            with lock:
+                errors += 1
+        with lock:
+            latencies.append(time.perf_counter() - scheduled)
+
+    try:
+        first_time = updates[0]['t'] if updates else 0
+        started = time.perf_counter()
+        if broadcaster is not None:
+            broadcaster.start()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for update_id, record in enumerate(updates, 1):
+                scheduled = started
+                if speed:
+                    scheduled += (record['t'] - first_time) / speed
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                executor.submit(process, synthesize_update(record, update_id), scheduled)
+        elapsed = time.perf_counter() - started
+        if broadcaster is not None:
+            broadcaster.join()
+    finally:
+        stub.stop()
+        apihelper.API_URL = original_api_url
+        bot.threaded = original_threaded
+
+    latencies.sort()
+    report = {
+        'updates': len(updates),
+        'errors': errors,
+        'elapsed_seconds': round(elapsed, 3),
+        'updates_per_second': round(len(updates) / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 1),
+            'p90': round(percentile(latencies, 0.90) * 1000, 1),
+            'p99': round(percentile(latencies, 0.99) * 1000, 1),
+            'max': round(latencies[-1] * 1000, 1) if latencies else 0.0
+        },
+        'api_calls': dict(sorted(stub.calls.items()))
+    }
+    if broadcaster is not None:
+        report['broadcast'] = {'messages': broadcast, 'seconds': round(broadcast_seconds, 3)}
+    return report
+
+def load_target(target):
+    """Create the bot to replay into, and its API client: 'main' (RelationshipBot) or 'interactive'."""
+    # Replays never reach Telegram, so placeholder credentials are enough
+    os.environ.setdefault('BOT_TOKEN', '123456:replay')
+    os.environ.setdefault('GROUP_ID', '-1000000000001')
+    os.environ.pop('TRACE_FILE', None)
+    if target == 'interactive':
+        import interactive_bot
+        return interactive_bot.bot, interactive_bot.api
+    from bot import RelationshipBot
+    relationship_bot = RelationshipBot()
+    return relationship_bot.bot, relationship_bot.api
+
+def main(argv):
+    """Command line: python traffic_trace.py replay TRACE [--speed 1|10|max] [--target main|interactive] [--workers N] [--api-latency MS] [--broadcast N]"""
+    if len(argv) < 3 or argv[1] != 'replay':
+        print(main.__doc__)
+        return 1
+
+    options = {'--speed': '1', '--target': 'main', '--workers': '4', '--api-latency': None, '--broadcast': '0'}
+    arguments = argv[3:]
+    for flag, value in zip(arguments[::2], arguments[1::2]):
+        if flag not in options:
+            print(main.__doc__)
+            return 1
+        options[flag] = value
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    speed = 0 if options['--speed'] == 'max' else float(options['--speed'])
+    api_latency = None if options['--api-latency'] is None else float(options['--api-latency']) / 1000
+    bot, api = load_target(options['--target'])
+    report = replay(
+        argv[2], bot, speed=speed, workers=int(options['--workers']), api_latency=api_latency,
+        broadcast=int(options['--broadcast']), api=api, bulk_workers=int(os.getenv('BULK_WORKERS', '4'))
+    )
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -1,21 +1,40 @@
 #!/usr/bin/env python3
 """
 Utility functions for the Telegram relationship bot.
-Contains helper functions for date calculations and message formatting.
+Contains helper functions for date calculations, message formatting and
+atomic file writes.
 """
 
-from datetime import datetime, date
+import calendar
+from datetime import datetime, date, timedelta
 import logging
+import os
+import tempfile
+from jalali import jalali_difference, month_name, to_persian_digits
 
 logger = logging.getLogger(__name__)
 
-def calculate_days_together(start_date):
-    """Calculate the number of days since the relationship started."""
+def group_key(group_id):
+    """
+    Get the key a chat is stored under: numeric ids (chat ids, numeric GROUP_ID
+    strings) as int, so both find the same chat, and '@channel' usernames as is.
+    """
+    try:
+        return int(group_id)
+    except ValueError:
+        return str(group_id).strip()
+
+def calculate_days_together(start_date, today=None):
+    """Calculate the number of days since the relationship started.
+    
+    today should be the couple's local date (see timezones.local_date); the
+    server's date is used when it is not given.
+    """
     try:
         if isinstance(start_date, str):
             start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
         
-        today = date.today()
+        today = today or date.today()
         delta = today - start_date
         return delta.days + 1  # +1 to include the start date
     
@@ -31,99 +50,94 @@ def is_special_milestone(days):
     ]
     return days in special_milestones
 
-def format_milestone_message(days):
-    """Format a milestone message with proper Persian text."""
+def format_milestone_message(days, couple_key=None, today=None, language=None):
+    """Format a milestone message in a language (default: the default language).
+    
+    With a couple_key the quote and advice are the couple's picks for the day,
+    otherwise they are random. today is the couple's local date (default: the
+    server's date) and is used for the exact duration in the language's calendar.
+    """
+    from i18n import get_catalog
+    catalog = get_catalog(language)
     try:
-        from quotes import get_random_quote, get_random_advice
-        quote = get_random_quote()
-        advice = get_random_advice()
+        from quotes import get_random_quote, get_random_advice, get_quote_for, get_advice_for
+        if couple_key is not None:
+            quote = get_quote_for(couple_key, days, 'milestone_quote')
+            advice = get_advice_for(couple_key, days, 'milestone_advice')
+        else:
+            quote = get_random_quote()
+            advice = get_random_advice()
         
-        message = f"""
-🌹 تبریک! 🌹
-
-💕 امروز روز {days} از عشق زیبای شماست!
-
-"""
+        lines = [catalog.text('summary.header', days=days), '']
         
         # Add special notes for certain milestones
-        if days == 7:
-            message += "🌸 یک هفته کامل عشق! 🌸\n"
-        elif days == 30:
-            message += "🌟 یک ماه عاشقانه! 🌟\n"
-        elif days == 100:
-            message += "🎯 صد روز کامل عشق! 🎯\n"
-        elif days == 365:
-            message += "🎂 یک سال کامل عاشقی! 🎂\n"
-        elif days == 1000:
-            message += "👑 هزار روز فوق‌العاده! 👑\n"
+        if days in (7, 30, 100, 365, 1000):
+            lines.append(catalog.text(f'summary.note.{days}'))
         elif days % 100 == 0:
-            message += f"✨ {days} روز درخشان! ✨\n"
+            lines.append(catalog.text('summary.note.hundreds', days=days))
         elif is_special_milestone(days):
-            message += f"🎉 {days} روز پر از عشق! 🎉\n"
+            lines.append(catalog.text('summary.note.special', days=days))
         
-        # Calculate years, months, and remaining days
-        years = days // 365
-        remaining_days = days % 365
-        months = remaining_days // 30
-        final_days = remaining_days % 30
+        # Exact years, months and days in the language's calendar, counting today
+        today = today or date.today()
+        start_date = today - timedelta(days=days - 1)
+        if catalog.text('meta.calendar') == 'jalali':
+            difference = jalali_difference(start_date, today + timedelta(days=1))
+        else:
+            difference = gregorian_difference(start_date, today + timedelta(days=1))
         
-        if years > 0:
-            message += f"📅 {years} سال"
-            if months > 0:
-                message += f" و {months} ماه"
-            if final_days > 0:
-                message += f" و {final_days} روز"
-            message += " از عشق شما!\n"
-        elif months > 0:
-            message += f"📅 {months} ماه"
-            if final_days > 0:
-                message += f" و {final_days} روز"
-            message += " از عشق شما!\n"
+        if difference[0] > 0 or difference[1] > 0:
+            parts = [
+                catalog.text(f"duration.{unit}{'' if count == 1 else 's'}", count=count)
+                for unit, count in zip(('year', 'month', 'day'), difference) if count > 0
+            ]
+            lines.append(catalog.text('summary.duration', duration=catalog.text('duration.separator').join(parts)))
         
         # Add next milestone
         next_milestone = get_next_milestone(days)
-        message += f"\n⏳ {next_milestone - days} روز تا نقطه عطف بعدی ({next_milestone} روز) باقی مانده!"
+        lines += ['', catalog.text('summary.next', left=next_milestone - days, next=next_milestone)]
+        lines += ['', catalog.text('summary.footer', quote=quote, advice=advice)]
         
-        message += f"\n\n💝 {quote}\n\n💡 توصیه امروز: {advice}\n\n💖 عشق شما همچنان زیبا و قوی است!"
-        
-        return message.strip()
+        return '\n'.join(lines).strip()
     
     except Exception as e:
         logger.error(f"❌ Error formatting milestone message: {e}")
-        return f"💕 امروز روز {days} از عشق شماست! 💕"
+        return catalog.text('summary.fallback', days=days)
+
+def format_countdown_message(days, language=None):
+    """Format the live countdown message (days together and days to the next milestone)."""
+    from i18n import get_catalog
+    next_milestone = get_next_milestone(days)
+    return get_catalog(language).text('live.countdown', days=days, left=next_milestone - days, next=next_milestone)
+
+def gregorian_difference(start_date, end_date):
+    """Get the exact (years, months, days) between two dates in the Gregorian calendar."""
+    years = end_date.year - start_date.year
+    months = end_date.month - start_date.month
+    days = end_date.day - start_date.day
+    if days < 0:
+        months -= 1
+        previous_year, previous_month = (end_date.year, end_date.month - 1) if end_date.month > 1 else (end_date.year - 1, 12)
+        days += calendar.monthrange(previous_year, previous_month)[1]
+    if months < 0:
+        years -= 1
+        months += 12
+    return years, months, days
 
 def format_number_persian(number):
     """Convert English numbers to Persian numbers."""
-    persian_digits = '۰۱۲۳۴۵۶۷۸۹'
-    english_digits = '0123456789'
-    
-    result = str(number)
-    for i, digit in enumerate(english_digits):
-        result = result.replace(digit, persian_digits[i])
-    
-    return result
+    return to_persian_digits(number)
+
+# Persian day names indexed by date.weekday()
+PERSIAN_DAY_NAMES = ('دوشنبه', 'سه‌شنبه', 'چهارشنبه', 'پنج‌شنبه', 'جمعه', 'شنبه', 'یکشنبه')
 
 def get_persian_day_name(date_obj):
     """Get Persian day name for a given date."""
-    days = {
-        0: 'دوشنبه',
-        1: 'سه‌شنبه',
-        2: 'چهارشنبه',
-        3: 'پنج‌شنبه',
-        4: 'جمعه',
-        5: 'شنبه',
-        6: 'یکشنبه'
-    }
-    return days.get(date_obj.weekday(), 'نامشخص')
+    return PERSIAN_DAY_NAMES[date_obj.weekday()]
 
 def get_persian_month_name(month_number):
-    """Get Persian month name for a given month number."""
-    months = {
-        1: 'ژانویه', 2: 'فوریه', 3: 'مارس', 4: 'آپریل',
-        5: 'مه', 6: 'ژوئن', 7: 'ژوئیه', 8: 'آگوست',
-        9: 'سپتامبر', 10: 'اکتبر', 11: 'نوامبر', 12: 'دسامبر'
-    }
-    return months.get(month_number, 'نامشخص')
+    """Get the Persian (Jalali) month name for a given Jalali month number."""
+    return month_name(month_number)
 
 def validate_date_format(date_string, format_string='%Y-%m-%d'):
     """Validate if a date string matches the expected format."""
@@ -142,4 +156,59 @@ def get_next_milestone(current_days):
             return milestone
     
     # If all milestones are passed, return the next thousand
-    return ((current_days // 1000) + 1) * 1000
\ No newline at end of file
+    return ((current_days // 1000) + 1) * 1000
+
+def write_file_atomically(path, data, sync=False):
+    """
+    Write bytes or text to path through a uniquely named temporary file in the
+    same directory, then rename it over path. Concurrent writers never share a
+    temporary file, and readers see either the old or the new content. With
+    sync, the data is on disk before the rename.
+    """
+    options = {'mode': 'w', 'encoding': 'utf-8'} if isinstance(data, str) else {'mode': 'wb'}
+    temp = tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(os.path.abspath(path)), prefix=f"{os.path.basename(path)}.",
+        suffix='.tmp', delete=False, **options)
+    try:
+        with temp:
+            temp.write(data)
+            if sync:
+                temp.flush()
+                os.fsync(temp.fileno())
+        os.replace(temp.name, path)
+    except BaseException:
+        try:
+            os.unlink(temp.name)
+        except OSError:
+            pass
+        raise
+
+def rebuild_integer_key_table(connection, table, create_table):
+    """
+    Rebuild a table whose key was declared INTEGER PRIMARY KEY, a rowid alias
+    that only holds numbers, with the create_table statement, keeping its rows,
+    so the key can also hold '@channel' usernames. Returns True if rebuilt.
+    """
+    def has_integer_key():
+        columns = connection.execute(f'PRAGMA table_info({table})').fetchall()
+        return any(column[5] and column[2].upper() == 'INTEGER' for column in columns), columns
+
+    if not has_integer_key()[0]:
+        return False
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        # Another process may have rebuilt it while this one waited for the lock
+        rebuild, columns = has_integer_key()
+        if rebuild:
+            names = ', '.join(column[1] for column in columns)
+            connection.execute(f'ALTER TABLE {table} RENAME TO {table}_integer_key')
+            connection.execute(create_table)
+            connection.execute(f'INSERT INTO {table} ({names}) SELECT {names} FROM {table}_integer_key')
+            connection.execute(f'DROP TABLE {table}_integer_key')
+        connection.execute('COMMIT')
+    except Exception:
+        connection.execute('ROLLBACK')
+        raise
+    if rebuild:
+        logger.info(f"✅ Rebuilt {table} to allow channel usernames as keys")
+    return rebuild